@@ -0,0 +1,84 @@
+# Testes do treino assíncrono actor-learner
+import functools
+import queue
+import threading
+
+import numpy as np
+import torch
+
+from truco_actor_learner import ActorLearner, SharedWeights, _actor
+from truco_env import TrucoMineiroEnv
+from truco_players import LearningPlayer, RandomBotPlayer
+from truco_trainer import default_q_network
+
+
+def _learner_env_fn():
+    teams = [[LearningPlayer("learner")], [RandomBotPlayer("random")]]
+    return functools.partial(TrucoMineiroEnv, num_players=2, teams=teams, flat_obs=True)
+
+
+def test_shared_weights_publish_and_load():
+    source, target = default_q_network(), default_q_network()
+    weights = SharedWeights(source)
+    assert weights.publish(source) == 1
+    assert weights.load(target) == 1
+    for key, value in target.state_dict().items():
+        assert torch.equal(value, source.state_dict()[key])
+
+
+def test_actor_transitions_keep_the_state_before_the_step():
+    network = default_q_network()
+    weights = SharedWeights(network)
+    weights.publish(network)
+    transitions, commands, stop = queue.Queue(), queue.Queue(), threading.Event()
+    # O actor roda numa thread com filas comuns, sem subir processos
+    thread = threading.Thread(
+        target=_actor, args=(0, _learner_env_fn(), network, weights, transitions, commands, stop, 0.5, 0.99, 128, 32, 0)
+    )
+    thread.start()
+    try:
+        _, states, actions, rewards, dones, next_states, versions, _ = transitions.get(timeout=60)
+    finally:
+        stop.set()
+        thread.join()
+    assert not (states == next_states).all(axis=1).any()
+    # Toda ação gravada é válida no estado gravado (cartas só com carta na mão)
+    for state, action in zip(states, actions):
+        if action < 3:
+            assert state[action] > 0
+    assert (versions == 1).all()
+
+
+def test_actor_learner_trains_from_the_actors():
+    with ActorLearner(_learner_env_fn(), num_actors=2, chunk_size=32, batch_size=8, seed=0) as trainer:
+        results = trainer.run(10)
+    assert len(results["victories"]) == len(results["Returns"]) >= 10
+    assert results["updates"] == len(results["MSE Loss"]) > 0
+    assert np.isfinite(results["MSE Loss"]).all()
+
+
+def test_actor_tags_games_with_the_opponent_set():
+    network = default_q_network()
+    weights = SharedWeights(network)
+    weights.publish(network)
+    transitions, commands, stop = queue.Queue(), queue.Queue(), threading.Event()
+    teams = [[LearningPlayer("learner")], [RandomBotPlayer("other")]]
+    commands.put((teams, 3))
+    thread = threading.Thread(
+        target=_actor, args=(0, _learner_env_fn(), network, weights, transitions, commands, stop, 0.5, 0.99, 64, 32, 0)
+    )
+    thread.start()
+    ids = []
+    try:
+        while not ids:
+            ids += [opponents for _, _, opponents in transitions.get(timeout=60)[-1]]
+        # Com a troca no meio de um jogo, ele não conta para nenhum dos dois conjuntos
+        commands.put((teams, 4))
+        while ids[-1] != 4:
+            ids += [opponents for _, _, opponents in transitions.get(timeout=60)[-1]]
+    finally:
+        stop.set()
+        thread.join()
+    first = ids.index(4)
+    assert ids[:first] in ([3] * first, [3] * (first - 1) + [None])
+    assert set(ids[first:]) == {4}
@@ -0,0 +1,68 @@
+# Testes da arena
+import numpy as np
+import pytest
+
+import truco_arena
+from truco_arena import play_games, play_match, round_robin, sequential_z, wilson_interval
+from truco_env import TrucoMineiroEnv, spawn_seeds
+from truco_players import RandomBotPlayer
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(50, 100)
+    assert low == pytest.approx(0.4038, abs=1e-4) and high == pytest.approx(0.5962, abs=1e-4)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    low, high = wilson_interval(20, 20)
+    assert high == 1.0 and low > 0.8
+
+
+def test_play_games_returns_the_team_that_reached_12():
+    players = [RandomBotPlayer("a"), RandomBotPlayer("b")]
+    envs = [TrucoMineiroEnv(num_players=2, teams=[[players[0]], [players[1]]], flat_obs=True) for _ in range(8)]
+    winners = play_games(envs)
+    for env, winner in zip(envs, winners):
+        assert env.game_score[winner] >= 12 > env.game_score[1 - winner]
+
+
+def test_round_robin_counts_every_game_once():
+    players = [RandomBotPlayer(name) for name in "abc"]
+    tournament = round_robin(players, num_workers=0, max_games=60, min_games=20, batch_size=20)
+    wins, games = tournament["wins"], tournament["games"]
+    assert len(tournament["matches"]) == 3
+    assert np.array_equal(games, games.T) and not games.diagonal().any()
+    assert np.array_equal(wins + wins.T, games)
+    played = games[~np.eye(3, dtype=bool)]
+    assert ((played >= 20) & (played <= 60) & (played % 20 == 0)).all()
+
+
+def test_play_match_stops_at_max_games():
+    result = play_match(RandomBotPlayer("a"), RandomBotPlayer("b"), max_games=50, min_games=50, batch_size=20)
+    assert result["games"] == 50
+    assert result["winrate"] == result["wins"] / 50
+    assert result["ci"] == wilson_interval(result["wins"], 50)
+
+
+def test_sequential_z_widens_with_the_number_of_looks():
+    assert sequential_z(1.96, 1) == pytest.approx(1.96)
+    assert sequential_z(1.96, 10) == pytest.approx(2.807, abs=1e-3)
+    assert sequential_z(1.96, 10) < sequential_z(1.96, 20)
+
+
+def test_seeded_matches_seed_the_shared_players_once(monkeypatch):
+    def match(batch_size):
+        players = [RandomBotPlayer("a"), RandomBotPlayer("b")]
+        result = play_match(*players, max_games=40, min_games=40, batch_size=batch_size, seed=3)
+        return result, [player.rng.random() for player in players]
+
+    assert match(20) == match(20)
+
+    # Antes da primeira partida os geradores dos jogadores são os filhos da semente da
+    # partida, e não os do último env construído
+    first_draws = []
+    monkeypatch.setattr(truco_arena, "play_games", lambda envs: first_draws.extend(
+        player.rng.bit_generator.state["state"] for player in envs[0].players
+    ) or np.zeros(len(envs), dtype=np.int64))
+    players = [RandomBotPlayer("a"), RandomBotPlayer("b")]
+    play_match(*players, max_games=10, min_games=10, batch_size=10, seed=3)
+    expected = [np.random.default_rng(seed).bit_generator.state["state"] for seed in spawn_seeds(3, 12)[-2:]]
+    assert first_draws == expected
@@ -0,0 +1,69 @@
+# Testes do motor em lote contra o TrucoMineiroEnv
+import numpy as np
+
+from truco_batch_env import BatchTrucoMineiroEnv
+from truco_env import TrucoMineiroEnv
+from truco_players import RandomBotPlayer
+
+
+def _bot_env(num_players):
+    half = num_players // 2
+    teams = [[RandomBotPlayer(f"{side}{i}") for i in range(half)] for side in "ab"]
+    return TrucoMineiroEnv(num_players, teams, flat_obs=True)
+
+
+def test_batch_env_matches_the_scalar_env():
+    for num_players in (2, 4):
+        env = _bot_env(num_players)
+        batch_env = BatchTrucoMineiroEnv(1, seed=0, num_players=num_players)
+        batch_env.reset()
+
+        def deal_like_env():
+            # O motor em lote sorteia as próprias mãos: copia a rodada nova do env escalar
+            batch_env.cards[0] = env.cards
+            batch_env.round_starter[0] = env.round_starter
+            batch_env.hand_starter[0] = env.hand_starter
+            batch_env.current_player_index[0] = env.current_player_index
+            batch_env.game_score[0] = env.game_score
+            batch_env._update_obs()
+
+        rng = np.random.default_rng(num_players)
+        obs, info = env.reset()
+        deal_like_env()
+        rounds = 0
+        while rounds < 200:
+            assert np.array_equal(obs, batch_env._obs[0])
+            assert np.array_equal(info["valid_mask"], batch_env._valid_actions[0])
+            valid_actions = info["valid_actions"]
+            action = valid_actions[int(rng.integers(len(valid_actions)))]
+            obs, reward, done, info = env.handle_action(action)
+            batch_obs, rewards, dones, batch_info = batch_env.step([action])
+            assert reward == rewards[0]
+            assert done == dones[0]
+            assert info["round_ended"] == batch_info["round_ended"][0]
+            if info["round_ended"]:
+                rounds += 1
+                assert np.array_equal(obs, batch_info["final_obs"][0])
+                obs, info = env.reset(reset_score=done)
+                deal_like_env()
+
+
+def test_batch_env_plays_many_games_at_once():
+    for num_players in (2, 4):
+        _play_batch(BatchTrucoMineiroEnv(64, seed=0, num_players=num_players))
+
+
+def _play_batch(batch_env):
+    obs, info = batch_env.reset()
+    rng = np.random.default_rng(0)
+    games = 0
+    for _ in range(500):
+        # Ação válida aleatória por jogo
+        scores = rng.random(info["valid_actions"].shape) * info["valid_actions"]
+        obs, rewards, dones, info = batch_env.step(scores.argmax(axis=1))
+        # Só há recompensa no fim da rodada e o jogo só acaba no fim de uma rodada
+        assert not rewards[~info["round_ended"]].any()
+        assert not (dones & ~info["round_ended"]).any()
+        assert (batch_env.game_score < 12).all()
+        games += int(dones.sum())
+    assert games > 0
@@ -0,0 +1,46 @@
+# Testes do conjunto de benchmarks
+import json
+import random
+
+import truco_benchmark
+from truco_benchmark import BENCHMARKS, compare, main
+from truco_game_log import GameLogWriter
+
+
+def test_quick_run_writes_a_comparable_report(tmp_path, capsys):
+    names = ["env_reset", "obs_flatten", "batch_env_step"]
+    assert set(names) <= set(BENCHMARKS)
+    main(["--only", *names, "--quick", "--repeats", "2", "--output", str(tmp_path / "run.json")])
+    report = json.load(open(tmp_path / "run.json"))
+    assert report["scale"] == 0.1 and report["repeats"] == 2
+    assert list(report["results"]) == names
+    for result in report["results"].values():
+        assert len(result["values"]) == 2 and result["value"] > 0
+    # Comparar uma execução com ela mesma dá razão 1 em todos os benchmarks
+    lines = compare(report, report).splitlines()
+    assert len(lines) == len(names) and all(line.endswith("(1.00x)") for line in lines)
+
+
+def test_env_benchmarks_time_only_the_actions(monkeypatch):
+    closed, closed_while_timing = [], []
+
+    class Writer(GameLogWriter):
+        def close(self):
+            closed.append(True)
+            super().close()
+
+    rate = truco_benchmark._rate
+
+    def checked_rate(function, n):
+        result = rate(function, n)
+        closed_while_timing.append(len(closed))
+        return result
+
+    monkeypatch.setattr(truco_benchmark, "GameLogWriter", Writer)
+    monkeypatch.setattr(truco_benchmark, "_rate", checked_rate)
+    state = random.getstate()
+    for name in ("env_step", "env_handle_action", "env_handle_action_logged"):
+        assert BENCHMARKS[name][0](0.01) > 0
+    # As ações saem de um gerador próprio, não do random global, e o logger fecha depois da medida
+    assert random.getstate() == state
+    assert closed_while_timing == [0, 0, 0] and closed == [True]
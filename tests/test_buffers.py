@@ -0,0 +1,102 @@
+# Testes dos buffers de replay
+import numpy as np
+import torch
+
+from truco_buffers import PrioritizedReplayBuffer, ReplayBuffer, SumTree
+
+
+def _transitions(start, n):
+    # Transições numeradas: todos os campos guardam o número da transição
+    ids = np.arange(start, start + n)
+    states = np.repeat(ids[:, None], 24, axis=1).astype(np.float32)
+    return states, ids % 6, ids.astype(np.float32), ids % 2 == 0, states + 0.5
+
+
+def test_replay_buffer_wraps_around_and_keeps_the_latest_transitions():
+    buffer = ReplayBuffer(capacity=100, device="cpu")
+    for start in range(0, 250, 30):
+        buffer.insert_many(*_transitions(start, 30))
+    assert len(buffer) == 100
+    # As 100 últimas das 270 transições inseridas, nas posições do buffer circular
+    assert sorted(buffer.rewards.view(-1).tolist()) == list(range(170, 270))
+    buffer.insert_many(*_transitions(1000, 150))
+    assert sorted(buffer.rewards.view(-1).tolist()) == list(range(1050, 1150))
+
+
+def test_replay_buffer_samples_whole_transitions():
+    buffer = ReplayBuffer(capacity=1000, device="cpu")
+    buffer.insert_many(*_transitions(0, 400))
+    states, actions, rewards, dones, next_states = buffer.sample(32)
+    assert states.shape == (32, 24) and actions.shape == (32, 1)
+    ids = rewards.view(-1)
+    assert torch.equal(states, ids[:, None].expand(-1, 24))
+    assert torch.equal(next_states, states + 0.5)
+    assert torch.equal(actions.view(-1), ids.long() % 6)
+    assert torch.equal(dones.view(-1), ids.long() % 2 == 0)
+    assert buffer.can_sample(40) and not buffer.can_sample(41)
+
+
+def test_seeded_replay_buffers_do_not_use_the_global_torch_state():
+    def sample(seed, torch_seed):
+        buffer = ReplayBuffer(capacity=1000, device="cpu", seed=seed)
+        buffer.insert_many(*_transitions(0, 400))
+        torch.manual_seed(torch_seed)
+        return [buffer.sample(32)[2].view(-1).tolist() for _ in range(3)]
+
+    assert sample(5, 0) == sample(5, 1)
+    assert sample(5, 0) != sample(6, 0)
+
+
+def test_sum_tree_finds_positions_by_cumulative_priority():
+    tree = SumTree(5)
+    tree.update([0, 1, 2, 3], [1.0, 0.0, 2.0, 3.0])
+    tree.update([4], 4.0)
+    assert tree.total() == 10.0
+    assert tree.get([2, 4]).tolist() == [2.0, 4.0]
+    # Somas acumuladas: [0, 1) -> 0, [1, 3) -> 2, [3, 6) -> 3, [6, 10) -> 4
+    assert tree.find([0.0, 0.99, 1.0, 2.99, 3.0, 5.99, 6.0, 9.99]).tolist() == [0, 0, 2, 2, 3, 3, 4, 4]
+
+
+def test_sum_tree_samples_in_proportion_to_priority():
+    rng = np.random.default_rng(0)
+    priorities = rng.random(37)
+    tree = SumTree(37)
+    tree.update(np.arange(37), priorities)
+    assert np.isclose(tree.total(), priorities.sum())
+    counts = np.bincount(tree.find(rng.random(200000) * tree.total()), minlength=37)
+    assert np.allclose(counts / counts.sum(), priorities / priorities.sum(), atol=0.003)
+
+
+def test_prioritized_buffer_weights_and_priority_updates():
+    buffer = PrioritizedReplayBuffer(capacity=1000, alpha=0.5, beta=0.4, beta_increment=0.0, device="cpu", seed=0)
+    buffer.insert_many(*_transitions(0, 1000))
+    # Transições novas entram com a prioridade máxima: amostragem uniforme e pesos 1
+    *_, weights, indices = buffer.sample(10)
+    assert torch.equal(weights, torch.ones(10, 1))
+
+    td_errors = np.arange(1000, dtype=np.float64)
+    buffer.update_priorities(np.arange(1000), td_errors)
+    priorities = (td_errors + buffer.epsilon) ** 0.5
+    assert np.allclose(buffer.priorities.get(np.arange(1000)), priorities)
+    states, actions, rewards, dones, next_states, weights, indices = buffer.sample(50)
+    # Os campos amostrados são os das posições devolvidas
+    assert torch.equal(rewards.view(-1), torch.from_numpy(indices).float())
+    probabilities = priorities[indices] / priorities.sum()
+    expected = (1000 * probabilities) ** -0.4
+    assert np.allclose(weights.view(-1).numpy(), expected / expected.max(), rtol=1e-5)
+    # Amostragem estratificada: uma posição por fatia do total, em ordem
+    assert (np.diff(indices) >= 0).all()
+    # Com prioridade proporcional à raiz do índice, a média amostrada fica perto de 600
+    assert 550 < np.mean([buffer.sample(50)[-1].mean() for _ in range(20)]) < 650
+
+
+def test_seeded_prioritized_buffers_do_not_use_the_global_numpy_state():
+    def sample(seed, numpy_seed):
+        buffer = PrioritizedReplayBuffer(capacity=1000, device="cpu", seed=seed)
+        buffer.insert_many(*_transitions(0, 1000))
+        buffer.update_priorities(np.arange(1000), np.arange(1000, dtype=np.float64))
+        np.random.seed(numpy_seed)
+        return [buffer.sample(32)[-1].tolist() for _ in range(3)]
+
+    assert sample(5, 0) == sample(5, 1)
+    assert sample(5, 0) != sample(6, 0)
@@ -0,0 +1,86 @@
+# Testes da loja de checkpoints
+import functools
+
+import pytest
+import torch
+from torch import nn
+
+from truco_checkpoints import CheckpointStore
+from truco_env import TrucoMineiroEnv
+from truco_players import LearningPlayer, RandomBotPlayer
+from truco_pool import RatedPlayerPool
+from truco_trainer import VectorDQLTrainer, default_q_network
+from truco_vector_env import SyncTrucoVectorEnv
+
+
+def _learner_env_fn():
+    teams = [[LearningPlayer("learner")], [RandomBotPlayer("random")]]
+    return functools.partial(TrucoMineiroEnv, num_players=2, teams=teams, flat_obs=True)
+
+
+def _perturb(network):
+    with torch.no_grad():
+        for param in network.parameters():
+            param.add_(1)
+
+
+def test_checkpoint_store_reopens_with_weights_and_ratings(tmp_path):
+    network = default_q_network()
+    store = CheckpointStore(tmp_path / "store")
+    store.append("first", network, episode=10, rating=1010)
+    _perturb(network)
+    store.append("second", network, episode=20, rating=990)
+
+    reopened = CheckpointStore(tmp_path / "store", network_fn=default_q_network)
+    assert reopened.names() == ["first", "second"]
+    for key, value in reopened.load("second").state_dict().items():
+        assert torch.equal(value.cpu(), network.state_dict()[key].cpu())
+    pool = RatedPlayerPool.from_store(reopened, capacity=5)
+    assert [snapshot["rating"] for snapshot in pool.snapshots] == [1010, 990]
+    assert pool.last_episode == 20
+
+
+def test_checkpoint_store_rebuilds_networks_without_pickles(tmp_path):
+    network = default_q_network()
+    store = CheckpointStore(tmp_path / "store")
+    store.append("first", network, episode=10)
+    # Só os pesos e o índice (com o layout do state_dict) vão para o disco
+    assert sorted(path.name for path in (tmp_path / "store").iterdir()) == ["index.json", "weights.bin"]
+
+    reopened = CheckpointStore(tmp_path / "store")
+    assert reopened.names() == ["first"]
+    with pytest.raises(ValueError):
+        reopened.load("first")
+    with pytest.raises(ValueError):
+        CheckpointStore(tmp_path / "store", network_fn=lambda: nn.Sequential(nn.Linear(24, 6)))
+
+
+def test_checkpoint_store_float16_and_live_networks(tmp_path):
+    network = default_q_network()
+    store = CheckpointStore(tmp_path / "store", dtype="float16", max_live=2)
+    for i in range(4):
+        store.append(f"snapshot {i}", network)
+        _perturb(network)
+    loaded = store.load("snapshot 3")
+    for key, value in loaded.state_dict().items():
+        assert torch.allclose(value.cpu(), network.state_dict()[key].cpu() - 1, atol=1e-2)
+    assert store.load("snapshot 3") is loaded
+    store.load("snapshot 0")
+    store.load("snapshot 1")
+    assert list(store._live) == ["snapshot 0", "snapshot 1"]
+
+    with pytest.raises(ValueError):
+        store.append("snapshot 0", network)
+    with pytest.raises(ValueError):
+        CheckpointStore(tmp_path / "store", dtype="float32")
+
+
+def test_trainer_continues_snapshot_names_in_an_existing_store(tmp_path):
+    # Duas execuções seguidas na mesma loja (como depois de reiniciar o processo)
+    for run in range(2):
+        pool = RatedPlayerPool.from_store(CheckpointStore(tmp_path / "store", network_fn=default_q_network), capacity=5)
+        with SyncTrucoVectorEnv(_learner_env_fn(), 4) as vector_env:
+            trainer = VectorDQLTrainer(vector_env, player_pool=pool, copy_period=5, change_period=5, seed=0)
+            trainer.run(12, progress=False)
+    names = CheckpointStore(tmp_path / "store").names()
+    assert len(names) == len(set(names)) >= 4
@@ -0,0 +1,28 @@
+# Testes da codificação inteira das cartas
+import numpy as np
+
+from truco_encoding import CARD_IDS, CARD_NAMES, CARD_POINTS, NO_CARD, NUM_CARDS, card_name
+
+
+def test_card_ids_sort_like_card_names():
+    rng = np.random.default_rng(0)
+    for _ in range(100):
+        hand = rng.choice(NUM_CARDS, 3, replace=False)
+        names = sorted(card_name(card) for card in hand)
+        assert [card_name(card) for card in np.sort(hand)] == names
+    # A carta jogada fica no fim da mão ordenada, como o 'x' entre os nomes
+    assert np.sort([NO_CARD, 5, 0]).tolist()[-1] == NO_CARD
+    assert card_name(NO_CARD) == 'x'
+    assert all(CARD_IDS[name] == card for card, name in enumerate(CARD_NAMES))
+
+
+def test_card_points():
+    assert CARD_POINTS[CARD_IDS['clubs_4']] == 14
+    assert CARD_POINTS[CARD_IDS['hearts_7']] == 13
+    assert CARD_POINTS[CARD_IDS['spades_ace']] == 12
+    assert CARD_POINTS[CARD_IDS['diamonds_7']] == 11
+    assert CARD_POINTS[CARD_IDS['hearts_3']] == 10
+    assert CARD_POINTS[CARD_IDS['spades_4']] == 1
+    assert CARD_POINTS[NO_CARD] == 0
+    # Cada manilha sai do seu valor comum (4, 7, 7 e ás)
+    assert np.bincount(CARD_POINTS[:NUM_CARDS], minlength=15).tolist() == [0, 3, 4, 4, 2, 4, 4, 4, 3, 4, 4, 1, 1, 1, 1]
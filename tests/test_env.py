@@ -0,0 +1,211 @@
+# Testes do TrucoMineiroEnv
+import numpy as np
+import pytest
+
+from truco_encoding import MASK_ACTIONS, NO_CARD, STATE_DIMS, flatten_obs
+from truco_env import TrucoMineiroEnv
+from truco_players import LearningPlayer, NonLearningPlayer, RandomBotPlayer
+
+
+def _bot_env(**kwargs):
+    return TrucoMineiroEnv(2, [[RandomBotPlayer("a")], [RandomBotPlayer("b")]], **kwargs)
+
+
+def _play_random(env, steps, seed=0, on_step=None):
+    # Ações aleatórias válidas de quem está na vez, com as rodadas reiniciadas no fim
+    rng = np.random.default_rng(seed)
+    obs, info = env.reset()
+    for _ in range(steps):
+        if on_step is not None:
+            on_step(env, obs, info)
+        valid_actions = info["valid_actions"]
+        obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+        if info["round_ended"]:
+            obs, info = env.reset(reset_score=done)
+
+
+def test_flat_obs_matches_the_dict_obs():
+    buffer = np.zeros(STATE_DIMS, dtype=np.float32)
+    env = _bot_env(obs_buffer=buffer)
+
+    def check(env, obs, info):
+        # O vetor é escrito no buffer de quem chama
+        assert obs is buffer
+        env.flat_obs = False
+        expected = flatten_obs(env._get_obs())
+        env.flat_obs = True
+        assert np.array_equal(obs, expected)
+
+    _play_random(env, 500, on_step=check)
+
+
+def test_obs_buffer_must_be_a_float32_state_vector():
+    with pytest.raises(ValueError):
+        _bot_env(obs_buffer=np.zeros(STATE_DIMS, dtype=np.float64))
+    with pytest.raises(ValueError):
+        _bot_env(obs_buffer=np.zeros(STATE_DIMS + 1, dtype=np.float32))
+
+
+def test_action_mask_follows_the_hand_and_the_bet():
+    def check(env, obs, info):
+        player = env.current_player_index
+        if env.respond:
+            expected = [4, 5]
+        else:
+            expected = [i for i in range(3) if env.cards[player][i] != NO_CARD] + [3] * env.trucable[player]
+        assert list(info["valid_actions"]) == expected
+        assert MASK_ACTIONS[info["action_mask"]] == info["valid_actions"]
+        assert np.flatnonzero(info["valid_mask"]).tolist() == expected
+
+    _play_random(_bot_env(), 500, on_step=check)
+
+
+def test_step_reports_reward_and_victory_for_the_learning_team():
+    for num_players in (2, 4):
+        for learning_team in (0, 1):
+            half = num_players // 2
+            teams = [[RandomBotPlayer(f"{side}{i}") for i in range(half)] for side in "ab"]
+            teams[learning_team][-1] = LearningPlayer("learner")
+            env = TrucoMineiroEnv(num_players, teams, seed=learning_team)
+            rng = np.random.default_rng(0)
+            obs, info = env.reset()
+            games = victories = wins = 0
+            while games < 20:
+                before = env.game_score[learning_team] - env.game_score[1 - learning_team]
+                # No 2v2, resultado das rodadas que os outros terminaram antes da vez do
+                # jogador que aprende, somado ao próximo passo
+                pending_reward, pending_done, pending_victory = env.pending_reward, env.pending_done, env.pending_victory
+                valid_actions = info["valid_actions"]
+                obs, reward, done, info = env.step(valid_actions[int(rng.integers(len(valid_actions)))])
+                if pending_done:
+                    assert done and info["victory"] == pending_victory
+                    games += 1
+                    victories += info["victory"]
+                    wins += pending_victory
+                    obs, info = env.reset()
+                    continue
+                if not info["round_ended"]:
+                    assert reward == pending_reward and not info["victory"]
+                    continue
+                # A recompensa é a variação do placar do time que aprende contra o outro
+                assert reward - pending_reward == env.game_score[learning_team] - env.game_score[1 - learning_team] - before
+                assert info["victory"] == (done and env.game_winner() == learning_team)
+                if done:
+                    games += 1
+                    victories += info["victory"]
+                    wins += env.game_winner() == learning_team
+                obs, info = env.reset(reset_score=done)
+            assert 0 < victories == wins < games
+
+
+class _ScriptedPlayer(NonLearningPlayer):
+    # Pede truco sempre que pode e aceita (call=True) ou recusa todos os pedidos; senão joga
+    # a primeira carta
+    def __init__(self, name, call):
+        super().__init__(name)
+        self.call = call
+
+    def choose_action(self, obs, info):
+        valid_actions = list(info["valid_actions"])
+        if 4 in valid_actions:
+            return 4 if self.call else 5
+        return 3 if self.call and 3 in valid_actions else valid_actions[0]
+
+
+def _skipping_env(**kwargs):
+    # Quando o assento 1 começa a rodada, ele pede truco e o parceiro do jogador que aprende
+    # (assento 2) recusa: a rodada acaba antes da vez do assento 0
+    teams = [
+        [LearningPlayer("learner"), _ScriptedPlayer("folder", call=False)],
+        [_ScriptedPlayer("caller", call=True), RandomBotPlayer("random")],
+    ]
+    return TrucoMineiroEnv(4, teams, **kwargs)
+
+
+def _round_results(env):
+    # Saldo de pontos do time 0 e jogos terminados, contados em todas as rodadas do env
+    totals = {"balance": 0, "games": 0}
+    handle_action = env.handle_action
+
+    def counting_handle_action(action):
+        obs, reward, done, info = handle_action(action)
+        if info["round_ended"]:
+            totals["balance"] += reward if env.last_player_index % 2 == 0 else -reward
+            totals["games"] += done
+        return obs, reward, done, info
+
+    env.handle_action = counting_handle_action
+    return totals
+
+
+def test_rounds_ended_before_the_learner_plays_are_not_lost():
+    env = _skipping_env(seed=0)
+    totals = _round_results(env)
+    rng = np.random.default_rng(0)
+    obs, info = env.reset()
+    total_reward = games = deferred = 0
+    for _ in range(3000):
+        valid_actions = info["valid_actions"]
+        obs, reward, done, info = env.step(valid_actions[int(rng.integers(len(valid_actions)))])
+        total_reward += reward
+        games += done
+        # Resultado entregue fora do fim de uma rodada: veio de uma rodada que os outros
+        # terminaram logo depois do reset
+        deferred += reward != 0 and not info["round_ended"]
+        if info["round_ended"] or done:
+            obs, info = env.reset(reset_score=done)
+    assert deferred > 0
+    assert total_reward + env.pending_reward == totals["balance"]
+    assert games + env.pending_done == totals["games"] > 0
+
+
+def test_seeded_envs_replay_the_same_games():
+    def trajectory(seed):
+        env = _bot_env(flat_obs=True, seed=seed)
+        obs, info = env.reset()
+        steps = []
+        for _ in range(300):
+            # Os bots sorteiam com os geradores semeados pelo env
+            action = env.players[env.current_player_index].choose_action(obs, info)
+            obs, reward, done, info = env.handle_action(action)
+            steps.append((action, reward, obs.tobytes()))
+            if info["round_ended"]:
+                obs, info = env.reset(reset_score=done)
+        return steps
+
+    assert trajectory(7) == trajectory(7)
+    assert trajectory(7) != trajectory(8)
+
+
+def _finish_round(env, seed):
+    # Joga ações aleatórias até o fim da rodada e retorna o que cada passo devolveu
+    rng = np.random.default_rng(seed)
+    results = []
+    while True:
+        valid_actions = env._determine_valid_actions()
+        obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+        results.append((obs.tolist(), reward, done))
+        if info["round_ended"]:
+            return results
+
+
+def test_set_state_restores_the_game_exactly():
+    for num_players in (2, 4):
+        half = num_players // 2
+        teams = [[RandomBotPlayer(f"{side}{i}") for i in range(half)] for side in "ab"]
+        env = TrucoMineiroEnv(num_players, teams, flat_obs=True, seed=num_players)
+        rng = np.random.default_rng(0)
+        obs, info = env.reset()
+        for _ in range(200):
+            saved, before = env.get_state(), obs.copy()
+            # Termina a rodada, volta ao estado salvo e termina de novo: o mesmo jogo
+            seed = int(rng.integers(1 << 31))
+            played = _finish_round(env, seed)
+            env.set_state(saved)
+            assert np.array_equal(env._get_obs(), before)
+            assert _finish_round(env, seed) == played
+            env.set_state(saved)
+            valid_actions = env._determine_valid_actions()
+            obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+            if info["round_ended"]:
+                obs, info = env.reset(reset_score=done)
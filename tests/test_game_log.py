@@ -0,0 +1,92 @@
+# Testes do log de partidas
+import numpy as np
+
+from truco_buffers import ReplayBuffer
+from truco_env import TrucoMineiroEnv
+from truco_game_log import GameLogReader, GameLogWriter
+from truco_players import RandomBotPlayer
+
+
+def _bot_env(num_players, seed=0):
+    half = num_players // 2
+    teams = [[RandomBotPlayer(f"{side}{i}") for i in range(half)] for side in "ab"]
+    return TrucoMineiroEnv(num_players, teams, flat_obs=True, seed=seed)
+
+
+def _log_games(writer, env, num_games, seed=0):
+    # Joga num_games partidas aleatórias com o writer ligado ao env; retorna as decisões
+    # e o saldo (pontos do time 0 menos os do time 1) de todas as rodadas
+    rng = np.random.default_rng(seed)
+    logged = []
+    score_balance = 0
+    env.logger = writer
+    obs, info = env.reset()
+    games = 0
+    while games < num_games:
+        valid_actions = info["valid_actions"]
+        action = valid_actions[int(rng.integers(len(valid_actions)))]
+        state, seat = obs.copy(), env.current_player_index
+        obs, reward, done, info = env.handle_action(action)
+        logged.append((state, action, reward, done))
+        if info["round_ended"]:
+            score_balance += reward if seat % 2 == 0 else -reward
+            games += done
+            obs, info = env.reset(reset_score=done)
+    env.logger = None
+    return logged, score_balance
+
+
+def test_game_log_round_trip(tmp_path):
+    env = _bot_env(2)
+    with GameLogWriter(tmp_path / "log", chunk_size=50) as writer:
+        logged, score_balance = _log_games(writer, env, 5)
+
+    reader = GameLogReader(tmp_path / "log")
+    assert len(reader) == len(logged) and len(reader.shards) > 1
+    # O reset depois da última partida já abre a próxima
+    assert reader.num_games == 6 and reader.players == ["a0", "b0"]
+    data = {name: np.concatenate([batch[name] for batch in reader.batches(batch_size=32)]) for name in ("state", "action", "reward", "done")}
+    states, actions, rewards, dones = map(np.array, zip(*logged))
+    assert np.array_equal(data["state"], states)
+    assert np.array_equal(data["action"], actions)
+    assert np.array_equal(data["reward"], rewards)
+    assert np.array_equal(data["done"], dones)
+
+    # Todas as partidas terminam no log: cada decisão vira uma transição
+    transitions = list(reader.transitions(batch_size=64))
+    assert sum(len(batch[0]) for batch in transitions) == len(logged)
+    assert all(len(batch[0]) == 64 for batch in transitions[:-1])
+    # No 1v1 os dois assentos jogam em toda rodada: um done por assento por partida e as
+    # recompensas dos dois somam zero
+    seat_rewards = []
+    for player in ("a0", "b0"):
+        _, _, rewards, dones, _ = map(np.concatenate, zip(*reader.transitions(batch_size=64, player=player)))
+        assert dones.sum() == 5
+        seat_rewards.append(rewards.sum())
+    assert seat_rewards[0] == score_balance == -seat_rewards[1]
+
+
+def test_game_log_with_teams_and_reopened_writer(tmp_path):
+    env = _bot_env(4)
+    with GameLogWriter(tmp_path / "log", chunk_size=64) as writer:
+        first, first_balance = _log_games(writer, env, 3)
+    # Reaberto, o writer continua o mesmo log com novos ids de partida
+    with GameLogWriter(tmp_path / "log", chunk_size=64) as writer:
+        second, second_balance = _log_games(writer, env, 3, seed=1)
+
+    reader = GameLogReader(tmp_path / "log")
+    assert len(reader) == len(first) + len(second) and reader.num_games == 8
+    data = {name: np.concatenate([batch[name] for batch in reader.batches()]) for name in ("reward", "seat", "game", "done")}
+    assert len(np.unique(data["game"])) == 6 and data["done"].sum() == 6
+    # Recompensa de cada decisão para o time de quem jogou: o saldo do time 0 fecha
+    sign = np.where(data["seat"] % 2 == 0, 1, -1)
+    assert (data["reward"] * sign).sum() == first_balance + second_balance
+
+    # Cada assento termina cada partida no máximo uma vez
+    for player in reader.players:
+        _, _, _, dones, _ = map(np.concatenate, zip(*reader.transitions(player=player)))
+        assert 0 < dones.sum() <= 6
+
+    buffer = ReplayBuffer(capacity=1000)
+    assert reader.prefill(buffer, max_transitions=100) == 100
+    assert len(buffer) == 100
@@ -0,0 +1,68 @@
+# Testes do índice de força das mãos
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from truco_encoding import NUM_CARDS
+from truco_hand_strength import (
+    NUM_HANDS, HandStrengthIndex, all_hands, build_hand_strength, hand_index, hand_indices,
+)
+from truco_solver import RoundSolver
+
+
+@pytest.fixture(scope="module")
+def index_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("strength") / "hand_strength.npy"
+    build_hand_strength(path)
+    return path
+
+
+def test_hand_indices_enumerate_all_hands():
+    hands = all_hands()
+    assert hands.shape == (NUM_HANDS, 3)
+    assert np.array_equal(hand_indices(hands), np.arange(NUM_HANDS))
+    rng = np.random.default_rng(0)
+    for hand in hands[rng.choice(NUM_HANDS, 50)]:
+        assert hand_index(rng.permutation(hand)) == hand_index(hand) == hand_indices(hand[None])[0]
+
+
+def test_index_matches_direct_enumeration(index_path):
+    index = HandStrengthIndex(index_path)
+    solver = RoundSolver()
+    rng = np.random.default_rng(0)
+    for hand in all_hands()[rng.choice(NUM_HANDS, 4, replace=False)].tolist():
+        rest = [card for card in range(NUM_CARDS) if card not in hand]
+        others = list(combinations(rest, 3))
+        starter = np.mean([solver.outcome(hand, other) == 1 for other in others])
+        responder = np.mean([solver.outcome(other, hand) == -1 for other in others])
+        assert index.win_probability(hand) == pytest.approx(starter, abs=1e-6)
+        assert index.win_probability(hand, starter=False) == pytest.approx(responder, abs=1e-6)
+        assert np.allclose(index[hand], [starter, responder])
+
+
+def test_index_rejects_files_of_the_wrong_shape(tmp_path):
+    np.save(tmp_path / "bad.npy", np.zeros((10, 2), dtype=np.float32))
+    with pytest.raises(ValueError):
+        HandStrengthIndex(tmp_path / "bad.npy")
+
+
+def test_build_writes_the_index_atomically(tmp_path, monkeypatch):
+    path = tmp_path / "cache" / "hand_strength.npy"
+    with pytest.raises(FileNotFoundError):
+        HandStrengthIndex(path, build=False)
+
+    # Uma falha no meio da gravação não deixa arquivo pela metade nem temporários
+    def failing_save(f, array):
+        f.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(np, "save", failing_save)
+    with pytest.raises(OSError):
+        build_hand_strength(path)
+    assert list(path.parent.iterdir()) == []
+    monkeypatch.undo()
+
+    index = build_hand_strength(path)
+    assert list(path.parent.iterdir()) == [path]
+    assert np.array_equal(HandStrengthIndex(path, build=False).table, index)
@@ -0,0 +1,68 @@
+# Testes dos backends de inferência da rede Q
+import numpy as np
+import pytest
+import torch
+from torch import nn
+
+from truco_env import TrucoMineiroEnv
+from truco_inference import INFERENCE_BACKENDS, compile_q_network
+from truco_players import RandomBotPlayer
+
+
+def _network():
+    torch.manual_seed(0)
+    return nn.Sequential(nn.Linear(24, 64), nn.ReLU(), nn.Linear(64, 64), nn.ReLU(), nn.Linear(64, 6))
+
+
+def _random_states(num_states, seed=0):
+    # Estados e máscaras de ações válidas visitados em jogos aleatórios
+    env = TrucoMineiroEnv(2, [[RandomBotPlayer("a")], [RandomBotPlayer("b")]], flat_obs=True, seed=seed)
+    rng = np.random.default_rng(seed)
+    states, masks = [], []
+    obs, info = env.reset()
+    while len(states) < num_states:
+        states.append(obs.copy())
+        masks.append(info["valid_mask"].copy())
+        valid_actions = info["valid_actions"]
+        obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+        if info["round_ended"]:
+            obs, info = env.reset(reset_score=done)
+    return np.array(states), np.array(masks)
+
+
+def _torch_actions(network, states, masks):
+    with torch.no_grad():
+        values = network(torch.from_numpy(states))
+    return values.masked_fill(~torch.from_numpy(masks), float("-inf")).argmax(dim=1).numpy()
+
+
+@pytest.mark.parametrize("backend", list(INFERENCE_BACKENDS))
+def test_backends_match_the_torch_network(backend):
+    network = _network()
+    compiled = compile_q_network(network, backend)
+    states, masks = _random_states(300)
+    with torch.no_grad():
+        expected = network(torch.from_numpy(states)).numpy()
+    assert np.allclose(compiled(states), expected, atol=1e-5)
+    actions = compiled.act_batch(states, masks)
+    assert np.array_equal(actions, _torch_actions(network, states, masks))
+    assert [compiled.act(state, mask) for state, mask in zip(states, masks)] == actions.tolist()
+
+
+@pytest.mark.parametrize("backend", list(INFERENCE_BACKENDS))
+def test_backends_follow_the_training_updates(backend):
+    network = _network()
+    compiled = compile_q_network(network, backend)
+    states, masks = _random_states(50, seed=1)
+    optimizer = torch.optim.SGD(network.parameters(), lr=0.5)
+    network(torch.from_numpy(states)).sum().backward()
+    optimizer.step()
+    compiled.refresh()
+    assert np.array_equal(compiled.act_batch(states, masks), _torch_actions(network, states, masks))
+
+
+def test_compile_rejects_unknown_backends_and_layers():
+    with pytest.raises(ValueError):
+        compile_q_network(_network(), "onnx")
+    with pytest.raises(ValueError):
+        compile_q_network(nn.Sequential(nn.Linear(24, 6), nn.Tanh()), "numpy")
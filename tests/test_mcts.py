@@ -0,0 +1,51 @@
+# Testes do jogador IS-MCTS
+import pytest
+
+from truco_env import TrucoMineiroEnv
+from truco_mcts import ISMCTSPlayer
+from truco_players import RandomBotPlayer
+
+
+def _mcts_env(num_players, player, seed=0):
+    half = num_players // 2
+    teams = [[RandomBotPlayer(f"{side}{i}") for i in range(half)] for side in "ab"]
+    teams[0][0] = player
+    return TrucoMineiroEnv(num_players, teams, seed=seed)
+
+
+def test_mcts_plays_legal_actions():
+    for num_players in (2, 4):
+        player = ISMCTSPlayer("mcts", iterations=30)
+        player.seed(num_players)
+        env = _mcts_env(num_players, player, seed=num_players)
+        decisions = 0
+        obs, info = env.reset()
+        for _ in range(300):
+            current = env.players[env.current_player_index]
+            action = current.choose_action(obs, info)
+            assert action in info["valid_actions"]
+            decisions += current is player and len(info["valid_actions"]) > 1
+            obs, reward, done, info = env.handle_action(action)
+            if info["round_ended"]:
+                obs, info = env.reset(reset_score=done)
+        assert decisions > 0 and player.last_iterations == 30
+
+
+def test_mcts_search_is_reproducible_with_a_seed():
+    player = ISMCTSPlayer("mcts", iterations=50)
+    env = _mcts_env(2, player)
+    obs, info = env.reset()
+    while len(info["valid_actions"]) == 1:
+        obs, info = env.reset()
+    choices = []
+    for _ in range(2):
+        player.seed(0)
+        root = player.search(obs, info)
+        choices.append({move: child.visits for move, child in root.children.items()})
+        assert root.visits == 50
+    assert choices[0] == choices[1]
+
+
+def test_mcts_needs_a_budget():
+    with pytest.raises(ValueError):
+        ISMCTSPlayer("mcts", iterations=None)
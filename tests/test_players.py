@@ -0,0 +1,82 @@
+# Testes dos jogadores
+import numpy as np
+import pytest
+import torch
+from torch import nn
+
+from truco_encoding import valid_actions_mask
+from truco_env import TrucoMineiroEnv
+from truco_hand_strength import HandStrengthIndex, build_hand_strength
+from truco_heuristic_players import BluffingBotPlayer, GreedyBotPlayer, ThresholdBotPlayer
+from truco_players import NetworkBotPlayer, RandomBotPlayer
+
+
+def _network():
+    torch.manual_seed(0)
+    return nn.Sequential(nn.Linear(24, 32), nn.ReLU(), nn.Linear(32, 6))
+
+
+def _random_states(num_states, seed=0):
+    # Estados e máscaras de ações válidas visitados em jogos aleatórios
+    env = TrucoMineiroEnv(2, [[RandomBotPlayer("a")], [RandomBotPlayer("b")]], flat_obs=True)
+    rng = np.random.default_rng(seed)
+    states, masks = [], []
+    obs, info = env.reset()
+    while len(states) < num_states:
+        states.append(obs.copy())
+        masks.append(info["valid_mask"].copy())
+        valid_actions = info["valid_actions"]
+        obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+        if info["round_ended"]:
+            obs, info = env.reset(reset_score=done)
+    return np.array(states), np.array(masks)
+
+
+def test_network_bot_batched_actions_match_single_decisions():
+    player = NetworkBotPlayer("network", _network())
+    states, masks = _random_states(200)
+    assert np.array_equal(valid_actions_mask(torch.from_numpy(states)).numpy(), masks)
+    actions = player.choose_actions(states, masks)
+    assert actions.tolist() == [player.choose_action(state, None) for state in states]
+    assert masks[np.arange(len(states)), actions].all()
+
+
+@pytest.fixture(scope="module")
+def strength_index(tmp_path_factory):
+    path = tmp_path_factory.mktemp("strength") / "hand_strength.npy"
+    build_hand_strength(path)
+    return HandStrengthIndex(path)
+
+
+def _heuristic_players(strength_index):
+    return [
+        GreedyBotPlayer("greedy"),
+        GreedyBotPlayer("cautious", lead_strongest=False, accept_truco=False),
+        ThresholdBotPlayer("threshold", strength_index=strength_index),
+        BluffingBotPlayer("bluff", bluff_probability=0.0, strength_index=strength_index),
+    ]
+
+
+def test_heuristic_bots_batched_actions_match_single_decisions(strength_index):
+    states, masks = _random_states(300, seed=1)
+    for player in _heuristic_players(strength_index):
+        actions = player.choose_actions(states, masks)
+        single = [player.choose_action(state, {"valid_actions": np.flatnonzero(mask)}) for state, mask in zip(states, masks)]
+        assert actions.tolist() == single, player.name
+        assert masks[np.arange(len(states)), actions].all(), player.name
+
+
+def test_heuristic_bots_play_legal_actions(strength_index):
+    bluff = BluffingBotPlayer("bluff", bluff_probability=0.5, strength_index=strength_index)
+    players = _heuristic_players(strength_index) + [bluff]
+    for i, player in enumerate(players):
+        other = players[(i + 1) % len(players)]
+        env = TrucoMineiroEnv(2, [[player], [other]])
+        obs, info = env.reset()
+        for _ in range(300):
+            current = env.players[env.current_player_index]
+            action = current.choose_action(obs, info)
+            assert action in info["valid_actions"], current.name
+            obs, reward, done, info = env.handle_action(action)
+            if info["round_ended"]:
+                obs, info = env.reset(reset_score=done)
@@ -0,0 +1,72 @@
+# Testes do pool de oponentes com rating Elo
+import numpy as np
+import pytest
+import torch
+from torch import nn
+
+from truco_pool import RatedPlayerPool, elo_expected
+
+
+def _network(seed=0):
+    torch.manual_seed(seed)
+    return nn.Sequential(nn.Linear(24, 16), nn.ReLU(), nn.Linear(16, 6))
+
+
+def test_elo_expected():
+    assert elo_expected(1000, 1000) == 0.5
+    assert elo_expected(1400, 1000) == pytest.approx(10 / 11)
+    assert elo_expected(1200, 1000) + elo_expected(1000, 1200) == pytest.approx(1)
+
+
+def test_report_moves_ratings_between_learner_and_opponents():
+    pool = RatedPlayerPool(k=32)
+    for i in range(3):
+        pool.register(f"snapshot {i}", _network(i))
+    opponents = pool.players()[:2]
+    total = pool.learner_rating + sum(rating for _, rating, _ in pool.ratings())
+    pool.report(opponents, victory=True)
+    # Cada resultado passa k * (1 - 0.5) pontos do oponente para o jogador que aprende
+    assert pool.learner_rating > 1000
+    assert pool.learner_rating + sum(rating for _, rating, _ in pool.ratings()) == pytest.approx(total)
+    assert [snapshot["games"] for snapshot in pool.snapshots] == [1, 1, 0]
+    # Oponentes que já saíram do pool não contam
+    pool.snapshots.pop(0)
+    rating = pool.learner_rating
+    pool.report(opponents[:1], victory=False)
+    assert pool.learner_rating == rating
+
+
+def test_pfsp_weights_prefer_harder_opponents_and_pruning_drops_the_weakest():
+    pool = RatedPlayerPool(capacity=3, exponent=2)
+    for i in range(3):
+        pool.register(f"snapshot {i}", _network(i))
+    for snapshot, rating in zip(pool.snapshots, (900, 1000, 1100)):
+        snapshot["rating"] = rating
+    weights = pool.weights()
+    assert weights.sum() == pytest.approx(1) and (np.diff(weights) > 0).all()
+    pool.register("snapshot 3", _network(3))
+    assert [snapshot["name"] for snapshot in pool.snapshots] == ["snapshot 1", "snapshot 2", "snapshot 3"]
+
+
+def test_sampled_players_carry_the_snapshot_weights():
+    pool = RatedPlayerPool()
+    network = _network(1)
+    pool.register("snapshot", network)
+    with torch.no_grad():
+        network[0].weight.add_(1)
+    player, = pool.sample(1)
+    assert player.name == "snapshot"
+    assert not torch.equal(player.network[0].weight.cpu(), network[0].weight)
+    assert torch.equal(player.network[2].weight.cpu(), network[2].weight)
+
+
+def test_seeded_pools_do_not_use_the_global_numpy_state():
+    def sample(seed, numpy_seed):
+        pool = RatedPlayerPool(exponent=0, seed=seed)
+        for i in range(5):
+            pool.register(f"snapshot {i}", _network(i))
+        np.random.seed(numpy_seed)
+        return [player.name for player in pool.sample(20)]
+
+    assert sample(5, 0) == sample(5, 1)
+    assert sample(5, 0) != sample(6, 0)
@@ -0,0 +1,47 @@
+# Testes da instrumentação
+import csv
+import json
+
+import numpy as np
+
+from truco_env import TrucoMineiroEnv
+from truco_players import LearningPlayer, RandomBotPlayer
+from truco_profiling import Profiler, cprofile
+
+
+def test_profiler_counts_env_events(tmp_path):
+    env = TrucoMineiroEnv(2, [[LearningPlayer("learner")], [RandomBotPlayer("random")]])
+    env.profiler = profiler = Profiler()
+    rng = np.random.default_rng(0)
+    obs, info = env.reset()
+    steps = rounds = games = 0
+    while games < 3:
+        valid_actions = info["valid_actions"]
+        obs, reward, done, info = env.step(valid_actions[int(rng.integers(len(valid_actions)))])
+        steps += 1
+        if info["round_ended"]:
+            rounds += 1
+            games += done
+            obs, info = env.reset(reset_score=done)
+
+    summary = profiler.summary()
+    counters = {name: counter["count"] for name, counter in summary["counters"].items()}
+    assert counters["env.steps"] == steps
+    assert counters["env.rounds"] == rounds
+    assert counters["env.games"] == 3
+    assert counters["env.resets"] == rounds + 1
+    # Cada step passa pelo handle_action do jogador que aprende
+    assert summary["timers"]["env.handle_action"]["calls"] >= steps
+    assert summary["timers"]["opponent.choose_action"]["calls"] > 0
+
+    profiler.to_json(tmp_path / "profile.json")
+    assert json.load(open(tmp_path / "profile.json"))["counters"]["env.games"]["count"] == 3
+    profiler.to_csv(tmp_path / "profile.csv")
+    rows = list(csv.DictReader(open(tmp_path / "profile.csv")))
+    assert {row["name"] for row in rows} == set(summary["timers"]) | set(summary["counters"])
+
+
+def test_cprofile_saves_stats(tmp_path):
+    with cprofile(tmp_path / "run.prof"):
+        sum(range(1000))
+    assert (tmp_path / "run.prof").stat().st_size > 0
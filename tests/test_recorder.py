@@ -0,0 +1,71 @@
+# Testes do gravador de episódios
+import numpy as np
+
+from truco_encoding import NO_CARD
+from truco_env import TrucoMineiroEnv
+from truco_players import RandomBotPlayer
+from truco_recorder import EpisodeRecorder
+
+
+def _bot_env(num_players):
+    half = num_players // 2
+    teams = [[RandomBotPlayer(f"{side}{i}") for i in range(half)] for side in "ab"]
+    return TrucoMineiroEnv(num_players, teams)
+
+
+def _play_random(env, steps, on_step, seed=0):
+    # Ações aleatórias válidas de quem está na vez, com as rodadas reiniciadas no fim
+    rng = np.random.default_rng(seed)
+    obs, info = env.reset()
+    for _ in range(steps):
+        on_step(env)
+        valid_actions = info["valid_actions"]
+        obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+        if info["round_ended"]:
+            obs, info = env.reset(reset_score=done)
+
+
+def test_recorder_frames_match_render(tmp_path):
+    for num_players in (2, 4):
+        env = _bot_env(num_players)
+        recorder = EpisodeRecorder(num_players, capacity=4)
+        rendered = []
+
+        def record(env):
+            recorder.record(env)
+            # render devolve uma visão da tela, reescrita no próximo quadro
+            rendered.append(np.array(env.render("rgb_array")))
+
+        _play_random(env, 30, record)
+        frames = [frame.copy() for frame in recorder.frames()]
+        assert len(frames) == len(rendered) == len(recorder)
+        assert all(np.array_equal(frame, expected) for frame, expected in zip(frames, rendered))
+
+        path = tmp_path / f"episode{num_players}.npy"
+        recorder.save(path)
+        loaded = EpisodeRecorder.load(path, num_players)
+        assert all(np.array_equal(frame, expected) for frame, expected in zip(loaded.frames(), rendered))
+        recorder.write_gif(tmp_path / f"episode{num_players}.gif")
+        assert (tmp_path / f"episode{num_players}.gif").stat().st_size > 0
+
+
+def test_recorder_loads_recordings_without_table_cards(tmp_path):
+    env = _bot_env(2)
+    recorder = EpisodeRecorder(2)
+    _play_random(env, 30, recorder.record)
+    records = recorder.records[:len(recorder)]
+    # Formato anterior: as mesmas colunas sem table_cards
+    names = [name for name in records.dtype.names if name != "table_cards"]
+    old = np.zeros(len(records), dtype=[(name, records.dtype.fields[name][0]) for name in names])
+    for name in names:
+        old[name] = records[name]
+    np.save(tmp_path / "old.npy", old)
+    loaded = EpisodeRecorder.load(tmp_path / "old.npy")
+    for name in names:
+        assert np.array_equal(loaded.records[name][:len(records)], records[name])
+    # Sem a coluna, só a carta do outro jogador volta para a mesa
+    rows = np.arange(len(records))
+    table_cards = loaded.records["table_cards"][:len(records)]
+    assert np.array_equal(table_cards[rows, records["other_player"]], records["other_card"])
+    assert (table_cards[rows, records["current_player"]] == NO_CARD).all()
+    assert len(list(loaded.frames())) == len(records)
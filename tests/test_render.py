@@ -0,0 +1,24 @@
+# Testes da renderização
+import numpy as np
+import pygame
+
+from truco_env import TrucoMineiroEnv
+from truco_players import RandomBotPlayer
+from truco_render import SCREEN_HEIGHT, SCREEN_WIDTH, TrucoRenderer
+
+
+def test_cached_render_matches_a_fresh_renderer():
+    env = TrucoMineiroEnv(2, [[RandomBotPlayer("a")], [RandomBotPlayer("b")]])
+    rng = np.random.default_rng(0)
+    obs, info = env.reset()
+    for _ in range(20):
+        frame = env.render("rgb_array")
+        assert frame.shape == (SCREEN_HEIGHT, SCREEN_WIDTH, 3)
+        # O fundo e os sprites em cache não deixam restos do quadro anterior
+        screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        TrucoRenderer(screen).draw(env)
+        assert np.array_equal(frame, np.transpose(pygame.surfarray.array3d(screen), (1, 0, 2)))
+        valid_actions = info["valid_actions"]
+        obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+        if info["round_ended"]:
+            obs, info = env.reset(reset_score=done)
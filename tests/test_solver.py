@@ -0,0 +1,64 @@
+# Testes do solver de rodadas com informação perfeita
+import numpy as np
+
+from truco_encoding import NO_CARD
+from truco_env import TrucoMineiroEnv
+from truco_players import RandomBotPlayer
+from truco_solver import RoundSolver
+
+
+def _brute_force(env, player):
+    # Minimax só com jogadas de cartas, voltando o env ao estado salvo (get_state/set_state)
+    # depois de cada uma: resultado da rodada (1, 0 ou -1) para player
+    saved = env.get_state()
+    values = []
+    for action, card in enumerate(env.cards[env.current_player_index].tolist()):
+        if card == NO_CARD:
+            continue
+        mover = env.current_player_index
+        _, reward, _, info = env.handle_action(action)
+        if info["round_ended"]:
+            values.append(int(np.sign(reward)) * (1 if mover == player else -1))
+        else:
+            values.append(_brute_force(env, player))
+        env.set_state(saved)
+    return max(values) if env.current_player_index == player else min(values)
+
+
+def _random_positions(num_positions, seed=0):
+    # Posições de rodadas em andamento, depois de algumas cartas jogadas ao acaso
+    env = TrucoMineiroEnv(2, [[RandomBotPlayer("a")], [RandomBotPlayer("b")]], seed=seed)
+    rng = np.random.default_rng(seed)
+    for _ in range(num_positions):
+        env.reset()
+        for _ in range(int(rng.integers(5))):
+            cards = [i for i in env._determine_valid_actions() if i < 3]
+            _, _, _, info = env.handle_action(cards[int(rng.integers(len(cards)))])
+            if info["round_ended"]:
+                env.reset()
+        yield env
+
+
+def test_solver_matches_brute_force():
+    solver = RoundSolver()
+    outcomes = set()
+    for env in _random_positions(60):
+        player = env.current_player_index
+        expected = _brute_force(env, player)
+        outcomes.add(expected)
+        assert solver.solve_env(env) == env.current_bet * expected
+        # A melhor carta do solver alcança o valor ótimo
+        saved = env.get_state()
+        _, reward, _, info = env.handle_action(solver.best_action(env))
+        value = int(np.sign(reward)) if info["round_ended"] else _brute_force(env, player)
+        assert value == expected
+        env.set_state(saved)
+    assert {-1, 1} <= outcomes
+    assert solver.cache_info().hits > 0
+
+
+def test_solver_value_scales_with_the_bet():
+    solver = RoundSolver()
+    hand, other_hand = [0, 10, 20], [1, 11, 21]
+    outcome = solver.outcome(hand, other_hand)
+    assert solver.value(hand, other_hand, bet=6) == 6 * outcome
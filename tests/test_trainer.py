@@ -0,0 +1,93 @@
+# Testes do treinador DQL vetorizado
+import functools
+
+import numpy as np
+import pytest
+import torch
+
+from truco_env import TrucoMineiroEnv
+from truco_players import LearningPlayer, RandomBotPlayer
+from truco_pool import RatedPlayerPool
+from truco_trainer import VectorDQLTrainer, masked_max
+from truco_vector_env import SyncTrucoVectorEnv
+
+
+def _learner_env_fn():
+    teams = [[LearningPlayer("learner")], [RandomBotPlayer("random")]]
+    return functools.partial(TrucoMineiroEnv, num_players=2, teams=teams, flat_obs=True)
+
+
+def test_masked_max_ignores_invalid_actions():
+    values = torch.tensor([[1.0, 5.0, 3.0], [2.0, 0.0, 4.0]])
+    mask = torch.tensor([[True, False, True], [False, False, False]])
+    assert masked_max(values, mask).tolist() == [[3.0], [0.0]]
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"prioritized": True, "tau": 0.1}, {"inference_backend": None}])
+def test_trainer_runs_and_updates_the_network(kwargs):
+    with SyncTrucoVectorEnv(_learner_env_fn(), 4) as vector_env:
+        trainer = VectorDQLTrainer(vector_env, batch_size=8, seed=0, **kwargs)
+        before = [param.detach().clone() for param in trainer.Q_network.parameters()]
+        results = trainer.run(10, progress=False)
+    assert len(results["victories"]) == len(results["Returns"]) >= 10
+    assert results["wins"] == results["victories"].sum()
+    assert results["updates"] == len(results["MSE Loss"]) > 0
+    assert np.isfinite(results["MSE Loss"]).all()
+    assert any(not torch.equal(a, b) for a, b in zip(before, trainer.Q_network.parameters()))
+
+
+def test_trainer_registers_snapshots_in_the_pool():
+    pool = RatedPlayerPool(capacity=5)
+    with SyncTrucoVectorEnv(_learner_env_fn(), 4) as vector_env:
+        trainer = VectorDQLTrainer(vector_env, player_pool=pool, copy_period=4, change_period=4, seed=0)
+        trainer.run(40, progress=False)
+    assert len(pool) >= 2
+    # Os jogos contra oponentes sorteados do pool entram nos ratings
+    assert sum(snapshot["games"] for snapshot in pool.snapshots) > 0
+
+
+def test_seeded_trainers_repeat_the_same_run():
+    def run():
+        # A rede inicial sai do estado global do torch; o resto, da semente do treinador
+        torch.manual_seed(0)
+        pool = RatedPlayerPool(capacity=5)
+        with SyncTrucoVectorEnv(_learner_env_fn(), 4) as vector_env:
+            trainer = VectorDQLTrainer(
+                vector_env, player_pool=pool, copy_period=4, change_period=4, batch_size=8, prioritized=True, seed=3,
+            )
+            results = trainer.run(40, progress=False)
+        return results, pool.ratings()
+
+    (first, first_ratings), (second, second_ratings) = run(), run()
+    assert np.array_equal(first["Returns"], second["Returns"])
+    assert np.array_equal(first["MSE Loss"], second["MSE Loss"])
+    assert first_ratings == second_ratings
+
+
+def test_trainer_rates_only_games_started_against_the_current_opponents():
+    pool = RatedPlayerPool(capacity=5)
+    rated = []
+    report = pool.report
+    pool.report = lambda opponents, victory: rated.append(len(opponents)) or report(opponents, victory)
+    with SyncTrucoVectorEnv(_learner_env_fn(), 4) as vector_env:
+        # Jogos terminados depois de cada troca e quantos deles começaram depois dela
+        counts = {"changes": 0, "after": 0, "expected": 0}
+        started = np.zeros(4, dtype=np.int64)
+        set_players, step = vector_env.set_players, vector_env.step
+
+        def counting_set_players(teams):
+            counts["changes"] += 1
+            set_players(teams)
+
+        def counting_step(actions):
+            obs, rewards, dones, info = step(actions)
+            if counts["changes"]:
+                counts["after"] += int(dones.sum())
+                counts["expected"] += int((dones & (started == counts["changes"])).sum())
+            started[dones] = counts["changes"]
+            return obs, rewards, dones, info
+
+        vector_env.set_players, vector_env.step = counting_set_players, counting_step
+        trainer = VectorDQLTrainer(vector_env, player_pool=pool, copy_period=4, change_period=4, seed=0)
+        trainer.run(40, progress=False)
+    assert 0 < sum(n > 0 for n in rated) == counts["expected"] < counts["after"]
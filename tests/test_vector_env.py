@@ -0,0 +1,145 @@
+# Testes dos vetores de envs
+import functools
+
+import numpy as np
+import torch
+from torch import nn
+
+from truco_env import TrucoMineiroEnv
+from truco_players import LearningPlayer, NetworkBotPlayer, NonLearningPlayer, RandomBotPlayer
+from truco_vector_env import SubprocTrucoVectorEnv, SyncTrucoVectorEnv
+
+
+def _learner_env_fn():
+    teams = [[LearningPlayer("learner")], [RandomBotPlayer("random")]]
+    return functools.partial(TrucoMineiroEnv, num_players=2, teams=teams)
+
+
+def _random_actions(rng, valid_mask):
+    # Uma ação válida aleatória por sub-env
+    return (rng.random(valid_mask.shape) * valid_mask).argmax(axis=1)
+
+
+def test_subproc_vector_env_steps_and_resets_rounds():
+    rng = np.random.default_rng(0)
+    with SubprocTrucoVectorEnv(_learner_env_fn(), 6, num_workers=2) as vector_env:
+        obs, info = vector_env.reset()
+        assert obs.shape == (6, 24)
+        rounds = 0
+        for _ in range(200):
+            assert info["valid_mask"].any(axis=1).all()
+            obs, rewards, dones, info = vector_env.step(_random_actions(rng, info["valid_mask"]))
+            ended = info["round_ended"]
+            # Recompensa só no fim da rodada; o jogo só acaba no fim de uma rodada
+            assert not rewards[~ended].any()
+            assert not (dones & ~ended).any()
+            rounds += int(ended.sum())
+        assert rounds > 0
+
+
+def test_sync_vector_env_batches_network_opponents():
+    torch.manual_seed(0)
+    opponent = NetworkBotPlayer("network", nn.Sequential(nn.Linear(24, 32), nn.ReLU(), nn.Linear(32, 6)))
+    calls = []
+    choose_actions = opponent.choose_actions
+    opponent.choose_actions = lambda states, masks: calls.append(len(states)) or choose_actions(states, masks)
+    teams = [[LearningPlayer("learner")], [opponent]]
+    env_fn = functools.partial(TrucoMineiroEnv, num_players=2, teams=teams)
+    rng = np.random.default_rng(0)
+    with SyncTrucoVectorEnv(env_fn, 16) as vector_env:
+        obs, info = vector_env.reset()
+        for _ in range(100):
+            obs, rewards, dones, info = vector_env.step(_random_actions(rng, info["valid_mask"]))
+            assert not rewards[~info["round_ended"]].any()
+    # As decisões do oponente saem em lote, não uma chamada por jogo
+    assert max(calls) > 1 and len(calls) < sum(calls)
+
+
+def test_vector_env_reports_victories_of_the_learner():
+    rng = np.random.default_rng(0)
+    with SyncTrucoVectorEnv(_learner_env_fn(), 8) as vector_env:
+        obs, info = vector_env.reset()
+        games = victories = 0
+        for _ in range(400):
+            obs, rewards, dones, info = vector_env.step(_random_actions(rng, info["valid_mask"]))
+            # Quem ganha o jogo ganha a última rodada
+            assert np.array_equal(info["victory"], dones & (rewards > 0))
+            games += int(dones.sum())
+            victories += int(info["victory"].sum())
+    assert 0 < victories < games
+
+
+def test_seeded_vector_envs_do_not_depend_on_the_workers():
+    # Oponente determinístico: com sementes por sub-env, o processo em que cada um roda não importa
+    torch.manual_seed(0)
+    opponent = NetworkBotPlayer("network", nn.Sequential(nn.Linear(24, 32), nn.ReLU(), nn.Linear(32, 6)))
+    env_fn = functools.partial(TrucoMineiroEnv, num_players=2, teams=[[LearningPlayer("learner")], [opponent]])
+
+    def run(vector_env):
+        rng = np.random.default_rng(0)
+        with vector_env:
+            obs, info = vector_env.reset(seed=3)
+            history = [obs.copy()]
+            for _ in range(60):
+                obs, rewards, dones, info = vector_env.step(_random_actions(rng, info["valid_mask"]))
+                history += [obs.copy(), rewards.copy(), dones.copy()]
+        return history
+
+    expected = run(SyncTrucoVectorEnv(env_fn, 6))
+    for num_workers in (2, 3):
+        result = run(SubprocTrucoVectorEnv(env_fn, 6, num_workers=num_workers))
+        assert all(np.array_equal(a, b) for a, b in zip(result, expected))
+
+
+class _ScriptedPlayer(NonLearningPlayer):
+    # Pede truco sempre que pode e aceita (call=True) ou recusa todos os pedidos; senão joga
+    # a primeira carta
+    def __init__(self, name, call):
+        super().__init__(name)
+        self.call = call
+
+    def choose_action(self, obs, info):
+        valid_actions = list(info["valid_actions"])
+        if 4 in valid_actions:
+            return 4 if self.call else 5
+        return 3 if self.call and 3 in valid_actions else valid_actions[0]
+
+
+def test_vector_envs_keep_rounds_ended_before_the_learner_plays():
+    # Quando o assento 1 começa a rodada, ele pede truco e o parceiro do jogador que aprende
+    # (assento 2) recusa: a rodada acaba antes da vez do assento 0, logo depois do reset
+    teams = [
+        [LearningPlayer("learner"), _ScriptedPlayer("folder", call=False)],
+        [_ScriptedPlayer("caller", call=True), _ScriptedPlayer("other", call=False)],
+    ]
+    env_fn = functools.partial(TrucoMineiroEnv, num_players=4, teams=teams)
+
+    def run(vector_env, envs=()):
+        # Saldo de pontos do time 0 contado em todas as rodadas dos sub-envs locais
+        balance = np.zeros(vector_env.num_envs)
+        for i, env in enumerate(envs):
+            def counting_handle_action(action, env=env, handle_action=env.handle_action, i=i):
+                obs, reward, done, info = handle_action(action)
+                if info["round_ended"]:
+                    balance[i] += reward if env.last_player_index % 2 == 0 else -reward
+                return obs, reward, done, info
+            env.handle_action = counting_handle_action
+
+        rng = np.random.default_rng(0)
+        history, total = [], np.zeros(vector_env.num_envs)
+        with vector_env:
+            obs, info = vector_env.reset(seed=0)
+            for _ in range(300):
+                obs, rewards, dones, info = vector_env.step(_random_actions(rng, info["valid_mask"]))
+                history += [obs.copy(), rewards.copy(), dones.copy(), info["round_ended"].copy()]
+                total += rewards
+        pending = np.array([env.pending_reward for env in envs])
+        return history, total, balance, pending
+
+    vector_env = SyncTrucoVectorEnv(env_fn, 4)
+    history, total, balance, pending = run(vector_env, vector_env.envs)
+    # Recompensas fora do fim de uma rodada vieram de rodadas que os outros terminaram
+    assert any(rewards[~ended].any() for rewards, ended in zip(history[1::4], history[3::4]))
+    assert np.array_equal(total + pending, balance)
+    result, *_ = run(SubprocTrucoVectorEnv(env_fn, 4, num_workers=2))
+    assert all(np.array_equal(a, b) for a, b in zip(result, history))
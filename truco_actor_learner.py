@@ -0,0 +1,375 @@
+# Imports
+import copy
+import multiprocessing as mp
+import queue
+import time
+
+import numpy as np
+import torch
+
+from truco_encoding import STATE_DIMS
+from truco_buffers import ReplayBuffer, PrioritizedReplayBuffer
+from truco_env import spawn_seeds
+from truco_inference import compile_q_network
+from truco_players import LearningPlayer
+from truco_profiling import NULL_PROFILER
+from truco_trainer import QUpdater, default_q_network
+
+
+class SharedWeights:
+    """
+    Pesos da rede em memória compartilhada entre processos, com um número de versão
+
+    Os tensores do state_dict ficam lado a lado num único RawArray float32; cada processo
+    monta visões numpy sobre ele com os mesmos nomes e formatos. publish copia os pesos do
+    learner e incrementa a versão, load copia para a rede local de um actor. As duas
+    operações usam o lock da versão, então um actor nunca lê pesos pela metade.
+    """
+
+    def __init__(self, network, context=None):
+        ctx = mp.get_context(context)
+        state_dict = network.state_dict()
+        self.shapes = [(key, tuple(value.shape)) for key, value in state_dict.items()]
+        self.size = sum(int(np.prod(shape, dtype=np.int64)) for _, shape in self.shapes)
+        self.raw = ctx.RawArray("f", self.size)
+        self.version = ctx.Value("q", 0)
+        self._views = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_views"] = None
+        return state
+
+    def views(self):
+        # Visões (nome, array) sobre o RawArray, criadas uma vez por processo
+        if self._views is None:
+            flat = np.frombuffer(self.raw, dtype=np.float32)
+            self._views, offset = [], 0
+            for key, shape in self.shapes:
+                size = int(np.prod(shape, dtype=np.int64))
+                self._views.append((key, flat[offset:offset + size].reshape(shape)))
+                offset += size
+        return self._views
+
+    def publish(self, network):
+        '''
+        Copia os pesos da rede para a memória compartilhada e retorna a nova versão
+        '''
+        state_dict = network.state_dict()
+        with self.version.get_lock():
+            for key, view in self.views():
+                view[...] = state_dict[key].detach().cpu().numpy()
+            self.version.value += 1
+            return self.version.value
+
+    def load(self, network):
+        '''
+        Copia os pesos compartilhados para a rede e retorna a versão lida
+        '''
+        state_dict = network.state_dict()
+        with torch.no_grad(), self.version.get_lock():
+            for key, view in self.views():
+                state_dict[key].copy_(torch.from_numpy(view))
+            return self.version.value
+
+
+def _actor(index, env_fn, network, weights, transitions, commands, stop, eps, gamma, chunk_size, sync_period, seed):
+    '''
+    Processo que joga partidas com a versão mais recente dos pesos e manda as transições
+    para o learner em blocos de chunk_size
+
+    Cada jogo terminado vai com o id do conjunto de oponentes com que foi jogado inteiro
+    (None se os oponentes mudaram no meio do jogo; 0 para os times de env_fn).
+    '''
+    torch.set_num_threads(1)
+    env = env_fn()
+    policy = compile_q_network(network, "numpy")
+    rng = np.random.default_rng(seed)
+    version = weights.load(network)
+
+    states = np.zeros((chunk_size, STATE_DIMS), dtype=np.float32)
+    next_states = np.zeros((chunk_size, STATE_DIMS), dtype=np.float32)
+    actions = np.zeros(chunk_size, dtype=np.int64)
+    rewards = np.zeros(chunk_size, dtype=np.float32)
+    dones = np.zeros(chunk_size, dtype=bool)
+    versions = np.zeros(chunk_size, dtype=np.int64)
+    results = []
+    size = steps = opponents = 0
+
+    def apply_commands():
+        # Novos oponentes só entre rodadas (ver ActorLearner.set_players)
+        nonlocal opponents
+        try:
+            while True:
+                teams, opponents = commands.get_nowait()
+                env.set_players(teams)
+        except queue.Empty:
+            pass
+
+    try:
+        apply_commands()
+        game_opponents = opponents
+        state, info = env.reset(reset_score=True, seed=seed)
+        ep_return, gamma_pot = 0.0, 1.0
+        while not stop.is_set():
+            if steps % sync_period == 0 and weights.version.value != version:
+                version = weights.load(network)
+
+            if rng.random() < eps:
+                valid_actions = info["valid_actions"]
+                action = valid_actions[int(rng.random() * len(valid_actions))]
+            else:
+                action = policy.act(state, info["valid_mask"])
+            # state é o buffer de observação do env, reescrito pelo step: copia antes
+            states[size] = state
+            next_state, reward, done, info = env.step(action)
+            steps += 1
+
+            actions[size] = action
+            rewards[size] = reward
+            dones[size] = done
+            next_states[size] = next_state
+            versions[size] = version
+            size += 1
+
+            ep_return += reward * gamma_pot
+            gamma_pot *= gamma
+            if done:
+                results.append((bool(info["victory"]), ep_return, game_opponents))
+                ep_return, gamma_pot = 0.0, 1.0
+            if info["round_ended"]:
+                apply_commands()
+                state, info = env.reset(reset_score=done)
+            else:
+                state = next_state
+            if done:
+                game_opponents = opponents
+            elif game_opponents != opponents:
+                game_opponents = None
+
+            if size == chunk_size:
+                chunk = (index, states.copy(), actions.copy(), rewards.copy(), dones.copy(), next_states.copy(), versions.copy(), results)
+                # Back-pressure: com a fila cheia o actor espera o learner consumir
+                while not stop.is_set():
+                    try:
+                        transitions.put(chunk, timeout=0.1)
+                        break
+                    except queue.Full:
+                        pass
+                size, results = 0, []
+    except KeyboardInterrupt:
+        pass
+    finally:
+        env.close()
+
+
+class ActorLearner:
+    """
+    Treino assíncrono: num_actors processos jogam e um learner central treina
+
+    Cada actor roda um env (env_fn, com o jogador que aprende no assento 0 e flat_obs=True)
+    e escolhe as ações epsilon-greedy com uma cópia local da rede (backend numpy), relendo
+    os pesos da memória compartilhada (SharedWeights) a cada sync_period passos quando há
+    versão nova. As transições vão em blocos de chunk_size por uma fila limitada a
+    queue_size blocos: quando o learner não dá conta, os actors esperam (back-pressure) em
+    vez de acumular memória.
+
+    O learner é o dono do replay buffer e do otimizador e aplica as regras de atualização
+    do notebook (QUpdater, rule="q_learning" do DeepQLearning ou "sarsa" do DeepSarsa):
+    updates_per_chunk passos de gradiente por bloco recebido e publicação dos pesos a cada
+    publish_period passos. Cada transição guarda a versão dos pesos que a gerou, então
+    stats["staleness"] mede quantas publicações o actor estava atrasado.
+
+    A troca de oponentes segue a do DeepQLearning: com player_pool, um snapshot a cada
+    copy_period episódios e novos oponentes para todos os actors a cada change_period. Os
+    actors trocam de oponentes quando recebem o comando, então jogos terminados com um
+    conjunto anterior ainda chegam depois da troca: só vão para os ratings do pool os jogos
+    jogados inteiros contra o conjunto atual. close
+    (ou o fim do bloco with) para os actors, esvazia a fila para nenhum ficar preso num put
+    e espera todos terminarem.
+    """
+
+    def __init__(
+        self, env_fn, num_actors=2, Q_network=None, eps=0.01, alpha=1e-3, gamma=0.99, batch_size=32,
+        chunk_size=64, queue_size=8, updates_per_chunk=2, publish_period=10, sync_period=32, target_period=100,
+        tau=None, prioritized=False, rule="q_learning", buffer_capacity=1000000, player_pool=None, copy_period=100,
+        change_period=100, num_players=2, seed=None, context=None, profiler=NULL_PROFILER,
+    ):
+        if copy_period > change_period:
+            raise ValueError("copy_period cannot be greater than change_period.")
+        self.env_fn = env_fn
+        self.num_actors = num_actors
+        self.eps = eps
+        self.gamma = gamma
+        self.batch_size = batch_size
+        self.chunk_size = chunk_size
+        self.updates_per_chunk = updates_per_chunk
+        self.publish_period = publish_period
+        self.sync_period = sync_period
+        self.player_pool = player_pool
+        self.copy_period = copy_period
+        self.change_period = change_period
+        self.num_players = num_players
+        self.seed = seed
+        self.profiler = profiler
+
+        self.Q_network = default_q_network() if Q_network is None else Q_network
+        self.updater = QUpdater(self.Q_network, alpha, gamma, target_period, tau, prioritized, rule, eps)
+        # Os actors usam as primeiras num_actors sementes filhas (ver start); o buffer e o pool,
+        # as seguintes
+        buffer_seed, pool_seed = spawn_seeds(seed, num_actors + 2)[num_actors:]
+        if player_pool is not None and seed is not None:
+            player_pool.seed(pool_seed)
+        self.buffer = (PrioritizedReplayBuffer if prioritized else ReplayBuffer)(capacity=buffer_capacity, seed=buffer_seed)
+
+        self.ctx = mp.get_context(context)
+        self.weights = SharedWeights(self.Q_network, context)
+        self.transitions = self.ctx.Queue(maxsize=queue_size)
+        self.commands = [self.ctx.Queue() for _ in range(num_actors)]
+        self.stop = self.ctx.Event()
+        # Id do conjunto de oponentes mandado por último aos actors (0 = times de env_fn)
+        self.opponents = 0
+        self.processes = []
+        self.closed = False
+
+    def start(self):
+        '''
+        Publica os pesos iniciais e inicia os actors (chamado por run se preciso)
+        '''
+        if self.processes:
+            return
+        self.weights.publish(self.Q_network)
+        template = copy.deepcopy(self.Q_network).cpu().eval()
+        for index, seed in enumerate(spawn_seeds(self.seed, self.num_actors)):
+            process = self.ctx.Process(
+                target=_actor,
+                args=(
+                    index, self.env_fn, template, self.weights, self.transitions, self.commands[index], self.stop,
+                    self.eps, self.gamma, self.chunk_size, self.sync_period, seed,
+                ),
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+
+    def set_players(self, teams):
+        '''
+        Manda novos times para todos os actors, que trocam na próxima rodada, e retorna o id
+        do novo conjunto de oponentes
+        '''
+        self.opponents += 1
+        for commands in self.commands:
+            commands.put((teams, self.opponents))
+        return self.opponents
+
+    def _change_opponents(self):
+        sampled_players = self.player_pool.sample(self.num_players - 1)
+        all_players = [LearningPlayer("deep_qlearning"), *sampled_players]
+        half = self.num_players // 2
+        self.set_players([all_players[0:half], all_players[half:self.num_players]])
+        return sampled_players
+
+    def _receive(self, timeout=1.0):
+        # Próximo bloco da fila; falha se algum actor morreu em vez de esperar para sempre
+        while True:
+            try:
+                return self.transitions.get(timeout=timeout)
+            except queue.Empty:
+                dead = [p.exitcode for p in self.processes if p.exitcode not in (None, 0)]
+                if dead:
+                    raise RuntimeError(f"{len(dead)} actor(s) exited with codes {dead}.")
+
+    def run(self, num_episodes):
+        '''
+        Treina até os actors completarem num_episodes jogos
+
+        Retorna um dict de arrays: 'MSE Loss' (uma por atualização), 'Returns' e 'victories'
+        (um por jogo), 'staleness' (atraso médio em versões de cada bloco recebido),
+        'winrate' (acumulada a cada 100 jogos) e os totais 'wins', 'steps', 'updates',
+        'versions' e 'learner_idle' (segundos esperando a fila).
+        '''
+        self.start()
+        profiler, updater = self.profiler, self.updater
+        losses = torch.zeros(self.updates_per_chunk, device=next(self.Q_network.parameters()).device)
+        all_losses, returns, victories, staleness = [], [], [], []
+        sampled_players = []
+        episodes = steps = copies = changes = 0
+        first_episode = 0 if self.player_pool is None else self.player_pool.last_episode
+        idle = 0.0
+        version = self.weights.version.value
+
+        while episodes < num_episodes:
+            start = time.perf_counter()
+            _, states, actions, rewards, dones, next_states, versions, results = self._receive()
+            idle += time.perf_counter() - start
+            self.buffer.insert_many(states, actions, rewards, dones, next_states)
+            steps += len(states)
+            staleness.append(version - versions.mean())
+
+            for victory, ep_return, opponents in results:
+                victories.append(victory)
+                returns.append(ep_return)
+                if self.player_pool is not None and opponents == self.opponents:
+                    self.player_pool.report(sampled_players, victory)
+            episodes += len(results)
+
+            if self.buffer.can_sample(self.batch_size):
+                with profiler.timer("learner.update"):
+                    for k in range(self.updates_per_chunk):
+                        losses[k] = updater.update(self.buffer, self.batch_size)
+                        if updater.num_updates % self.publish_period == 0:
+                            version = self.weights.publish(self.Q_network)
+                    all_losses.append(losses.cpu().numpy().copy())
+                profiler.count("learner.updates", self.updates_per_chunk)
+
+            if self.player_pool is not None:
+                if episodes // self.copy_period > copies:
+                    copies = episodes // self.copy_period
+                    # A numeração continua a dos snapshots de execuções anteriores do pool
+                    total = first_episode + episodes
+                    self.player_pool.register(f"Number {total // self.copy_period} # Episode {total}", self.Q_network, episode=total)
+                if episodes // self.change_period > changes:
+                    changes = episodes // self.change_period
+                    sampled_players = self._change_opponents()
+
+        victories = np.array(victories, dtype=bool)
+        wins = np.cumsum(victories)
+        return {
+            "MSE Loss": np.concatenate(all_losses) if all_losses else np.zeros(0, dtype=np.float32),
+            "Returns": np.array(returns),
+            "victories": victories,
+            "staleness": np.array(staleness),
+            "winrate": wins[99::100] / np.arange(100, len(victories) + 1, 100),
+            "wins": int(victories.sum()),
+            "steps": steps,
+            "updates": updater.num_updates,
+            "versions": version,
+            "learner_idle": idle,
+        }
+
+    def close(self, timeout=10):
+        '''
+        Para os actors e espera todos terminarem
+        '''
+        if self.closed:
+            return
+        self.stop.set()
+        deadline = time.monotonic() + timeout
+        while any(p.is_alive() for p in self.processes) and time.monotonic() < deadline:
+            # Actors presos num put da fila cheia precisam que alguém a esvazie
+            try:
+                self.transitions.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+        self.transitions.cancel_join_thread()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,175 @@
+# Imports
+import math
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from statistics import NormalDist
+
+import numpy as np
+
+from truco_env import TrucoMineiroEnv, spawn_seeds
+from truco_encoding import MASK_BOOLS
+
+
+def wilson_interval(wins, games, z=1.96):
+    '''
+    Intervalo de confiança de Wilson para a taxa de vitórias (z=1.96 -> 95%)
+    '''
+    if games == 0:
+        return 0.0, 1.0
+    p = wins / games
+    denominator = 1 + z ** 2 / games
+    center = (p + z ** 2 / (2 * games)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / games + z ** 2 / (4 * games ** 2)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+
+def sequential_z(z, looks):
+    '''
+    z alargado por Bonferroni para olhar o intervalo looks vezes: a chance total de parar por
+    acaso fica no nível de z (looks=1 devolve o próprio z)
+    '''
+    alpha = 2 * (1 - NormalDist().cdf(z))
+    return NormalDist().inv_cdf(1 - alpha / (2 * max(1, looks)))
+
+
+def play_games(envs):
+    '''
+    Joga uma partida completa em cada env ao mesmo tempo e retorna o time vencedor de cada uma
+
+    Mesmo laço de TrucoMineiroEnv.play, mas as decisões de jogadores com batched = True
+    (ex.: NetworkBotPlayer) em todas as partidas em que estão na vez saem de um único
+    choose_actions. Os envs devem usar flat_obs=True.
+    '''
+    states = [env.reset(reset_score=True) for env in envs]
+    winners = np.zeros(len(envs), dtype=np.int64)
+    pending = list(range(len(envs)))
+    while pending:
+        actions = {}
+        batches = {}
+        for i in pending:
+            player = envs[i].players[envs[i].current_player_index]
+            if player.batched:
+                batches.setdefault(player, []).append(i)
+            else:
+                actions[i] = player.choose_action(*states[i])
+        for player, batch in batches.items():
+            obs = np.stack([envs[i].obs_buffer for i in batch])
+            valid_masks = MASK_BOOLS[[envs[i].action_mask for i in batch]]
+            actions.update(zip(batch, player.choose_actions(obs, valid_masks).tolist()))
+
+        still_pending = []
+        for i in pending:
+            obs, _, done, info = envs[i].handle_action(actions[i])
+            if done:
+                winners[i] = envs[i].game_winner()
+                continue
+            states[i] = envs[i].reset(reset_score=False) if info["round_ended"] else (obs, info)
+            still_pending.append(i)
+        pending = still_pending
+    return winners
+
+
+def play_match(player_a, player_b, max_games=400, min_games=40, batch_size=40, z=1.96, seed=None):
+    '''
+    Confronto entre dois jogadores que não aprendem, com parada antecipada
+
+    Joga lotes de batch_size partidas simultâneas (player_a no time 0 em metade delas e no
+    time 1 na outra) até max_games ou, a partir de min_games, até o intervalo de Wilson da
+    taxa de vitórias de player_a não conter mais 0.5. Retorna wins, games, winrate e ci de
+    player_a. Com seed (int ou SeedSequence) os sorteios dos envs e dos jogadores são
+    reprodutíveis.
+
+    Como o intervalo é olhado depois de cada lote, a parada usa z alargado por sequential_z
+    para o número de olhadas; o ci retornado é o intervalo de Wilson com o próprio z.
+    '''
+    envs, seats = [], np.arange(batch_size) % 2
+    *env_seeds, seed_a, seed_b = spawn_seeds(seed, batch_size + 2)
+    for seat, env_seed in zip(seats, env_seeds):
+        teams = [[player_a], [player_b]] if seat == 0 else [[player_b], [player_a]]
+        envs.append(TrucoMineiroEnv(num_players=2, teams=teams, flat_obs=True, seed=env_seed))
+    # Os dois jogadores são os mesmos objetos em todos os envs, que os semeiam de novo a cada
+    # construção: são semeados uma vez só, com filhos próprios da semente da partida
+    if seed is not None:
+        player_a.seed(seed_a)
+        player_b.seed(seed_b)
+
+    # Olhadas no intervalo: fim de cada lote a partir de min_games
+    checks = [min(end, max_games) for end in range(batch_size, max_games + batch_size, batch_size)]
+    stop_z = sequential_z(z, sum(end >= min_games for end in checks))
+    wins = games = 0
+    while games < max_games:
+        n = min(batch_size, max_games - games)
+        wins += int((play_games(envs[:n]) == seats[:n]).sum())
+        games += n
+        low, high = wilson_interval(wins, games, stop_z)
+        if games >= min_games and (low > 0.5 or high < 0.5):
+            break
+    return {"wins": wins, "games": games, "winrate": wins / games, "ci": wilson_interval(wins, games, z)}
+
+
+# Jogadores do torneio no processo do worker (enviados uma vez só pelo initializer)
+_players = None
+
+
+def _init_worker(players):
+    global _players
+    _players = players
+    try:
+        import torch
+        # Cada worker usa uma thread só, senão os processos disputam os mesmos núcleos
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+
+def _play_pair(pair, match_kwargs):
+    i, j = pair
+    return play_match(_players[i], _players[j], **match_kwargs)
+
+
+def round_robin(players, num_workers=None, context=None, **match_kwargs):
+    '''
+    Torneio todos contra todos entre jogadores que não aprendem, distribuído em processos
+
+    Cada confronto (play_match, que recebe match_kwargs) é uma tarefa do pool e os jogadores
+    vão para cada worker uma vez só. Com num_workers=0 roda tudo no processo atual. Retorna
+    as matrizes wins e games (linha = jogador, coluna = adversário) e a lista de confrontos.
+    '''
+    n = len(players)
+    wins = np.zeros((n, n), dtype=np.int64)
+    games = np.zeros((n, n), dtype=np.int64)
+    pairs = list(combinations(range(n), 2))
+
+    if num_workers == 0:
+        results = [play_match(players[i], players[j], **match_kwargs) for i, j in pairs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=mp.get_context(context),
+            initializer=_init_worker,
+            initargs=(players,),
+        ) as pool:
+            results = list(pool.map(_play_pair, pairs, [match_kwargs] * len(pairs)))
+
+    matches = []
+    for (i, j), result in zip(pairs, results):
+        wins[i, j], wins[j, i] = result["wins"], result["games"] - result["wins"]
+        games[i, j] = games[j, i] = result["games"]
+        matches.append({"players": (i, j), **result})
+    return {"wins": wins, "games": games, "matches": matches}
+
+
+def standings(players, tournament, z=1.96):
+    '''
+    Tabela de classificação do torneio: taxa de vitórias geral de cada jogador com intervalo
+    de Wilson, em ordem decrescente
+    '''
+    wins = tournament["wins"].sum(axis=1)
+    games = tournament["games"].sum(axis=1)
+    lines = []
+    for i in np.argsort(-wins / np.maximum(games, 1), kind="stable"):
+        low, high = wilson_interval(wins[i], games[i], z)
+        winrate = wins[i] / max(games[i], 1)
+        lines.append(f"{players[i].name}: {winrate:.3f} [{low:.3f}, {high:.3f}] ({games[i]} partidas)")
+    return "\n".join(lines)
@@ -0,0 +1,348 @@
+# Imports
+import numpy as np
+
+from truco_encoding import NO_CARD, CARD_POINTS, BET_VALUES, STATE_DIMS, NUM_ACTIONS
+
+
+class BatchTrucoMineiroEnv:
+    """
+    Motor vetorizado do truco mineiro (1v1 ou 2v2): avança num_envs jogos ao mesmo tempo
+
+    Segue as mesmas regras de TrucoMineiroEnv.handle_action, mas guarda o estado de todos os
+    jogos em arrays e recebe um vetor de ações (uma por jogo, sempre do jogador da vez). Os
+    lados são controlados por quem chama step, então serve tanto para self-play quanto
+    como base para envs com oponentes.
+
+    Mãos e cartas na mesa são por assento e placares, pontos da rodada e permissão de truco
+    por time (assento par = time 0, ímpar = time 1), como no TrucoMineiroEnv. A vez passa
+    para o próximo assento e cada mão é resolvida de uma vez para todos os jogos em que a
+    última carta foi jogada, então o custo por passo quase não muda com num_players.
+    """
+
+    def __init__(self, num_envs, seed=None, num_players=2):
+        if num_players < 2 or num_players % 2:
+            raise ValueError(f"num_players must be a positive even number, got {num_players}.")
+        self.num_envs = num_envs
+        self.num_players = num_players
+        self.rng = np.random.default_rng(seed)
+        self._arange = np.arange(num_envs)
+        self._seats = np.arange(num_players)
+
+        # Estado dos jogos
+        self.cards = np.full((num_envs, num_players, 3), NO_CARD, dtype=np.int8)
+        # Carta que cada assento tem na mesa na mão atual (NO_CARD se ainda não jogou)
+        self.played = np.full((num_envs, num_players), NO_CARD, dtype=np.int8)
+        self.num_played = np.zeros(num_envs, dtype=np.int8)
+        # Placar e pontos da rodada por time
+        self.game_score = np.zeros((num_envs, 2), dtype=np.int16)
+        self.round_score = np.zeros((num_envs, 2), dtype=np.int8)
+        self.round_starter = np.zeros(num_envs, dtype=np.int8)
+        # Quem abriu a mão atual e quem pediu o último truco/aumento
+        self.hand_starter = np.zeros(num_envs, dtype=np.int8)
+        self.truco_caller = np.zeros(num_envs, dtype=np.int8)
+        self.current_player_index = np.zeros(num_envs, dtype=np.int8)
+        self.turn = np.zeros(num_envs, dtype=np.int8)
+        self.first_hand_winner = np.zeros(num_envs, dtype=np.int8)
+        self.hand_winner = np.zeros(num_envs, dtype=np.int8)
+        self.card_frequency = np.zeros((num_envs, 14), dtype=np.int8)
+        # Índice da aposta em BET_VALUES
+        self.current_bet = np.zeros(num_envs, dtype=np.int8)
+        self.trucable = np.ones((num_envs, 2), dtype=bool)
+        self.respond = np.zeros(num_envs, dtype=bool)
+
+        # Visões achatadas por assento (linha = num_players * jogo + assento) e por time
+        # (linha = 2 * jogo + time): take/put nelas é bem mais barato que indexação avançada
+        # com dois arrays de índices
+        self._hands = self.cards.reshape(num_players * num_envs, 3)
+        self._hands_packed = self.cards.reshape(-1).view("V3")
+        self._played = self.played.reshape(-1)
+        self._game_score = self.game_score.reshape(-1)
+        self._round_score = self.round_score.reshape(-1)
+        self._trucable = self.trucable.reshape(-1)
+        self._card_frequency = self.card_frequency.reshape(-1)
+
+        # Buffers reutilizados a cada passo
+        self._obs = np.zeros((num_envs, STATE_DIMS), dtype=np.float32)
+        self._final_obs = np.zeros((num_envs, STATE_DIMS), dtype=np.float32)
+        self._valid_actions = np.zeros((num_envs, NUM_ACTIONS), dtype=bool)
+
+    @property
+    def other_player_index(self):
+        # Próximo assento na rotação (no 1v1, o outro jogador)
+        return (self.current_player_index + 1) % self.num_players
+
+    def reset(self, seed=None):
+        '''
+        Reinicia todos os jogos (placar zerado) e retorna obs e info empilhados
+        '''
+        if seed is not None:
+            self.rng = np.random.default_rng(seed)
+        self.round_starter[:] = self.rng.integers(0, self.num_players, self.num_envs)
+        self._reset_rounds(self._arange, np.ones(self.num_envs, dtype=bool))
+        self._update_obs()
+        return self._obs, self._get_info(np.zeros(self.num_envs, dtype=bool))
+
+    def step(self, actions):
+        '''
+        Executa uma ação por jogo para o jogador da vez
+
+        Retorna obs (num_envs, 24), recompensas relativas a quem agiu, dones (fim de jogo)
+        e info com as máscaras de ações válidas. Rodadas encerradas já são redistribuídas (e
+        jogos encerrados zeram o placar); a observação anterior ao reset fica nas linhas
+        correspondentes de info["final_obs"]. Os arrays retornados são buffers reutilizados.
+        '''
+        actions = np.asarray(actions, dtype=np.intp)
+        if actions.shape != (self.num_envs,):
+            raise ValueError(f"Expected {self.num_envs} actions, got shape {actions.shape}.")
+        if actions.min() < 0 or actions.max() >= NUM_ACTIONS:
+            raise ValueError(f"Invalid action. Action must be an integer between 0 and 5 inclusive.")
+        if not self._valid_actions.reshape(-1).take(NUM_ACTIONS * self._arange + actions).all():
+            raise ValueError(f"Invalid action. Some actions are not allowed in the current state.")
+
+        rewards = np.zeros(self.num_envs, dtype=np.float32)
+        round_ended = np.zeros(self.num_envs, dtype=bool)
+        players = self.current_player_index.copy()
+
+        play_idx = np.flatnonzero(actions <= 2)
+        if play_idx.size:
+            self._handle_play_card(play_idx, actions.take(play_idx), rewards, round_ended)
+        truco_idx = np.flatnonzero(actions == 3)
+        if truco_idx.size:
+            self._handle_truco_call(truco_idx)
+        response_idx = np.flatnonzero(actions >= 4)
+        if response_idx.size:
+            self._handle_response(response_idx, actions.take(response_idx), rewards, round_ended)
+
+        dones = (self.game_score >= 12).any(axis=1)
+        victory = self._game_score.take(2 * self._arange + players % 2) >= 12
+        self._update_obs()
+        final_obs = None
+        if round_ended.any():
+            ended_idx = np.flatnonzero(round_ended)
+            self._final_obs[ended_idx] = self._obs[ended_idx]
+            final_obs = self._final_obs
+            self._reset_rounds(ended_idx, dones.take(ended_idx))
+            self._update_obs(ended_idx)
+
+        info = self._get_info(round_ended)
+        info["player"] = players
+        info["victory"] = victory
+        info["final_obs"] = final_obs
+        return self._obs, rewards, dones, info
+
+    def _handle_play_card(self, idx, slots, rewards, round_ended):
+        '''
+        Lógica vetorizada para jogar carta (mesmas regras de handle_play_card)
+        '''
+        num_players = self.num_players
+        current = self.current_player_index.take(idx).astype(np.intp)
+        rows = num_players * idx + current
+
+        # Joga a carta e reordena a mão (o sentinela vai para o fim)
+        hands = self._hands.take(rows, axis=0)
+        flat_slots = 3 * np.arange(idx.size) + slots
+        card_played = hands.reshape(-1).take(flat_slots)
+        np.put(hands, flat_slots, NO_CARD)
+        hands.sort(axis=1)
+        np.put(self._hands_packed, rows, hands.reshape(-1).view("V3"))
+        np.put(self._played, rows, card_played)
+        current_points = CARD_POINTS.take(card_played)
+        self._card_frequency[14 * idx + current_points - 1] += 1
+        num_played = self.num_played.take(idx) + 1
+        np.put(self.num_played, idx, num_played)
+
+        # Se ainda falta alguém jogar, só passa a vez para o próximo assento
+        waiting = num_played < num_players
+        np.put(self.current_player_index, idx[waiting], (current[waiting] + 1) % num_players)
+
+        resolve = ~waiting
+        idx, current = idx[resolve], current[resolve]
+        if idx.size == 0:
+            return
+        team = current % 2
+
+        # Vencedor da mão pela maior carta de cada time (1=time 0; 2=time 1; 3=empate)
+        points = CARD_POINTS.take(self.played[idx])
+        team_best = points.reshape(idx.size, num_players // 2, 2).max(axis=1)
+        hand_winner = np.where(
+            team_best[:, 0] > team_best[:, 1], 1, np.where(team_best[:, 1] > team_best[:, 0], 2, 3)
+        )
+        decided = hand_winner != 3
+        self._round_score[2 * idx[decided] + hand_winner[decided] - 1] += 1
+
+        # Assento da carta vencedora: o primeiro do time vencedor a jogá-la, a partir de quem
+        # abriu a mão (no empate, quem abriu a mão abre a próxima)
+        starter = self.hand_starter.take(idx).astype(np.intp)
+        if num_players == 2:
+            winner_seat = np.where(decided, hand_winner - 1, starter)
+        else:
+            winning_team = np.where(decided, hand_winner - 1, 0)
+            best = team_best[np.arange(idx.size), winning_team]
+            candidates = (self._seats % 2 == winning_team[:, None]) & (points == best[:, None])
+            offset = np.where(candidates, (self._seats - starter[:, None]) % num_players, num_players).min(axis=1)
+            winner_seat = np.where(decided, (starter + offset) % num_players, starter)
+
+        # Vencedor da rodada (0=indeterminado; 1=time 0; 2=time 1; 3=empate)
+        turn = self.turn.take(idx)
+        first_hand_winner = self.first_hand_winner.take(idx)
+        round_winner = np.select(
+            [
+                turn == 2,
+                first_hand_winner == 3,
+                (first_hand_winner == team + 1) & (hand_winner != 2 - team),
+                (first_hand_winner == 2 - team) & (hand_winner != team + 1),
+            ],
+            [hand_winner, np.where(hand_winner == 3, 0, hand_winner), team + 1, 2 - team],
+            0,
+        )
+        bet_value = BET_VALUES.take(self.current_bet.take(idx))
+        won = (round_winner == 1) | (round_winner == 2)
+        self._game_score[2 * idx[won] + round_winner[won] - 1] += bet_value[won]
+
+        first_hand = turn == 0
+        np.put(self.first_hand_winner, idx[first_hand], hand_winner[first_hand])
+        np.put(self.hand_winner, idx, hand_winner)
+        self._clear_table(idx)
+        np.put(self.turn, idx, turn + 1)
+
+        rewards[idx] = np.where(
+            round_winner == team + 1, bet_value, np.where(round_winner == 2 - team, -bet_value, 0)
+        )
+        round_ended[idx] = round_winner != 0
+
+        np.put(self.hand_starter, idx, winner_seat)
+        np.put(self.current_player_index, idx, winner_seat)
+
+    def _clear_table(self, idx):
+        np.put(self._played, (self.num_players * idx[:, None] + self._seats).reshape(-1), NO_CARD)
+        np.put(self.num_played, idx, 0)
+
+    def _handle_truco_call(self, idx):
+        '''
+        Lógica vetorizada para pedir truco ou aumentar aposta
+        '''
+        current = self.current_player_index.take(idx).astype(np.intp)
+        team = current % 2
+        bet = self.current_bet.take(idx) + 1
+        np.put(self.current_bet, idx, bet)
+        np.put(self._trucable, 2 * idx + team, False)
+        min_sum_score_bet = BET_VALUES.take(bet) + self.game_score[idx].min(axis=1)
+        np.put(self._trucable, 2 * idx + 1 - team, min_sum_score_bet < 12)
+        np.put(self.respond, idx, True)
+        # Responde o próximo adversário
+        np.put(self.truco_caller, idx, current)
+        np.put(self.current_player_index, idx, (current + 1) % self.num_players)
+
+    def _handle_response(self, idx, actions, rewards, round_ended):
+        '''
+        Lógica vetorizada para responder a truco ou aumento de aposta
+        '''
+        current = self.current_player_index.take(idx).astype(np.intp)
+        np.put(self.respond, idx, False)
+
+        # Se recusa, volta a aposta anterior, que vai para o time de quem pediu
+        refuse = actions == 5
+        refused_idx = idx[refuse]
+        bet = self.current_bet.take(refused_idx) - 1
+        np.put(self.current_bet, refused_idx, bet)
+        bet_value = BET_VALUES.take(bet)
+        rewards[refused_idx] = -bet_value
+        self._game_score[2 * refused_idx + 1 - current[refuse] % 2] += bet_value
+        round_ended[refused_idx] = True
+
+        # A vez volta para quem pediu
+        np.put(self.current_player_index, idx, self.truco_caller.take(idx))
+
+    def _deal(self, n):
+        '''
+        Sorteia 3 cartas distintas por assento para cada um de n jogos (mãos ordenadas)
+        '''
+        if self.num_players > 2:
+            # Com 12 ou mais cartas a rejeição quase sempre refaz: embaralha o deck por jogo
+            decks = self.rng.permuted(np.tile(np.arange(40, dtype=np.int8), (n, 1)), axis=1)
+            hands = decks[:, :3 * self.num_players].reshape(n, self.num_players, 3)
+            hands.sort(axis=2)
+            return hands
+        deal = self.rng.integers(0, 40, (n, 6), dtype=np.int8)
+        pending = np.arange(n)
+        while pending.size:
+            ordered = np.sort(deal[pending], axis=1)
+            repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+            # Refaz apenas os jogos com cartas repetidas (rejeição mantém o sorteio uniforme)
+            pending = pending[repeated]
+            deal[pending] = self.rng.integers(0, 40, (pending.size, 6), dtype=np.int8)
+        hands = deal.reshape(n, 2, 3)
+        hands.sort(axis=2)
+        return hands
+
+    def _reset_rounds(self, idx, reset_score):
+        '''
+        Distribui uma nova rodada nos jogos idx (e zera o placar onde reset_score)
+        '''
+        self.cards[idx] = self._deal(idx.size)
+        round_starter = (self.round_starter.take(idx) + 1) % self.num_players
+        np.put(self.round_starter, idx, round_starter)
+        np.put(self.hand_starter, idx, round_starter)
+        np.put(self.current_player_index, idx, round_starter)
+        self._clear_table(idx)
+        self.game_score[idx[reset_score]] = 0
+        self.round_score[idx] = 0
+        np.put(self.turn, idx, 0)
+        np.put(self.first_hand_winner, idx, 0)
+        self.card_frequency[idx] = 0
+        np.put(self.current_bet, idx, 0)
+        self.trucable[idx] = True
+        np.put(self.respond, idx, False)
+
+    def _update_obs(self, idx=None):
+        '''
+        Atualiza observações e ações válidas dos jogos idx (todos por padrão) nos buffers
+        (vetor de estado com o layout de truco_encoding.STATE_LAYOUT)
+        '''
+        if idx is None:
+            self._write_obs(self._arange, self._obs, self._valid_actions)
+        else:
+            obs = np.empty((idx.size, STATE_DIMS), dtype=np.float32)
+            valid_actions = np.empty((idx.size, NUM_ACTIONS), dtype=bool)
+            self._write_obs(idx, obs, valid_actions)
+            self._obs[idx] = obs
+            self._valid_actions[idx] = valid_actions
+
+    def _write_obs(self, idx, obs, valid_actions):
+        current = self.current_player_index.take(idx)
+        rows = self.num_players * idx + current
+        team_rows = 2 * idx + current % 2
+        other_team_rows = team_rows ^ 1
+        hand = self._hands.take(rows, axis=0)
+        trucable = self._trucable.take(team_rows)
+        respond = self.respond.take(idx)
+
+        obs[:, 0:3] = CARD_POINTS.take(hand)
+        # Maior carta do time adversário na mesa
+        if self.num_players == 2:
+            obs[:, 3] = CARD_POINTS.take(self._played.take(rows ^ 1))
+        else:
+            team_best = CARD_POINTS.take(self.played[idx]).reshape(idx.size, -1, 2).max(axis=1)
+            obs[:, 3] = team_best[np.arange(idx.size), 1 - current % 2]
+        obs[:, 4] = self.first_hand_winner.take(idx)
+        obs[:, 5] = self._game_score.take(team_rows)
+        obs[:, 6] = self._game_score.take(other_team_rows)
+        obs[:, 7] = self.current_bet.take(idx)
+        obs[:, 8] = trucable
+        obs[:, 9] = respond
+        obs[:, 10:] = self.card_frequency.take(idx, axis=0)
+
+        not_respond = ~respond
+        np.logical_and(hand != NO_CARD, not_respond[:, None], out=valid_actions[:, 0:3])
+        np.logical_and(trucable, not_respond, out=valid_actions[:, 3])
+        valid_actions[:, 4] = respond
+        valid_actions[:, 5] = respond
+
+    def _get_info(self, round_ended):
+        return {
+            "current_player_index": self.current_player_index,
+            "game_score": self.game_score,
+            "current_bet_value": BET_VALUES.take(self.current_bet),
+            "round_ended": round_ended,
+            "valid_actions": self._valid_actions,
+        }
@@ -0,0 +1,517 @@
+'''
+Suíte de benchmarks do ambiente, dos jogadores, dos buffers e do treino (só CPU, sem tela)
+
+Uso:
+    python truco_benchmark.py --output resultados.json
+    python truco_benchmark.py --quick --only env_step full_game
+    python truco_benchmark.py --output novo.json --compare antigo.json
+
+Cada benchmark roda com sementes fixas, repete a medição algumas vezes e guarda a mediana.
+O JSON de saída traz o commit, as versões e a máquina, para comparar resultados entre commits.
+'''
+# Imports
+import argparse
+import contextlib
+import functools
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from truco_env import TrucoMineiroEnv
+from truco_batch_env import BatchTrucoMineiroEnv
+from truco_players import LearningPlayer, RandomBotPlayer, NetworkBotPlayer, device
+from truco_encoding import STATE_DIMS, NUM_ACTIONS, flatten_obs, valid_actions_mask
+from truco_buffers import ReplayBuffer, PrioritizedReplayBuffer
+from truco_vector_env import SyncTrucoVectorEnv
+from truco_trainer import VectorDQLTrainer
+from truco_actor_learner import ActorLearner
+from truco_game_log import GameLogWriter
+from truco_mcts import ISMCTSPlayer
+
+SEED = 0
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (função, unidade, maior é melhor)
+BENCHMARKS = {}
+
+
+def benchmark(name, unit, higher_is_better=True):
+    def register(function):
+        BENCHMARKS[name] = (function, unit, higher_is_better)
+        return function
+    return register
+
+
+def seed_everything(seed=SEED):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def _rate(function, n):
+    # Operações por segundo de function(), que executa n operações
+    start = time.perf_counter()
+    function()
+    return n / (time.perf_counter() - start)
+
+
+def _micros(function, n):
+    # Microssegundos por operação de function(), que executa n operações
+    start = time.perf_counter()
+    function()
+    return 1e6 * (time.perf_counter() - start) / n
+
+
+def _network():
+    # Mesma arquitetura padrão do DeepQLearning do notebook
+    return torch.nn.Sequential(
+        torch.nn.Linear(STATE_DIMS, 64),
+        torch.nn.ReLU(),
+        torch.nn.Linear(64, 64),
+        torch.nn.ReLU(),
+        torch.nn.Linear(64, NUM_ACTIONS),
+    ).to(device).eval()
+
+
+@benchmark("env_step", "steps/s")
+def bench_env_step(scale):
+    '''
+    TrucoMineiroEnv.step com ações aleatórias válidas contra um RandomBotPlayer
+    '''
+    env = TrucoMineiroEnv(num_players=2, teams=[[LearningPlayer("learner")], [RandomBotPlayer("random")]], seed=SEED)
+    rng = np.random.default_rng(SEED)
+    n = int(20000 * scale)
+
+    def run():
+        obs, info = env.reset()
+        for _ in range(n):
+            valid_actions = info["valid_actions"]
+            obs, reward, done, info = env.step(valid_actions[int(rng.integers(len(valid_actions)))])
+            if info["round_ended"]:
+                obs, info = env.reset(reset_score=done)
+    return _rate(run, n)
+
+
+@benchmark("env_reset", "resets/s")
+def bench_env_reset(scale):
+    env = TrucoMineiroEnv(num_players=2, teams=[[LearningPlayer("learner")], [RandomBotPlayer("random")]], seed=SEED)
+    n = int(20000 * scale)
+
+    def run():
+        for _ in range(n):
+            env.reset(reset_score=False)
+    return _rate(run, n)
+
+
+@benchmark("env_handle_action", "actions/s")
+def bench_env_handle_action(scale):
+    '''
+    Lógica do jogo pura: handle_action com ações aleatórias válidas dos dois lados
+    '''
+    env = TrucoMineiroEnv(num_players=2, teams=[[RandomBotPlayer("a")], [RandomBotPlayer("b")]], seed=SEED)
+    rng = np.random.default_rng(SEED)
+    n = int(50000 * scale)
+
+    def run():
+        obs, info = env.reset()
+        for _ in range(n):
+            valid_actions = info["valid_actions"]
+            obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+            if info["round_ended"]:
+                obs, info = env.reset(reset_score=done)
+    return _rate(run, n)
+
+
+@benchmark("env_handle_action_logged", "actions/s")
+def bench_env_handle_action_logged(scale):
+    '''
+    env_handle_action com cada decisão gravada por um GameLogWriter (em disco temporário)
+    '''
+    env = TrucoMineiroEnv(num_players=2, teams=[[RandomBotPlayer("a")], [RandomBotPlayer("b")]], seed=SEED)
+    rng = np.random.default_rng(SEED)
+    n = int(50000 * scale)
+
+    def run():
+        obs, info = env.reset()
+        for _ in range(n):
+            valid_actions = info["valid_actions"]
+            obs, reward, done, info = env.handle_action(valid_actions[int(rng.integers(len(valid_actions)))])
+            if info["round_ended"]:
+                obs, info = env.reset(reset_score=done)
+
+    with tempfile.TemporaryDirectory() as directory:
+        env.logger = GameLogWriter(directory)
+        try:
+            return _rate(run, n)
+        finally:
+            # O close (último bloco e índice) fica fora da medida
+            env.logger.close()
+
+
+@benchmark("full_game", "ms/game", higher_is_better=False)
+def bench_full_game(scale):
+    '''
+    Latência de uma partida inteira (até 12 pontos) entre dois RandomBotPlayer
+    '''
+    env = TrucoMineiroEnv(num_players=2, teams=[[RandomBotPlayer("a")], [RandomBotPlayer("b")]], seed=SEED)
+    n = int(500 * scale)
+
+    def run():
+        for _ in range(n):
+            env.play()
+    return _micros(run, n) / 1000
+
+
+@benchmark("mcts_iterations", "iterations/s")
+def bench_mcts_iterations(scale):
+    '''
+    Iterações do ISMCTSPlayer na primeira decisão de uma rodada 1v1 (sorteio, set_state e rodada)
+    '''
+    player = ISMCTSPlayer("mcts", iterations=int(2000 * scale))
+    player.seed(SEED)
+    env = TrucoMineiroEnv(num_players=2, teams=[[player], [RandomBotPlayer("random")]], seed=SEED)
+    obs, info = env.reset()
+    return _rate(lambda: player.search(obs, info), player.iterations)
+
+
+@benchmark("obs_flatten", "us/obs", higher_is_better=False)
+def bench_obs_flatten(scale):
+    '''
+    Conversão da observação em dicionário para o vetor de estado (flatten_obs)
+    '''
+    env = TrucoMineiroEnv(num_players=2, teams=[[LearningPlayer("learner")], [RandomBotPlayer("random")]], seed=SEED)
+    obs, _ = env.reset()
+    out = np.empty(STATE_DIMS, dtype=np.float32)
+    n = int(50000 * scale)
+
+    def run():
+        for _ in range(n):
+            flatten_obs(obs, out)
+    return _micros(run, n)
+
+
+@benchmark("obs_flat_write", "us/obs", higher_is_better=False)
+def bench_obs_flat_write(scale):
+    '''
+    Escrita da observação achatada pelo env (flat_obs=True)
+    '''
+    env = TrucoMineiroEnv(num_players=2, teams=[[LearningPlayer("learner")], [RandomBotPlayer("random")]], flat_obs=True, seed=SEED)
+    env.reset()
+    n = int(50000 * scale)
+
+    def run():
+        for _ in range(n):
+            env._get_obs()
+    return _micros(run, n)
+
+
+@benchmark("obs_to_tensor", "us/obs", higher_is_better=False)
+def bench_obs_to_tensor(scale):
+    '''
+    Cópia da observação achatada para um tensor (1, 24), como no PreprocessEnv do notebook
+    '''
+    obs = np.zeros(STATE_DIMS, dtype=np.float32)
+    n = int(50000 * scale)
+
+    def run():
+        for _ in range(n):
+            torch.from_numpy(obs).unsqueeze(dim=0).to(device, copy=True)
+    return _micros(run, n)
+
+
+def _network_choose_action(scale, backend=None):
+    player = NetworkBotPlayer("network", _network(), backend=backend)
+    env = TrucoMineiroEnv(num_players=2, teams=[[LearningPlayer("learner")], [RandomBotPlayer("random")]], flat_obs=True, seed=SEED)
+    obs, info = env.reset()
+    player.choose_action(obs, info)
+    n = int(5000 * scale)
+
+    def run():
+        for _ in range(n):
+            player.choose_action(obs, info)
+    return _micros(run, n)
+
+
+def _network_choose_actions(scale, backend=None):
+    player = NetworkBotPlayer("network", _network(), backend=backend)
+    states = np.random.randint(0, 4, size=(256, STATE_DIMS)).astype(np.float32)
+    masks = valid_actions_mask(states)
+    masks[:, 0] = True
+    player.choose_actions(states, masks)
+    n = int(200 * scale)
+
+    def run():
+        for _ in range(n):
+            player.choose_actions(states, masks)
+    return _micros(run, n * len(states))
+
+
+@benchmark("network_choose_action", "us/decision", higher_is_better=False)
+def bench_network_choose_action(scale):
+    '''
+    NetworkBotPlayer.choose_action, uma decisão por forward
+    '''
+    return _network_choose_action(scale)
+
+
+@benchmark("network_choose_actions_256", "us/decision", higher_is_better=False)
+def bench_network_choose_actions(scale):
+    '''
+    NetworkBotPlayer.choose_actions em lotes de 256 estados (um forward por lote)
+    '''
+    return _network_choose_actions(scale)
+
+
+@benchmark("numpy_choose_action", "us/decision", higher_is_better=False)
+def bench_numpy_choose_action(scale):
+    '''
+    network_choose_action com o backend de inferência numpy (truco_inference)
+    '''
+    return _network_choose_action(scale, "numpy")
+
+
+@benchmark("numpy_choose_actions_256", "us/decision", higher_is_better=False)
+def bench_numpy_choose_actions(scale):
+    return _network_choose_actions(scale, "numpy")
+
+
+@benchmark("torchscript_choose_action", "us/decision", higher_is_better=False)
+def bench_torchscript_choose_action(scale):
+    return _network_choose_action(scale, "torchscript")
+
+
+def _filled_buffer(buffer, size=100000):
+    buffer.insert_many(
+        np.random.random((size, STATE_DIMS)).astype(np.float32),
+        np.random.randint(0, NUM_ACTIONS, size),
+        np.random.random(size).astype(np.float32),
+        np.random.random(size) < 0.1,
+        np.random.random((size, STATE_DIMS)).astype(np.float32),
+    )
+    return buffer
+
+
+@benchmark("replay_sample_uniform", "us/batch", higher_is_better=False)
+def bench_replay_sample_uniform(scale):
+    '''
+    ReplayBuffer.sample(32) com 100 mil transições
+    '''
+    buffer = _filled_buffer(ReplayBuffer(capacity=100000))
+    n = int(5000 * scale)
+
+    def run():
+        for _ in range(n):
+            buffer.sample(32)
+    return _micros(run, n)
+
+
+@benchmark("replay_sample_prioritized", "us/batch", higher_is_better=False)
+def bench_replay_sample_prioritized(scale):
+    '''
+    PrioritizedReplayBuffer.sample(32) e update_priorities com 100 mil transições
+    '''
+    buffer = _filled_buffer(PrioritizedReplayBuffer(capacity=100000))
+    td_errors = np.random.random(32)
+    n = int(2000 * scale)
+
+    def run():
+        for _ in range(n):
+            batch = buffer.sample(32)
+            buffer.update_priorities(batch[-1], td_errors)
+    return _micros(run, n)
+
+
+@benchmark("batch_env_step", "steps/s")
+def bench_batch_env_step(scale):
+    '''
+    BatchTrucoMineiroEnv com 4096 jogos e ações aleatórias válidas
+    '''
+    env = BatchTrucoMineiroEnv(4096, seed=SEED)
+    rng = np.random.default_rng(SEED)
+    n = int(100 * scale)
+
+    def run():
+        obs, info = env.reset()
+        for _ in range(n):
+            valid = info["valid_actions"]
+            obs, rewards, dones, info = env.step(np.argmax(rng.random(valid.shape) * valid, axis=1))
+    return _rate(run, n * env.num_envs)
+
+
+def load_notebook(path=os.path.join(_ROOT, "truco.ipynb")):
+    '''
+    Executa as células de definição da seção de Deep QLearning do notebook (imports, device
+    e classes) e retorna o namespace com PreprocessEnv e DeepQLearning
+    '''
+    with open(path, encoding="utf-8") as f:
+        cells = json.load(f)["cells"]
+    namespace = {}
+    for cell in cells:
+        source = "".join(cell["source"])
+        if cell["cell_type"] != "code":
+            # A seção de Deep SARSA redefine o PreprocessEnv
+            if source.startswith("## Deep SARSA"):
+                break
+            continue
+        if source.startswith("# Imports") or source.startswith("device =") or source.startswith("class "):
+            exec(source, namespace)
+    return namespace
+
+
+def _dql_run(scale, inference_backend=None):
+    namespace = load_notebook()
+    env = TrucoMineiroEnv(
+        num_players=2, teams=[[LearningPlayer("deep_qlearning")], [RandomBotPlayer("random")]], flat_obs=True, seed=SEED
+    )
+    learner = namespace["DeepQLearning"](
+        env=env, eps=0.01, alpha=0.1, gamma=0.99, transition_batch_size=32,
+        copy_period=100, change_period=100, selection_window=50, inference_backend=inference_backend,
+    )
+    # run cria um replay buffer novo e só treina depois de enchê-lo com alguns episódios,
+    # então mesmo no modo rápido são episódios suficientes para a fase de atualizações pesar
+    n = int(100 * max(scale, 0.5))
+
+    def run():
+        # Sem a barra de progresso do tqdm na saída
+        with contextlib.redirect_stderr(io.StringIO()):
+            learner.run(n)
+    return _rate(run, n)
+
+
+@benchmark("dql_run", "episodes/s")
+def bench_dql_run(scale):
+    '''
+    DeepQLearning.run do notebook de ponta a ponta contra um RandomBotPlayer
+    '''
+    return _dql_run(scale)
+
+
+@benchmark("dql_run_numpy", "episodes/s")
+def bench_dql_run_numpy(scale):
+    '''
+    dql_run com as jogadas do learner pelo backend de inferência numpy
+    '''
+    return _dql_run(scale, "numpy")
+
+
+@benchmark("vector_dql_run", "episodes/s")
+def bench_vector_dql_run(scale):
+    '''
+    VectorDQLTrainer.run com 16 sub-envs num SyncTrucoVectorEnv contra um RandomBotPlayer
+    '''
+    teams = [[LearningPlayer("deep_qlearning")], [RandomBotPlayer("random")]]
+    env_fn = functools.partial(TrucoMineiroEnv, num_players=2, teams=teams, flat_obs=True)
+    n = int(1000 * max(scale, 0.5))
+    with SyncTrucoVectorEnv(env_fn, 16) as vector_env:
+        trainer = VectorDQLTrainer(vector_env, seed=SEED)
+        start = time.perf_counter()
+        stats = trainer.run(n, progress=False)
+        return len(stats["victories"]) / (time.perf_counter() - start)
+
+
+@benchmark("actor_learner_run", "episodes/s")
+def bench_actor_learner_run(scale):
+    '''
+    ActorLearner.run com 2 actors contra um RandomBotPlayer (inclui iniciar os processos)
+    '''
+    teams = [[LearningPlayer("deep_qlearning")], [RandomBotPlayer("random")]]
+    env_fn = functools.partial(TrucoMineiroEnv, num_players=2, teams=teams, flat_obs=True)
+    n = int(500 * max(scale, 0.5))
+    start = time.perf_counter()
+    with ActorLearner(env_fn, num_actors=2, seed=SEED) as actor_learner:
+        stats = actor_learner.run(n)
+    return len(stats["victories"]) / (time.perf_counter() - start)
+
+
+def machine_info():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def run_benchmarks(names=None, repeats=3, scale=1):
+    '''
+    Roda os benchmarks (todos ou só names) e retorna o dicionário de resultados
+    '''
+    results = {}
+    for name in names or BENCHMARKS:
+        function, unit, higher_is_better = BENCHMARKS[name]
+        values = []
+        for repeat in range(repeats):
+            # Mesmas sementes em toda repetição
+            seed_everything(SEED)
+            values.append(function(scale))
+        results[name] = {
+            "value": statistics.median(values),
+            "unit": unit,
+            "higher_is_better": higher_is_better,
+            "values": values,
+        }
+        print(f"{name}: {results[name]['value']:.3f} {unit}", file=sys.stderr)
+    return {"machine": machine_info(), "scale": scale, "repeats": repeats, "results": results}
+
+
+def compare(old, new):
+    '''
+    Tabela com a razão novo/antigo de cada benchmark (> 1 = melhorou)
+    '''
+    lines = []
+    for name, result in new["results"].items():
+        if name not in old["results"]:
+            continue
+        before, after = old["results"][name]["value"], result["value"]
+        speedup = after / before if result["higher_is_better"] else before / after
+        lines.append(f"{name}: {before:.3f} -> {after:.3f} {result['unit']} ({speedup:.2f}x)")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do TrucoMineiroEnv")
+    parser.add_argument("--output", help="arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="roda só estes benchmarks")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--quick", action="store_true", help="tamanhos reduzidos (teste rápido)")
+    parser.add_argument("--compare", help="JSON de uma execução anterior para comparar")
+    args = parser.parse_args(argv)
+
+    # Medidas em uma thread só, para serem comparáveis entre máquinas e execuções
+    torch.set_num_threads(1)
+    report = run_benchmarks(args.only, args.repeats, scale=0.1 if args.quick else 1)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(json.load(f), report), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# Imports
+import numpy as np
+import torch
+
+from truco_encoding import STATE_DIMS
+
+device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+
+
+class ReplayBuffer:
+    """
+    Buffer circular de transições (state, action, reward, done, next_state) em tensores
+    contíguos pré-alocados
+
+    Cada campo é um único tensor (capacity, dims) na CPU: float32 para estados e recompensas,
+    int64 para ações e bool para dones. Inserir copia para a próxima posição livre e amostrar
+    é um sorteio de índices seguido de um index_select por campo, sem listas de tensores nem
+    torch.cat. As amostras têm o mesmo formato do antigo TransitionBuffer (batch, dims) e são
+    entregues em device; com pin_memory=True (e device na GPU) a cópia passa por memória
+    fixada e é assíncrona. Os índices saem de um gerador próprio (seed: int, SeedSequence ou
+    None), não do estado global do torch.
+    """
+
+    def __init__(self, capacity=1000000, state_dims=STATE_DIMS, device=device, pin_memory=False, seed=None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.device = torch.device(device)
+        # Memória fixada só serve para copiar as amostras para a GPU
+        self.pin_memory = pin_memory and self.device.type == "cuda"
+        self.position = 0
+        self.size = 0
+
+        self.states = torch.zeros((capacity, state_dims), dtype=torch.float32)
+        self.actions = torch.zeros((capacity, 1), dtype=torch.int64)
+        self.rewards = torch.zeros((capacity, 1), dtype=torch.float32)
+        self.dones = torch.zeros((capacity, 1), dtype=torch.bool)
+        self.next_states = torch.zeros((capacity, state_dims), dtype=torch.float32)
+        self.fields = (self.states, self.actions, self.rewards, self.dones, self.next_states)
+
+    def insert(self, transition):
+        '''
+        Insere uma transição [state, action, reward, done, next_state] (tensores 1 x dims)
+        '''
+        self.insert_many(*transition)
+
+    def insert_many(self, states, actions, rewards, dones, next_states):
+        '''
+        Insere um lote de transições de uma vez (ex.: um passo de um vetor de envs)
+
+        Aceita arrays numpy ou tensores (em qualquer device) com o lote na primeira dimensão.
+        '''
+        values = [torch.as_tensor(v) for v in (states, actions, rewards, dones, next_states)]
+        n = len(values[0])
+        if n > self.capacity:
+            # Só as últimas capacity transições sobreviveriam mesmo
+            values = [v[-self.capacity:] for v in values]
+            n = self.capacity
+
+        start, end = self.position, self.position + n
+        for field, value in zip(self.fields, values):
+            value = value.reshape(n, -1)
+            if end <= self.capacity:
+                field[start:end] = value
+            else:
+                # Duas fatias contíguas: até o fim do buffer e o que dá a volta
+                first = self.capacity - start
+                field[start:] = value[:first]
+                field[:n - first] = value[first:]
+
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size):
+        assert self.can_sample(batch_size)
+
+        # Índices uniformes (com reposição, o que não faz diferença prática com buffers grandes)
+        indices = torch.from_numpy(self.rng.integers(self.size, size=batch_size))
+        return [self._gather(field, indices) for field in self.fields]
+
+    def _gather(self, field, indices):
+        if self.pin_memory:
+            # O alocador de memória fixada do torch reaproveita os blocos e sabe quando a
+            # cópia assíncrona terminou, então alocar a cada amostra é barato e seguro
+            batch = torch.empty((len(indices), field.shape[1]), dtype=field.dtype, pin_memory=True)
+            torch.index_select(field, 0, indices, out=batch)
+            return batch.to(self.device, non_blocking=True)
+        return field.index_select(0, indices).to(self.device)
+
+    def can_sample(self, batch_size):
+        return self.size >= batch_size * 10
+
+    def __len__(self):
+        return self.size
+
+
+class SumTree:
+    """
+    Árvore de somas sobre as prioridades de capacity posições, guardada em um único array
+
+    As folhas ficam em tree[leaves:leaves + capacity] e cada nó interno i guarda a soma dos
+    filhos 2i e 2i+1 (a raiz tree[1] é o total). Atualizar e buscar custam O(log n) por
+    índice e são feitos nível a nível para o lote inteiro de uma vez.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        # Número de folhas arredondado para potência de 2: todas as folhas no mesmo nível
+        self.leaves = 1 << max(capacity - 1, 1).bit_length()
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def get(self, indices):
+        return self.tree[np.asarray(indices) + self.leaves]
+
+    def update(self, indices, priorities):
+        '''
+        Define a prioridade das posições indices e recalcula as somas até a raiz
+        '''
+        tree = self.tree
+        nodes = np.asarray(indices, dtype=np.int64).reshape(-1) + self.leaves
+        tree[nodes] = priorities
+        if len(nodes) == 1:
+            # Caminho escalar: bem mais barato que operações numpy em arrays de 1 elemento
+            node = int(nodes[0]) >> 1
+            while node:
+                tree[node] = tree[2 * node] + tree[2 * node + 1]
+                node >>= 1
+            return
+        # Índices repetidos só reescrevem a mesma soma
+        nodes >>= 1
+        while nodes[0]:
+            tree[nodes] = tree[2 * nodes] + tree[2 * nodes + 1]
+            nodes >>= 1
+
+    def find(self, values):
+        '''
+        Posições cujas somas acumuladas de prioridade contêm cada valor em [0, total)
+        '''
+        tree = self.tree
+        nodes = np.ones(len(values), dtype=np.int64)
+        values = np.array(values, dtype=np.float64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            left_sum = tree[left]
+            # Nunca desce para uma subárvore vazia (erros de arredondamento perto do total)
+            go_right = (values >= left_sum) & (tree[left + 1] > 0)
+            values -= left_sum * go_right
+            nodes = left + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayBuffer(ReplayBuffer):
+    """
+    ReplayBuffer com amostragem proporcional ao erro TD (prioritized experience replay)
+
+    Cada transição é amostrada com probabilidade p_i^alpha / soma(p^alpha), com p_i = |erro TD|
+    + epsilon; transições novas entram com a maior prioridade já vista para serem usadas pelo
+    menos uma vez. sample devolve, além dos campos do ReplayBuffer, os pesos de importance
+    sampling (batch, 1) normalizados pelo máximo e os índices amostrados, que devem voltar
+    para update_priorities junto com os novos erros TD. beta sobe linearmente até 1 a cada
+    amostra. A amostragem usa o gerador do buffer (seed, ver ReplayBuffer).
+    """
+
+    def __init__(self, capacity=1000000, alpha=0.6, beta=0.4, beta_increment=1e-5, epsilon=1e-3, **kwargs):
+        super().__init__(capacity, **kwargs)
+        self.alpha = alpha
+        self.beta = beta
+        self.beta_increment = beta_increment
+        self.epsilon = epsilon
+        self.max_priority = 1.0
+        self.priorities = SumTree(capacity)
+
+    def insert_many(self, states, actions, rewards, dones, next_states):
+        start = self.position
+        super().insert_many(states, actions, rewards, dones, next_states)
+        n = min(len(states), self.capacity)
+        indices = (start + np.arange(n)) % self.capacity
+        self.priorities.update(indices, self.max_priority ** self.alpha)
+
+    def sample(self, batch_size):
+        assert self.can_sample(batch_size)
+
+        # Amostragem estratificada: um valor uniforme em cada fatia de total / batch_size
+        total = self.priorities.total()
+        values = (np.arange(batch_size) + self.rng.random(batch_size)) * (total / batch_size)
+        indices = self.priorities.find(values)
+
+        probabilities = self.priorities.get(indices) / total
+        weights = (self.size * probabilities) ** -self.beta
+        weights /= weights.max()
+        self.beta = min(1.0, self.beta + self.beta_increment)
+
+        batch = [self._gather(field, torch.from_numpy(indices)) for field in self.fields]
+        weights = torch.from_numpy(weights).float().view(-1, 1).to(self.device)
+        return batch + [weights, indices]
+
+    def update_priorities(self, indices, td_errors):
+        '''
+        Atualiza as prioridades das transições amostradas com os novos erros TD
+        '''
+        if torch.is_tensor(td_errors):
+            td_errors = td_errors.detach().cpu().numpy()
+        priorities = np.abs(td_errors).reshape(-1) + self.epsilon
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.priorities.update(indices, priorities ** self.alpha)
@@ -0,0 +1,166 @@
+# Imports
+import copy
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+from truco_players import NetworkBotPlayer, device
+
+WEIGHTS_FILE = "weights.bin"
+INDEX_FILE = "index.json"
+
+
+class CheckpointStore:
+    """
+    Snapshots de pesos de uma rede num único arquivo em disco, com carga sob demanda
+
+    Cada snapshot é o state_dict achatado num vetor (float32 ou float16, ver dtype) anexado
+    ao fim de directory/weights.bin, que é lido como memmap: as páginas são do arquivo e o
+    sistema pode descartá-las, então a memória residente não cresce com o número de
+    snapshots. directory/index.json guarda o nome, o episódio, o rating e a posição de cada
+    snapshot e o layout do state_dict (nomes e formatos dos tensores). Nada é lido com
+    pickle: a rede é refeita por network_fn, uma função sem argumentos que cria a
+    arquitetura (ex.: truco_trainer.default_q_network), e recebe os pesos do arquivo. Sem
+    network_fn a loja usa uma cópia da primeira rede anexada no processo, então uma loja
+    reaberta depois de reiniciar o processo precisa de network_fn para carregar snapshots.
+
+    load materializa a rede de um snapshot e mantém as max_live mais recentes num LRU; as
+    demais são descartadas e relidas do disco quando voltarem a ser pedidas. O índice é
+    reescrito (de forma atômica) a cada append e em flush.
+    """
+
+    def __init__(self, directory, network_fn=None, dtype="float32", max_live=8):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"dtype must be float32 or float16, got {dtype}.")
+        self.directory = directory
+        self.max_live = max_live
+        os.makedirs(directory, exist_ok=True)
+        self.weights_path = os.path.join(directory, WEIGHTS_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+
+        self.entries = []
+        self.layout = None
+        self.dtype = np.dtype(dtype)
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                index = json.load(f)
+            self.entries = index["entries"]
+            self.layout = [(key, tuple(shape)) for key, shape in index["layout"]]
+            self.dtype = np.dtype(index["dtype"])
+            if self.dtype != np.dtype(dtype):
+                raise ValueError(f"{directory} stores {self.dtype} weights, got dtype={dtype}.")
+        self._positions = {entry["name"]: i for i, entry in enumerate(self.entries)}
+
+        self.network_fn = network_fn
+        self.template = None
+        if network_fn is not None:
+            self._set_template(network_fn())
+        self._data = None
+        self._live = OrderedDict()
+
+    def _set_template(self, network):
+        # Rede de referência (CPU, eval) copiada a cada load
+        self.template = copy.deepcopy(network).cpu().eval()
+        layout = [(key, tuple(value.shape)) for key, value in self.template.state_dict().items()]
+        if self.layout is not None and layout != self.layout:
+            raise ValueError("The network does not match the layout of the stored snapshots.")
+        self.layout = layout
+
+    def _array(self):
+        # Memmap do arquivo de pesos, refeito depois de cada append
+        if self._data is None:
+            self._data = np.memmap(self.weights_path, dtype=self.dtype, mode="r")
+        return self._data
+
+    def append(self, name, network, episode=None, rating=None):
+        '''
+        Anexa os pesos atuais da rede como um novo snapshot
+        '''
+        if name in self._positions:
+            raise ValueError(f"Snapshot {name} already exists.")
+        if self.template is None:
+            self._set_template(network)
+        state_dict = network.state_dict()
+        vector = np.concatenate([
+            state_dict[key].detach().cpu().numpy().astype(self.dtype, copy=False).reshape(-1) for key, _ in self.layout
+        ])
+        with open(self.weights_path, "ab") as f:
+            # Alinha ao tamanho do dtype (sobras de uma escrita interrompida ficam de fora)
+            f.write(b"\0" * (-f.tell() % self.dtype.itemsize))
+            offset = f.tell() // self.dtype.itemsize
+            f.write(vector.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self._data = None
+
+        self._positions[name] = len(self.entries)
+        self.entries.append({"name": name, "episode": episode, "rating": rating, "offset": offset, "size": vector.size})
+        self.flush()
+        return len(self.entries) - 1
+
+    def flush(self):
+        '''
+        Reescreve o índice (nomes, episódios, ratings e posições)
+        '''
+        index = {
+            "dtype": self.dtype.name,
+            "layout": [(key, list(shape)) for key, shape in self.layout or []],
+            "entries": self.entries,
+        }
+        temp_path = self.index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_path, self.index_path)
+
+    def entry(self, name):
+        return self.entries[self._positions[name]]
+
+    def set_rating(self, name, rating):
+        # Só em memória até o próximo append ou flush
+        self.entry(name)["rating"] = rating
+
+    def load(self, name):
+        '''
+        Rede do snapshot (módulo vivo em eval no device), pelo LRU de até max_live redes
+        '''
+        network = self._live.get(name)
+        if network is not None:
+            self._live.move_to_end(name)
+            return network
+        entry = self.entry(name)
+        if self.template is None:
+            raise ValueError(f"{self.directory} was reopened without network_fn: cannot rebuild the snapshots.")
+        vector = self._array()[entry["offset"]:entry["offset"] + entry["size"]]
+        network = copy.deepcopy(self.template)
+        state_dict = network.state_dict()
+        with torch.no_grad():
+            offset = 0
+            for key, shape in self.layout:
+                size = int(np.prod(shape, dtype=np.int64))
+                # Cópia: o memmap é somente leitura
+                values = np.array(vector[offset:offset + size], dtype=np.float32).reshape(shape)
+                state_dict[key].copy_(torch.from_numpy(values))
+                offset += size
+        network = network.eval().to(device)
+        self._live[name] = network
+        if len(self._live) > self.max_live:
+            self._live.popitem(last=False)
+        return network
+
+    def player(self, name, backend=None):
+        '''
+        NetworkBotPlayer com a rede do snapshot
+        '''
+        return NetworkBotPlayer(name, self.load(name), backend=backend)
+
+    def names(self):
+        return [entry["name"] for entry in self.entries]
+
+    def __contains__(self, name):
+        return name in self._positions
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,97 @@
+# Imports
+import numpy as np
+
+# Codificação compacta das cartas
+#   id = 10 * naipe + valor, com naipes e valores em ordem alfabética. Assim, ordenar ids
+#   equivale a ordenar os nomes ('clubs_4', ...) e o sentinela de carta jogada (NO_CARD=40)
+#   sempre fica no fim da mão ordenada.
+SUITS = ('clubs', 'diamonds', 'hearts', 'spades')
+RANKS = ('2', '3', '4', '5', '6', '7', 'ace', 'jack', 'king', 'queen')
+NUM_CARDS = 40
+NO_CARD = 40
+
+# Nomes das cartas (usados apenas para renderizar e mostrar ao humano)
+CARD_NAMES = tuple(f'{suit}_{rank}' for suit in SUITS for rank in RANKS)
+CARD_IDS = {name: card for card, name in enumerate(CARD_NAMES)}
+
+_DEFAULT_POINTS = {'3': 10, '2': 9, 'ace': 8, 'king': 7, 'jack': 6, 'queen': 5, '7': 4, '6': 3, '5': 2, '4': 1}
+_MANILHAS = {'clubs_4': 14, 'hearts_7': 13, 'spades_ace': 12, 'diamonds_7': 11}
+
+# Pontuação de cada carta por id: 4p=14 > 7c=13 > Ae=12 > 7o=11 > 3=10 > ... > 4=1
+# (índice NO_CARD = carta jogada/indisponível = 0)
+CARD_POINTS = np.zeros(NUM_CARDS + 1, dtype=np.int8)
+for _card, _name in enumerate(CARD_NAMES):
+    CARD_POINTS[_card] = _MANILHAS.get(_name, _DEFAULT_POINTS[_name.split('_')[-1]])
+CARD_POINTS.flags.writeable = False
+
+# Valores da aposta indexados como em obs["current_bet"] (0=2, 1=4, 2=6, 3=10, 4=12)
+BET_VALUES = np.array([2, 4, 6, 10, 12], dtype=np.int16)
+BET_VALUES.flags.writeable = False
+BET_INDEX = {int(value): index for index, value in enumerate(BET_VALUES)}
+
+
+def card_name(card):
+    '''
+    Nome da carta (ex.: 'clubs_4') ou 'x' para carta jogada
+    '''
+    return 'x' if card == NO_CARD else CARD_NAMES[card]
+
+
+# Layout do vetor de estado achatado (float32, STATE_DIMS posições) usado pelos aprendizes,
+# pelo NetworkBotPlayer e pelo modo flat_obs do TrucoMineiroEnv. Mesmas chaves e ordem de
+# TrucoMineiroEnv._get_obs:
+#   0-2   current_player_cards  pontuação das cartas na mão (0 = carta jogada)
+#   3     other_card            pontuação da carta do outro jogador na mesa (0 = nenhuma)
+#   4     first_hand_winner     0=primeira mão; 1=Player 1 ganhou; 2=Player 2 ganhou; 3=empate
+#   5     current_player_score  placar de quem joga
+#   6     other_player_score    placar do adversário
+#   7     current_bet           índice em BET_VALUES
+#   8     trucable              1 se pode pedir truco/aumento
+#   9     respond               1 se precisa responder a truco/aumento
+#   10-23 card_frequency        quantas cartas de cada pontuação (1 a 14) já saíram no round
+STATE_LAYOUT = {
+    "current_player_cards": slice(0, 3),
+    "other_card": slice(3, 4),
+    "first_hand_winner": slice(4, 5),
+    "current_player_score": slice(5, 6),
+    "other_player_score": slice(6, 7),
+    "current_bet": slice(7, 8),
+    "trucable": slice(8, 9),
+    "respond": slice(9, 10),
+    "card_frequency": slice(10, 24),
+}
+STATE_DIMS = 24
+
+
+def flatten_obs(obs, out=None):
+    '''
+    Converte a observação em dicionário para o vetor de estado de STATE_LAYOUT
+    '''
+    if out is None:
+        out = np.empty(STATE_DIMS, dtype=np.float32)
+    for key, index in STATE_LAYOUT.items():
+        out[index] = obs[key]
+    return out
+
+# Máscaras de ações válidas: bit a ligado = ação a permitida
+#   bits 0-2: jogar carta 0/1/2; bit 3: truco/aumento; bits 4-5: aceitar/recusar
+NUM_ACTIONS = 6
+RESPOND_MASK = 0b110000
+# Tabelas por máscara (0 a 63): tupla de ações e array booleano (somente leitura)
+MASK_ACTIONS = tuple(tuple(a for a in range(NUM_ACTIONS) if mask >> a & 1) for mask in range(1 << NUM_ACTIONS))
+MASK_BOOLS = np.array([[mask >> a & 1 for a in range(NUM_ACTIONS)] for mask in range(1 << NUM_ACTIONS)], dtype=bool)
+MASK_BOOLS.flags.writeable = False
+# Colunas do vetor de estado que determinam cada ação (cartas, trucable, respond, respond)
+_MASK_COLUMNS = [0, 1, 2, 8, 9, 9]
+
+
+def valid_actions_mask(states):
+    '''
+    Máscara booleana (batch, 6) de ações válidas a partir de estados empilhados (batch, 24)
+
+    Funciona tanto com arrays numpy quanto com tensores torch e segue as mesmas regras de
+    TrucoMineiroEnv._determine_valid_actions: quem precisa responder só aceita ou recusa.
+    '''
+    mask = states[:, _MASK_COLUMNS] != 0
+    mask[:, :4] &= ~mask[:, 4:5]
+    return mask
@@ -1,12 +1,16 @@
 # Imports
-import os
+import functools
+
 import numpy as np
 import gymnasium as gym
 from gymnasium import spaces
 from gymnasium.error import DependencyNotInstalled
-import random
 
 from truco_players import LearningPlayer, NonLearningPlayer
+from truco_profiling import NULL_PROFILER
+from truco_encoding import (
+    NUM_CARDS, NO_CARD, CARD_NAMES, CARD_POINTS, BET_INDEX, STATE_DIMS, RESPOND_MASK, MASK_ACTIONS, MASK_BOOLS
+)
 
 import warnings
 
@@ -31,19 +35,84 @@ dict_deck = {
     0: "Carta indisponível",
 }
 
-# Ambiente
-"""
-TODO: renderizar ambiente
-TODO: implementar mecânica de truco
-TODO: implementar 2v2
-"""
 
+def spawn_seeds(seed, n):
+    '''
+    n sementes independentes (SeedSequence) derivadas de seed, ou n Nones sem seed
+    '''
+    if seed is None:
+        return [None] * n
+    if isinstance(seed, (list, tuple)):
+        if len(seed) != n:
+            raise ValueError(f"Expected {n} seeds, got {len(seed)}.")
+        return seed
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return seed.spawn(n)
+
+
+# Pontuações em lista para as operações escalares do env
+_POINTS = CARD_POINTS.tolist()
+
+
+@functools.lru_cache(maxsize=None)
+def env_state_dtype(num_players):
+    '''
+    Registro de tamanho fixo com o estado do jogo de um TrucoMineiroEnv (ver get_state)
+    '''
+    return np.dtype([
+        ("cards", np.int8, (num_players, 3)),   # mãos por assento (NO_CARD = jogada)
+        ("table_cards", np.int8, (num_players,)),
+        ("hand_mask", np.uint8, (num_players,)),
+        ("best_cards", np.int8, (2,)),
+        ("best_seats", np.int8, (2,)),
+        ("card_frequency", np.int8, (14,)),
+        ("game_score", np.int16, (2,)),
+        ("round_score", np.int8, (2,)),
+        ("trucable", np.bool_, (2,)),
+        ("num_table_cards", np.int8),
+        ("turn", np.int8),
+        ("round_starter", np.int8),
+        ("current_player", np.int8),
+        ("hand_starter", np.int8),
+        ("truco_caller", np.int8),
+        ("first_hand_winner", np.int8),
+        ("hand_winner", np.int8),
+        ("current_bet", np.int8),
+        ("respond", np.bool_),
+        ("round_ended", np.bool_),
+        ("action_mask", np.uint8),
+    ])
+
+
+# Ambiente
 class TrucoMineiroEnv(gym.Env):
     """
-    Ambiente truco mineiro 1v1 multi agentes
-    """
+    Ambiente truco mineiro multi agentes, 1v1 ou em duplas (2v2)
 
-    def __init__(self, num_players, teams):
+    Os jogadores sentam alternando os times (assento par = time 0, ímpar = time 1) e a vez
+    passa para o próximo assento. Placares, pontos da rodada, first_hand_winner/hand_winner
+    (time + 1 ou 3=empate) e a permissão de truco são por time; mãos e cartas na mesa são por
+    assento. No 1v1 assento e time coincidem. O truco é respondido pelo próximo adversário e
+    a vez volta para quem pediu; other_card é a maior carta do time adversário na mesa.
+    """
+    # Instrumentação opcional (ver truco_profiling): env.profiler = Profiler()
+    profiler = NULL_PROFILER
+    # Gravação opcional das decisões (ver truco_game_log): env.logger = GameLogWriter(path);
+    # log_game é a (partida, semente) atual no log e seed_value a última semente recebida
+    logger = None
+    log_game = None
+    seed_value = None
+    # Assento do jogador que aprende (se houver) e de quem fez a última jogada
+    learning_seat = None
+    last_player_index = None
+    # Resultado, para o time do jogador que aprende, das rodadas que acabaram antes da vez
+    # dele (ver skip_round)
+    pending_reward = 0
+    pending_done = False
+    pending_victory = False
+
+    def __init__(self, num_players, teams, flat_obs=False, obs_buffer=None, seed=None):
         # Inicializa o espaço de ação e observação
         # Espaço de ação
         #   0: jogar carta 0, 1: jogar carta 1, 2: jogar carta 2
@@ -73,37 +142,63 @@ class TrucoMineiroEnv(gym.Env):
                 "card_frequency": spaces.MultiDiscrete([3, 4, 4, 2, 4, 4, 4, 3, 4, 4, 1, 1, 1, 1])
             }
         )
-        # Cria o deck
-        self.deck = self._create_deck()
-        # Cria a tabela de pontuações das cartas
-        self.map = self._map_cards()
+        # Observação achatada: em vez do dict, escreve o vetor de estado (layout em
+        # truco_encoding.STATE_LAYOUT) num buffer float32 reutilizado, que pode ser fornecido
+        # por quem chama (ex.: uma linha de um array maior). O mesmo buffer é retornado a
+        # cada passo, então é preciso copiá-lo para guardar a observação.
+        self.flat_obs = flat_obs or obs_buffer is not None
+        if self.flat_obs:
+            if obs_buffer is None:
+                obs_buffer = np.zeros(STATE_DIMS, dtype=np.float32)
+            elif obs_buffer.shape != (STATE_DIMS,) or obs_buffer.dtype != np.float32:
+                raise ValueError(f"obs_buffer must be a float32 array of shape ({STATE_DIMS},).")
+            self.observation_space = spaces.Box(0, np.inf, (STATE_DIMS,), dtype=np.float32)
+        self.obs_buffer = obs_buffer
         # Contador de mãos jogadas
         self.turn = 0
-        # Placar [jogador1, jogador2]
+        # Placar [time 0, time 1]
         self.game_score = [0, 0]
         self.round_score = [0, 0]
         # Cria agentes
+        if num_players < 2 or num_players % 2:
+            raise ValueError(f"num_players must be a positive even number, got {num_players}.")
         self.num_players = num_players
         self.teams = None
         self.players = [None for _ in range(num_players)]
         self.has_learning_player = None
         self.set_players(teams)
-        self.cards = [[] for _ in range(num_players)]
+        # Sorteios do env (deck e quem começa) vêm de self.np_random; seed também semeia os
+        # geradores dos jogadores (ver seed)
+        if seed is not None:
+            self.seed(seed)
+        # Cria o deck (cartas são ids de 0 a 39, ver truco_encoding) e as mãos (num_players, 3)
+        self.deck = self._create_deck()
+        self.cards = np.full((num_players, 3), NO_CARD, dtype=np.int8)
         # Aleatoriza quem começa
-        self.round_starter = random.randint(0, num_players - 1)
+        self.round_starter = int(self.np_random.integers(num_players))
         self.current_player_index = self.round_starter
-        self.other_player_index = 1 - self.current_player_index # conferir isso depois pro n v n
-        self.current_card = 'x'
-        self.other_card = 'x'
+        # Cartas na mesa na mão atual por assento (NO_CARD = ainda não jogou), quantas já
+        # foram jogadas, maior carta de cada time na mesa e o assento que a jogou primeiro,
+        # quem abriu a mão e quem pediu o último truco/aumento
+        self.table_cards = [NO_CARD] * num_players
+        self.num_table_cards = 0
+        self.best_cards = [NO_CARD, NO_CARD]
+        self.best_seats = [0, 0]
+        self.hand_starter = self.round_starter
+        self.truco_caller = self.round_starter
         self.first_hand_winner = 0
         self.hand_winner = 0
         # Frequência de cartas jogadas no round
         self.card_frequency = np.array(14 * [0])
         # Mecânica de truco
         self.current_bet = 2
-        self.trucable = [True, True] # Se é trucável/aumentável
+        self.trucable = [True, True] # Se cada time pode pedir truco/aumentar
         self.respond = False
         self.round_ended = False
+        # Máscara de ações válidas do jogador da vez (bit a = ação a), mantida a cada ação
+        # a partir dos bits das cartas que cada jogador ainda tem na mão
+        self.hand_mask = [0b111 for _ in range(num_players)]
+        self.action_mask = 0
         # Inicializa cartas
         self.reset()
 
@@ -111,9 +206,13 @@ class TrucoMineiroEnv(gym.Env):
         self.teams = teams
         num_learning_players = 0
         for i in range(self.num_players // 2):
-            if teams[0][i].type == LearningPlayer: num_learning_players += 1
+            if teams[0][i].type == LearningPlayer:
+                num_learning_players += 1
+                self.learning_seat = 2 * i
             self.players[2 * i] = teams[0][i]
-            if teams[1][i].type == LearningPlayer: num_learning_players += 1
+            if teams[1][i].type == LearningPlayer:
+                num_learning_players += 1
+                self.learning_seat = 2 * i + 1
             self.players[2 * i + 1] = teams[1][i]
 
         if num_learning_players == 0:
@@ -123,59 +222,133 @@ class TrucoMineiroEnv(gym.Env):
         else:
             raise Exception("There cannot be more than 1 learning player!")
 
-    def _create_deck(self):
-       # Retorna uma lista embaralhada de cartas
-        suits = ['spades', 'hearts', 'diamonds', 'clubs']
-        ranks = ['ace', '2', '3', '4', '5', '6', '7', 'jack', 'queen', 'king']
-        deck = []
-        for suit in suits:
-            for rank in ranks:
-                deck.append(f'{suit}_{rank}')
-        random.shuffle(deck)
-        return deck
-
-    def _map_cards(self):
-        default_mapping = {
-            '3': 10,
-            '2': 9,
-            'ace': 8,
-            'king': 7,
-            'jack': 6,
-            'queen': 5,
-            '7': 4,
-            '6': 3,
-            '5': 2,
-            '4': 1
-        }
+    def seed(self, seed=None):
+        '''
+        Semeia o gerador do env e, com sementes filhas independentes, os dos jogadores
 
-        card_points_map = {
-            'x': 0, # carta já jogada
-            'clubs_4': 14,
-            'hearts_7': 13,
-            'spades_ace': 12,
-            'diamonds_7': 11
-        }
-        for card in self.deck:
-            if card not in card_points_map:
-                card_points_map[card] = default_mapping[card.split('_')[-1]]
+        seed pode ser um int ou um np.random.SeedSequence (ex.: um dos filhos gerados por
+        SeedSequence.spawn para um vetor de envs).
+        '''
+        self.seed_value = seed
+        env_seed, *player_seeds = spawn_seeds(seed, 1 + self.num_players)
+        self._np_random = np.random.default_rng(env_seed)
+        for player, player_seed in zip(self.players, player_seeds):
+            player.seed(player_seed)
 
-        return card_points_map
+    def get_state(self, out=None):
+        '''
+        Estado do jogo num registro de tamanho fixo (array 0-d de env_state_dtype)
+
+        set_state restaura o estado exatamente, então um env pode ser salvo e voltar ao mesmo
+        ponto quantas vezes for preciso (ex.: simulações de uma busca). Ficam de fora os
+        geradores aleatórios, os jogadores e o deck, que só serve para distribuir as mãos no
+        reset. out permite reutilizar um registro.
+        '''
+        state = np.zeros((), dtype=env_state_dtype(self.num_players)) if out is None else out
+        state["cards"] = self.cards
+        state["table_cards"] = self.table_cards
+        state["hand_mask"] = self.hand_mask
+        state["best_cards"] = self.best_cards
+        state["best_seats"] = self.best_seats
+        state["card_frequency"] = self.card_frequency
+        state["game_score"] = self.game_score
+        state["round_score"] = self.round_score
+        state["trucable"] = self.trucable
+        state["num_table_cards"] = self.num_table_cards
+        state["turn"] = self.turn
+        state["round_starter"] = self.round_starter
+        state["current_player"] = self.current_player_index
+        state["hand_starter"] = self.hand_starter
+        state["truco_caller"] = self.truco_caller
+        state["first_hand_winner"] = self.first_hand_winner
+        state["hand_winner"] = self.hand_winner
+        state["current_bet"] = self.current_bet
+        state["respond"] = self.respond
+        state["round_ended"] = self.round_ended
+        state["action_mask"] = self.action_mask
+        return state
+
+    def set_state(self, state):
+        '''
+        Restaura um estado de get_state (de um env com o mesmo num_players)
+        '''
+        # Um item() só desempacota o registro inteiro, bem mais rápido que campo a campo
+        (
+            cards, table_cards, hand_mask, best_cards, best_seats, card_frequency, game_score,
+            round_score, trucable, self.num_table_cards, self.turn, self.round_starter,
+            self.current_player_index, self.hand_starter, self.truco_caller,
+            self.first_hand_winner, self.hand_winner, self.current_bet, self.respond,
+            self.round_ended, self.action_mask,
+        ) = state.item()
+        self.cards[:] = cards
+        self.table_cards = table_cards.tolist()
+        self.hand_mask = hand_mask.tolist()
+        self.best_cards = best_cards.tolist()
+        self.best_seats = best_seats.tolist()
+        self.card_frequency[:] = card_frequency
+        self.game_score = game_score.tolist()
+        self.round_score = round_score.tolist()
+        self.trucable = trucable.tolist()
+
+    def _create_deck(self):
+        # Retorna uma permutação dos ids de cartas (um único sorteio)
+        return self.np_random.permutation(NUM_CARDS).astype(np.int8)
 
     def _draw_cards(self):
-        for i in range(self.num_players):
-            self.cards[i] = np.sort(
-                [self.deck.pop(random.randint(0, len(self.deck) - 1)) for _ in range(3)]
-            )
+        # Mãos são linhas int8 ordenadas; cartas jogadas viram NO_CARD e vão para o fim
+        self.cards[:] = self.deck[:3 * self.num_players].reshape(self.num_players, 3)
+        self.cards.sort(axis=1)
 
-    def reset(self, reset_score=True):
+    def reset(self, reset_score=True, play_opponent=True, seed=None):
+        # play_opponent=False deixa a primeira jogada do oponente para quem chama (ex.: vetor
+        # de envs que decide as jogadas dos oponentes em lote)
         if self.players[0] == None: raise Exception("Players must be set before calling reset!")
+        if seed is not None:
+            self.seed(seed)
+            self.round_starter = int(self.np_random.integers(self.num_players))
+        # Resultados pendentes de antes do reset não passam para o novo episódio
+        self.pending_reward, self.pending_done, self.pending_victory = 0, False, False
+        self._deal(reset_score)
+        if play_opponent and self.has_learning_player:
+            # Os outros jogam até a vez do jogador que aprende (no 1v1, no máximo uma ação)
+            while self.players[self.current_player_index].type == NonLearningPlayer:
+                _, reward, done, info = self.handle_action(
+                    self.players[self.current_player_index].choose_action(self._get_obs(), self._get_info())
+                )
+                # No 2v2 a rodada pode acabar antes (truco recusado entre os outros)
+                if info["round_ended"]:
+                    self.skip_round(reward, done)
+        return self._get_obs(), self._get_info()
+
+    def skip_round(self, reward, done):
+        '''
+        Começa uma nova rodada depois de uma que acabou antes da vez do jogador que aprende
+
+        No 2v2 os outros podem encerrar a rodada (truco recusado) logo depois de um reset. A
+        recompensa e o done dela ficam pendentes e entram no próximo finish_step; se o jogo
+        acabou, esse passo (já no jogo novo) fecha o episódio com done=True. Não joga pelos
+        outros na rodada nova.
+        '''
+        self.pending_reward += self._learner_reward(reward)
+        if done:
+            self.pending_done = True
+            self.pending_victory = self.game_score[self.learning_seat % 2] >= 12
+        self._deal(reset_score=done)
+        return self._get_obs(), self._get_info()
+
+    def _deal(self, reset_score):
+        # Distribui as mãos de uma nova rodada (e zera o placar com reset_score)
+        self.profiler.count("env.resets")
+        if reset_score and self.logger is not None:
+            self.logger.new_game(self)
         self.deck = self._create_deck()
         self._draw_cards()
-        self.round_starter = 1 - self.round_starter
+        self.round_starter = (self.round_starter + 1) % self.num_players
         self.current_player_index = self.round_starter
-        self.other_player_index = 1 - self.current_player_index
-        self.current_card = 'x'
-        self.other_card = 'x'
+        self.hand_starter = self.round_starter
+        self.table_cards = [NO_CARD] * self.num_players
+        self.num_table_cards = 0
+        self.best_cards = [NO_CARD, NO_CARD]
         self.turn = 0
         if reset_score:
             self.game_score = [0, 0]
@@ -186,25 +359,64 @@ class TrucoMineiroEnv(gym.Env):
         self.trucable = [True, True]
         self.respond = False
         self.round_ended = False
-        if self.has_learning_player and self.players[self.current_player_index].type == NonLearningPlayer:
-            self.handle_action(self.players[self.current_player_index].choose_action(self._get_obs(), self._get_info()))
-        return self._get_obs(), self._get_info()
+        self.hand_mask = [0b111 for _ in range(self.num_players)]
+        self._update_action_mask()
 
     def step(self, action):
         if not self.has_learning_player: raise Exception("step method cannot be used without a learning player!")
+        profiler = self.profiler
         # Processa a ação do agente
-        obs, reward, done, info = self.handle_action(action)
-        # Estimula e processa as ações dos demais jogadores (SUPORTE PARA APENAS 1v1 POR ENQUANTO)
-        while not info["round_ended"] and self.players[self.current_player_index].type == NonLearningPlayer:
-            obs, reward, done, info = self.handle_action(self.players[self.current_player_index].choose_action(obs, info))
+        with profiler.timer("env.handle_action"):
+            obs, reward, done, info = self.handle_action(action)
+        # Estimula e processa as ações dos demais jogadores (adversários e, no 2v2, o parceiro)
+        while self.opponent_to_play(info):
+            with profiler.timer("opponent.choose_action"):
+                opponent_action = self.players[self.current_player_index].choose_action(obs, info)
+            with profiler.timer("env.handle_action"):
+                obs, reward, done, info = self.handle_action(opponent_action)
+        return self.finish_step(obs, reward, done, info)
+
+    def opponent_to_play(self, info):
+        '''
+        Se a vez é de um jogador que não aprende e a rodada ainda não acabou
+        '''
+        return not info["round_ended"] and self.players[self.current_player_index].type == NonLearningPlayer
+
+    def finish_step(self, obs, reward, done, info):
+        '''
+        Ajusta o resultado da última ação para o jogador que aprende (usado por step)
+        '''
+        self.profiler.count("env.steps")
         if info["round_ended"]:
-            if self.players[self.current_player_index] == LearningPlayer:
-                reward = -reward
-            else:
-                info["victory"] = not info["victory"]
+            self.profiler.count("env.rounds")
+            if done:
+                self.profiler.count("env.games")
+            # Victory é do time da vez e passa para o time do jogador que aprende, como a
+            # recompensa
+            reward = self._learner_reward(reward)
+            info["victory"] = self.game_score[self.learning_seat % 2] >= 12
+        if self.pending_reward or self.pending_done:
+            reward += self.pending_reward
+            done = done or self.pending_done
+            info["victory"] = info["victory"] or self.pending_victory
+            self.pending_reward, self.pending_done, self.pending_victory = 0, False, False
         return obs, reward, done, info
 
+    def _learner_reward(self, reward):
+        # A recompensa é do time de quem fez a última jogada
+        return reward if self.last_player_index % 2 == self.learning_seat % 2 else -reward
+
     def handle_action(self, action):
+        self.last_player_index = self.current_player_index
+        if self.logger is None:
+            return self._apply_action(action)
+        # O logger lê o estado de quem joga antes da ação e o resultado depois
+        self.logger.begin(self, action)
+        obs, reward, done, info = self._apply_action(action)
+        self.logger.commit(self, reward, done)
+        return obs, reward, done, info
+
+    def _apply_action(self, action):
         # por ora está:
         # obs e info relativos ao jogador depois do que executou a ação
         # reward relativo a quem executou a ação
@@ -246,10 +458,12 @@ class TrucoMineiroEnv(gym.Env):
             else:
                 self.current_bet -= 2
             reward = -self.current_bet
-            self.game_score[self.other_player_index] += self.current_bet # atualiza o placar primeiro
+            self.game_score[1 - self.current_team] += self.current_bet # atualiza o placar primeiro
             done = any(x >= 12 for x in self.game_score)
             self.round_ended = True
-        self._switch_players()
+        # A vez volta para quem pediu
+        self.current_player_index = self.truco_caller
+        self._update_action_mask()
         return self._get_obs(), reward, done, self._get_info()
 
     def handle_truco_call(self):
@@ -257,7 +471,8 @@ class TrucoMineiroEnv(gym.Env):
         Lógica para pedir truco ou aumentar aposta
         '''
         # Quando não pode pedir truco
-        if self.trucable[self.current_player_index] == False:
+        team = self.current_team
+        if self.trucable[team] == False:
             raise ValueError(f"Invalid action. Player is not allowed to truco/raise.")
         if self.current_bet >= 12:
             raise ValueError(f"Invalid action. Current bet is maxed at {self.current_bet}.")
@@ -266,18 +481,19 @@ class TrucoMineiroEnv(gym.Env):
             self.current_bet = 10
         else:
             self.current_bet += 2
-        # Current não pode mais pedir/aumentar truco
-        self.trucable[self.current_player_index] = False
-        # Se os dois já forem ganhar o jogo com a aposta atual, other não pode mais aumentar
+        # O time de current não pode mais pedir/aumentar truco
+        self.trucable[team] = False
+        # Se os dois já forem ganhar o jogo com a aposta atual, o outro time não pode mais aumentar
         min_sum_score_bet = min([(self.current_bet + score) for score in self.game_score])
         if min_sum_score_bet >= 12:
-            self.trucable[self.other_player_index] = False
+            self.trucable[1 - team] = False
         else:
-            self.trucable[self.other_player_index] = True
-        # Solicita resposta do other
+            self.trucable[1 - team] = True
+        # Solicita resposta do próximo adversário
         self.respond = True
-        # Passa a vez
-        self._switch_players()
+        self.truco_caller = self.current_player_index
+        self.current_player_index = self.other_player_index
+        self._update_action_mask()
         reward, done = 0, False
         return self._get_obs(), reward, done, self._get_info()
 
@@ -286,31 +502,36 @@ class TrucoMineiroEnv(gym.Env):
         Lógica para jogar carta
         '''
         # Verifica se a ação é válida
-        n_cards = sum(1 for x in self.cards[self.current_player_index] if x != 'x')
-        possible_actions = range(0, n_cards)
-        if action not in possible_actions:
+        seat = self.current_player_index
+        team = seat % 2
+        hand = self.cards[seat]
+        if hand[action] == NO_CARD:
             raise ValueError(f"Invalid action. Player tried to play an unavailable card.")
 
         # Executa a ação do jogador atual
-        card_played = self.cards[self.current_player_index][action]
-        self.cards[self.current_player_index][action] = 'x'  # Marca a carta como jogada
-        self.current_card = card_played
-        self.card_frequency[self.map[card_played] - 1] += 1
-
-        # Sort na mão do player
-        self.cards[self.current_player_index] = np.sort(
-            self.cards[self.current_player_index]
-        )
-
-        # Se o outro jogador ainda não jogou, encerra a chamada
-        if self.other_card == 'x':
-            self._switch_players()
+        card_played = int(hand[action])
+        hand[action] = NO_CARD  # Marca a carta como jogada
+        points = _POINTS[card_played]
+        self.table_cards[seat] = card_played
+        self.num_table_cards += 1
+        if points > _POINTS[self.best_cards[team]]:
+            self.best_cards[team] = card_played
+            self.best_seats[team] = seat
+        self.card_frequency[points - 1] += 1
+
+        # Sort na mão do player (in-place, a carta jogada vai para o fim), então a mão perde
+        # o bit da última posição ocupada
+        hand.sort()
+        self.hand_mask[seat] >>= 1
+
+        # Se ainda falta alguém jogar, passa a vez para o próximo assento
+        if self.num_table_cards < self.num_players:
+            self.current_player_index = (seat + 1) % self.num_players
+            self._update_action_mask()
             return self._get_obs(), 0, False, self._get_info()
 
-        # Determina o vencedor da mão se houver
-        self.hand_winner = self._determine_hand_winner(
-            self.current_card, self.other_card
-        )
+        # Determina o vencedor da mão (time) e o assento da carta vencedora
+        self.hand_winner, winner_seat = self._determine_hand_winner()
         if self.hand_winner == 1 or self.hand_winner == 2:
             self.round_score[self.hand_winner - 1] += 1
 
@@ -324,69 +545,117 @@ class TrucoMineiroEnv(gym.Env):
             self.first_hand_winner = self.hand_winner
 
         # Reseta as cartas jogadas
-        self.other_card = 'x'
-        self.current_card = 'x'
+        self.table_cards = [NO_CARD] * self.num_players
+        self.num_table_cards = 0
+        self.best_cards = [NO_CARD, NO_CARD]
 
         # Avança o turno
         self.turn += 1
 
-        # Determina a recompensa (0 para empates ou rodada inacabada, +1 vitória, -1 derrota)
-        if round_winner == self.current_player_index + 1:
+        # Determina a recompensa para o time de quem jogou (0 para empates ou rodada inacabada)
+        if round_winner == team + 1:
             reward = self.current_bet
-        elif round_winner == self.other_player_index + 1:
+        elif round_winner == 2 - team:
             reward = -self.current_bet
         else:
             reward = 0
 
-        # Troca os jogadores de lugar se precisar (mantém em caso de empate, senão quem ganhou começa a próxima)
-        self._switch_players()
-        if self.hand_winner == 1:
-            self.current_player_index, self.other_player_index = 0, 1
-        elif self.hand_winner == 2:
-            self.current_player_index, self.other_player_index = 1, 0
+        # Quem jogou a carta vencedora começa a próxima mão; em caso de empate, quem abriu esta
+        if self.hand_winner != 3:
+            self.hand_starter = winner_seat
+        self.current_player_index = self.hand_starter
 
         done = any(x >= 12 for x in self.game_score)
 
         # Retorna a observação, a recompensa (-1, 0 ou 1) se a rodada acabou ou 0 se a rodada não acabou e a flag de rodada acabada
         if round_winner != 0:
             self.round_ended = True
+        self._update_action_mask()
 
         return self._get_obs(), reward, done, self._get_info()
 
     def play(self):
-        if self.has_learning_player: raise Exception("play method cannot be used with a learning player")
-        while True:
-            pass
-
-    def _switch_players(self):
-        self.current_player_index, self.other_player_index = self.other_player_index, self.current_player_index
-        self.current_card, self.other_card = self.other_card, self.current_card
+        '''
+        Joga uma partida inteira entre jogadores que não aprendem
 
-    def _determine_hand_winner(self, card1, card2):
-        # Determina quem vence a mão (1=Player 1 ganha; 2=Player 2 ganha; 3=empate)
-        if self.map[card1] > self.map[card2]:
-            return self.current_player_index + 1  # Current ganha
-        elif self.map[card2] > self.map[card1]:
-            return self.other_player_index + 1  # Other jogador ganha
-        return 3  # Empate
+        Retorna o índice do time vencedor (0 ou 1).
+        '''
+        if self.has_learning_player: raise Exception("play method cannot be used with a learning player")
+        obs, info = self.reset(reset_score=True)
+        done = False
+        while not done:
+            action = self.players[self.current_player_index].choose_action(obs, info)
+            obs, reward, done, info = self.handle_action(action)
+            if info["round_ended"] and not done:
+                obs, info = self.reset(reset_score=False)
+        return self.game_winner()
+
+    def game_winner(self):
+        # Time que chegou a 12 pontos (jogadores pares no time 0, ímpares no time 1)
+        return 0 if self.game_score[0] >= 12 else 1
+
+    @property
+    def other_player_index(self):
+        # Próximo assento na rotação, sempre do time adversário (no 1v1, o outro jogador)
+        return (self.current_player_index + 1) % self.num_players
+
+    @property
+    def current_team(self):
+        return self.current_player_index % 2
+
+    @property
+    def other_card(self):
+        # Maior carta do time adversário na mesa (NO_CARD se nenhum adversário jogou)
+        return self.best_cards[1 - self.current_player_index % 2]
+
+    def _determine_hand_winner(self):
+        '''
+        Vencedor da mão com todas as cartas na mesa: time (1=time 0; 2=time 1; 3=empate) e
+        assento da carta vencedora (o primeiro do time a jogar a maior carta)
+        '''
+        points0, points1 = _POINTS[self.best_cards[0]], _POINTS[self.best_cards[1]]
+        if points0 > points1:
+            return 1, self.best_seats[0]
+        elif points1 > points0:
+            return 2, self.best_seats[1]
+        return 3, self.hand_starter  # Empate
 
     def _get_obs(self):
-        bet_dict = {2:0, 4:1, 6:2, 10:3, 12:4}
+        if self.flat_obs:
+            return self._write_flat_obs()
+        team = self.current_player_index % 2
         return {
-            "current_player_cards": [self.map[card] for card in self.cards[self.current_player_index]],
-            "other_card": self.map[self.other_card],
+            "current_player_cards": CARD_POINTS[self.cards[self.current_player_index]],
+            "other_card": int(CARD_POINTS[self.other_card]),
             "first_hand_winner": self.first_hand_winner,
-            "current_player_score": self.game_score[self.current_player_index],
-            "other_player_score": self.game_score[self.other_player_index],
-            "current_bet": bet_dict[self.current_bet],
-            "trucable": self.trucable[self.current_player_index],
+            "current_player_score": self.game_score[team],
+            "other_player_score": self.game_score[1 - team],
+            "current_bet": BET_INDEX[self.current_bet],
+            "trucable": self.trucable[team],
             "respond": self.respond,
             "card_frequency": self.card_frequency,
         }
 
+    def _write_flat_obs(self, obs=None):
+        # Mesma informação do dict, na ordem de STATE_LAYOUT (em obs_buffer ou no array obs)
+        if obs is None:
+            obs = self.obs_buffer
+        obs[0:3] = CARD_POINTS.take(self.cards[self.current_player_index])
+        obs[3] = CARD_POINTS[self.other_card]
+        obs[4] = self.first_hand_winner
+        team = self.current_player_index % 2
+        obs[5] = self.game_score[team]
+        obs[6] = self.game_score[1 - team]
+        obs[7] = BET_INDEX[self.current_bet]
+        obs[8] = self.trucable[team]
+        obs[9] = self.respond
+        obs[10:] = self.card_frequency
+        return obs
+
     def _get_info(self):
         return {
             "current_player_cards": self.cards[self.current_player_index],
+            "table_cards": self.table_cards,
             "round_score": self.round_score,
             "game_score": self.game_score,
             "hand_winner": self.hand_winner - 1,
@@ -394,38 +663,35 @@ class TrucoMineiroEnv(gym.Env):
             "current_bet_value": self.current_bet,
             "round_ended": self.round_ended,
             "valid_actions": self._determine_valid_actions(),
-            "victory": self.game_score[self.current_player_index] >= 12,
+            "action_mask": self.action_mask,
+            "valid_mask": MASK_BOOLS[self.action_mask],
+            "seat": self.current_player_index,
+            "victory": self.game_score[self.current_player_index % 2] >= 12,
         }
 
-    def _determine_valid_actions(self):
-        valid_actions = []
-        if self.respond: valid_actions += [4, 5]
+    def _update_action_mask(self):
+        # Quem precisa responder só aceita ou recusa; senão, cartas na mão e truco/aumento
+        if self.respond:
+            self.action_mask = RESPOND_MASK
         else:
-            if self.cards[self.current_player_index][0] != 'x': valid_actions += [0]
-            if self.cards[self.current_player_index][1] != 'x': valid_actions += [1]
-            if self.cards[self.current_player_index][2] != 'x': valid_actions += [2]
-            if self.trucable[self.current_player_index]: valid_actions += [3]
-        return valid_actions
+            self.action_mask = self.hand_mask[self.current_player_index] | (self.trucable[self.current_player_index % 2] << 3)
+
+    def _determine_valid_actions(self):
+        return MASK_ACTIONS[self.action_mask]
 
     def _determine_round_winner(self):
         # Lógica para determinar o vencedor de uma rodada
-        # 0=indeterminado; 1=Player 1 ganha; 2=Player 2 ganha; 3=empate
+        # 0=indeterminado; 1=time 0 ganha; 2=time 1 ganha; 3=empate
         if self.turn == 2:  # Terceiro turno
             return self.hand_winner
         if self.first_hand_winner == 3:  # Primeira mão empatou
             if self.hand_winner == 3:
                 return 0
             return self.hand_winner
-        if (
-            self.first_hand_winner == self.current_player_index + 1
-            and self.hand_winner != self.other_player_index + 1
-        ):  # Current ganha primeira mão
-            return self.current_player_index + 1
-        if (
-            self.first_hand_winner == self.other_player_index + 1
-            and self.hand_winner != self.current_player_index + 1
-        ):  # Other ganha primeira mão
-            return self.other_player_index + 1
+        for team in (1, 2):
+            # Quem ganhou a primeira mão leva se não perder a segunda
+            if self.first_hand_winner == team and self.hand_winner != 3 - team:
+                return team
         return 0  # Default
 
     def render(self, render_mode="rgb_array"):
@@ -435,209 +701,33 @@ class TrucoMineiroEnv(gym.Env):
             raise DependencyNotInstalled(
                 "pygame is not installed, run `pip install pygame`"
             )
-
-        observation = self._get_obs()
-        current_player_cards = self.cards[self.current_player_index]
-        other_card = self.other_card
-        respond = self.respond
-        first_hand_winner = observation["first_hand_winner"]
-        score = f"{observation['current_player_score']} x {observation['other_player_score']}"
-        current_bet = observation["current_bet"]
-
-
-        num_players = len(self.players)
-        screen_width, screen_height = 900, 750
-        card_img_height = 141
-        card_img_width = 101
-        logo_width = 54
-        logo_height = 64
-        spacing = 50
-
-        bg_color = (7, 99, 36)
-        white = (255, 255, 255)
-        yellow = (255, 255, 51)
+        from truco_render import SCREEN_WIDTH, SCREEN_HEIGHT, TrucoRenderer, frame_surface
 
         if not hasattr(self, "screen"):
             pygame.init()
             if self.render_mode == "human":
                 pygame.display.init()
-                self.screen = pygame.display.set_mode((screen_width, screen_height))
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
             else:
                 pygame.font.init()
-                self.screen = pygame.Surface((screen_width, screen_height))
+                # A tela escreve direto no array do quadro (self.frame, H x W x 3)
+                self.screen, self.frame = frame_surface()
 
         if not hasattr(self, "clock"):
             self.clock = pygame.time.Clock()
 
-        self.screen.fill(bg_color)
-
-        def get_image(path):
-            cwd = os.path.dirname(__file__)
-            image = pygame.image.load(os.path.join(cwd, path))
-            return image
-
-        def get_font(path, size):
-            cwd = os.path.dirname(__file__)
-            font = pygame.font.Font(os.path.join(cwd, path), size)
-            return font
-
-        small_font = get_font(
-            os.path.join("font", "Roboto-Black.ttf"), 35
-        )
-
-        score_text = small_font.render(
-            f"Player's team {score} Opponent's team", True, white
-        )
-        score_text_rect = self.screen.blit(score_text, (screen_width // 2 - score_text.get_width() // 2, spacing // 4))
-
-        def scale_card_img(card_img, shape=(card_img_width, card_img_height)):
-            return pygame.transform.scale(card_img, shape)
-
-        table_logo = scale_card_img(
-            get_image(
-                os.path.join(
-                    "img",
-                    f"turing_logo.png",
-                )
-            ),
-            (logo_width, logo_height)
-        )
-        for idx in range(4):
-            self.screen.blit(
-                table_logo,
-                (
-                    (idx // 2) * screen_width + (1 - 2 * (idx // 2)) * spacing - logo_width // 2,
-                    (idx % 2) * screen_height + (1 - 2 * (idx % 2)) * spacing - logo_height // 2,
-                )
-            )
-
-        def calc_coord_x(num_cards, idx):
-            if num_cards == 3:
-                return screen_width // 2 - (3 - 2 * idx) * (card_img_width // 2) - (1 - idx) * spacing // 4
-            elif num_cards == 2:
-                return screen_width // 2 - (1 - idx) * (card_img_width) - (1 - 2 * idx) * spacing // 4
-            else:
-                return screen_width // 2 - card_img_width // 2
-
-        other_team_text = small_font.render(
-            "Other team:", True, white
-        )
-        other_team_text_rect = self.screen.blit(
-            other_team_text, (spacing, score_text_rect.bottom + card_img_height // 2 + spacing - other_team_text.get_height() // 2)
-            )
-
-        for idx in range(num_players):
-            # TODO: mudar para as cartas de todos do time adversário
-            if not self.other_card == 'x':
-                card_img = scale_card_img(
-                    get_image(
-                        os.path.join(
-                            "img",
-                            f"{self.other_card}.png",
-                        )
-                    )
-                )
-                self.screen.blit(
-                    card_img,
-                    (
-                        calc_coord_x(num_cards=num_players/2, idx=idx),
-                        score_text_rect.bottom + spacing,
-                    ),
-                )
-
-        first_round_title = small_font.render(
-            "First round:", True, white
-        )
-        first_round_title_rect = self.screen.blit(
-            first_round_title,
-            (
-                screen_width - spacing - first_round_title.get_width(),
-                score_text_rect.bottom + card_img_height // 2 + spacing - first_round_title.get_height()
-            )
-        )
-
-        first_round_str = "Win" if first_hand_winner == self.current_player_index + 1 else "Loss" if first_hand_winner == self.other_player_index + 1 else "Draw" if self.turn == 2 else " "
-        first_round_status = small_font.render(
-            first_round_str, True, white
-        )
-        self.screen.blit(
-            first_round_status,
-            (
-                screen_width - spacing - (first_round_title.get_width() // 2 + first_round_status.get_width() // 2),
-                first_round_title_rect.bottom
-            )
-        )
-
-
-        team2_text = small_font.render(
-            "Player's team:", True, white
-        )
-        team2_text_rect = self.screen.blit(
-            team2_text, (spacing, other_team_text_rect.bottom + card_img_height + spacing - team2_text.get_height() // 2)
-            )
-
-        #for idx in range(num_players):
-            # TODO: mudar para as cartas do time
-
-
-        current_bet_title = small_font.render(
-            "Current bet:", True, white
-        )
-        current_bet_title_rect = self.screen.blit(
-            current_bet_title,
-            (
-                screen_width - spacing - current_bet_title.get_width(),
-                other_team_text_rect.bottom + card_img_height + spacing - current_bet_title.get_height()
-            )
-        )
-
-        current_bet_list = ["None", "Truco", "6", "9", "12"]
-        current_bet_status = small_font.render(
-            f"{current_bet_list[current_bet]}", True, white
-        )
-        self.screen.blit(
-            current_bet_status,
-            (
-                screen_width - spacing - (current_bet_title.get_width() // 2 + current_bet_status.get_width() // 2),
-                current_bet_title_rect.bottom
-            )
-        )
-
-        log_str = "Truco or raise called" if respond else ""
-        log_text = small_font.render(log_str, True, yellow)
-        log_text_rect = self.screen.blit(
-            log_text, (screen_width - spacing - log_text.get_width(), team2_text_rect.bottom + 2.0 * spacing)
-        )
-
-        player_text = small_font.render("Player's hand", True, white)
-        self.screen.blit(
-            player_text, (spacing, log_text_rect.bottom + spacing)
-        )
-
-
-
-        num_cards = sum([1 for card in self.cards[self.current_player_index] if card != 'x'])
-        for idx in range(num_cards):
-            card_img = scale_card_img(
-                get_image(
-                    os.path.join(
-                        "img",
-                        f"{self.cards[self.current_player_index][idx]}.png",
-                    )
-                )
-            )
-            self.screen.blit(
-                card_img,
-                (
-                    calc_coord_x(num_cards=num_cards, idx=idx),
-                    team2_text_rect.bottom + 3.75 * spacing,
-                ),
-            )
+        # Sprites, fontes e fundo são preparados uma vez; cada quadro só redesenha o que muda
+        if not hasattr(self, "renderer"):
+            self.renderer = TrucoRenderer(self.screen)
+        self.renderer.draw(self)
 
         if render_mode == "human":
             pygame.event.pump()
             pygame.display.update()
             self.clock.tick(self.metadata["render_fps"])
+        elif hasattr(self, "frame"):
+            # Visão sem cópia, reescrita no próximo render: copie para guardar o quadro
+            return self.frame
         else:
             return np.transpose(
                 np.array(pygame.surfarray.pixels3d(self.screen)), axes=(1, 0, 2)
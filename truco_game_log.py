@@ -0,0 +1,374 @@
+# Imports
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+from truco_encoding import STATE_DIMS, NUM_ACTIONS, MASK_BOOLS
+
+INDEX_FILE = "index.json"
+
+# Colunas gravadas por decisão: nome -> (dtype, formato de uma linha). O estado é o vetor de
+# STATE_LAYOUT do ponto de vista de quem joga (valores inteiros pequenos, então cabe em int8)
+LOG_COLUMNS = {
+    "state": (np.int8, (STATE_DIMS,)),
+    "valid_mask": (np.bool_, (NUM_ACTIONS,)),
+    "action": (np.int8, ()),
+    "reward": (np.int8, ()),              # recompensa para o time de quem jogou
+    "round_ended": (np.bool_, ()),
+    "done": (np.bool_, ()),
+    "bet": (np.int8, ()),                 # valor da aposta antes da ação
+    "scores": (np.int8, (2,)),            # placar [time 0, time 1] antes da ação
+    "seat": (np.int8, ()),
+    "player": (np.int16, ()),             # índice em players (nomes dos jogadores)
+    "game": (np.int64, ()),
+    "seed": (np.int64, ()),               # ver seed_id
+}
+
+
+def seed_id(seed):
+    '''
+    Identificador int64 da semente do env: o próprio int, um hash de 63 bits para
+    SeedSequences (ex.: filhas de um vetor de envs) ou -1 sem semente
+    '''
+    if seed is None:
+        return -1
+    if isinstance(seed, (int, np.integer)) and 0 <= seed < 2 ** 63:
+        return int(seed)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    return int(seed.generate_state(1, np.uint64)[0] >> np.uint64(1))
+
+
+# Colunas escalares das tuplas de begin/commit (None = tratada à parte: máscara e placar)
+_ROW_COLUMNS = (None, "action", "bet", None, None, "seat", "player", "game", "seed", "reward", "round_ended", "done")
+
+
+def _empty_chunk(size):
+    return {name: np.zeros((size, *shape), dtype=dtype) for name, (dtype, shape) in LOG_COLUMNS.items()}
+
+
+def _load_index(directory):
+    with open(os.path.join(directory, INDEX_FILE)) as f:
+        return json.load(f)
+
+
+class GameLogWriter:
+    """
+    Grava cada decisão das partidas em arquivos .npy colunares divididos em blocos
+
+    Ligado a um env (env.logger = writer), o env chama begin antes de cada handle_action e
+    commit depois, e o writer copia para a linha atual do bloco em memória o estado e a
+    máscara de quem joga, a ação, a recompensa, o placar, a aposta, o assento, o jogador, a
+    partida e a semente (ver LOG_COLUMNS). Cada bloco cheio de chunk_size decisões vira um
+    diretório part-NNNNN com um .npy por coluna, salvo por uma thread de fundo. No máximo
+    max_pending blocos esperam a gravação; com a fila cheia quem joga espera, então a memória
+    fica limitada a alguns blocos. directory/index.json (reescrito de forma atômica a cada
+    bloco) lista os blocos, os nomes dos jogadores e o número de partidas, então o log pode
+    ser reaberto para continuar gravando.
+
+    Um mesmo writer pode ser ligado a vários envs do mesmo processo (ex.: os sub-envs de um
+    SyncTrucoVectorEnv): as partidas têm ids únicos e as linhas de partidas simultâneas se
+    intercalam. close (ou sair do with) grava o bloco incompleto e espera a thread.
+    """
+
+    def __init__(self, directory, chunk_size=65536, max_pending=4):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        os.makedirs(directory, exist_ok=True)
+        self.shards = []
+        self.players = []
+        self.num_games = 0
+        if os.path.exists(os.path.join(directory, INDEX_FILE)):
+            index = _load_index(directory)
+            self.shards = index["shards"]
+            self.players = index["players"]
+            self.num_games = index["games"]
+        self._player_ids = {name: i for i, name in enumerate(self.players)}
+
+        self._chunk = _empty_chunk(chunk_size)
+        self._size = 0
+        self._rows = []
+        # Blocos já gravados voltam para reuso (no máximo max_pending + 2 blocos existem)
+        self._free = queue.SimpleQueue()
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._thread.start()
+
+    def new_game(self, env):
+        '''
+        Abre uma nova partida para o env (chamado pelo reset com reset_score)
+        '''
+        env.log_game = (self.num_games, seed_id(env.seed_value))
+        self.num_games += 1
+
+    def _player_id(self, player):
+        player_id = self._player_ids.get(player.name)
+        if player_id is None:
+            player_id = self._player_ids[player.name] = len(self.players)
+            self.players.append(player.name)
+        return player_id
+
+    def begin(self, env, action):
+        '''
+        Grava o que o jogador da vez vê antes de executar action
+        '''
+        if env.log_game is None:
+            self.new_game(env)
+        # O estado vai direto para a linha do bloco; o resto fica numa tupla até o bloco
+        # fechar (atribuir escalar por escalar em arrays numpy custa mais que o passo do env)
+        env._write_flat_obs(self._chunk["state"][self._size])
+        seat = env.current_player_index
+        game, seed = env.log_game
+        self._row = (
+            env.action_mask, action, env.current_bet, *env.game_score, seat,
+            self._player_id(env.players[seat]), game, seed,
+        )
+
+    def commit(self, env, reward, done):
+        '''
+        Completa a linha com o resultado da ação e avança (uma ação inválida não é gravada)
+        '''
+        self._rows.append((*self._row, reward, env.round_ended, done))
+        self._size += 1
+        if done:
+            env.log_game = None
+        if self._size == self.chunk_size:
+            self._submit()
+
+    def _submit(self):
+        if self._error is not None:
+            raise self._error
+        if self._size == 0:
+            return
+        chunk = self._chunk
+        rows = np.array(self._rows, dtype=np.int64)
+        for name, column in zip(_ROW_COLUMNS, rows.T):
+            if name is not None:
+                chunk[name][:self._size] = column
+        chunk["valid_mask"][:self._size] = MASK_BOOLS[rows[:, 0]]
+        chunk["scores"][:self._size] = rows[:, 3:5]
+        self._rows = []
+        shard = f"part-{len(self.shards):05d}"
+        self.shards.append({"name": shard, "rows": self._size})
+        # O índice vai junto para a thread, gravado só depois dos arquivos do bloco
+        index = {
+            "columns": {name: [np.dtype(dtype).name, list(shape)] for name, (dtype, shape) in LOG_COLUMNS.items()},
+            "shards": list(self.shards),
+            "players": list(self.players),
+            "games": self.num_games,
+        }
+        self._pending.put((shard, self._chunk, self._size, index))
+        try:
+            self._chunk = self._free.get_nowait()
+        except queue.Empty:
+            self._chunk = _empty_chunk(self.chunk_size)
+        self._size = 0
+
+    def _write_loop(self):
+        while True:
+            item = self._pending.get()
+            if item is None:
+                break
+            shard, chunk, size, index = item
+            try:
+                if self._error is None:
+                    self._write_shard(shard, chunk, size, index)
+            except Exception as error:
+                self._error = error
+            finally:
+                self._free.put(chunk)
+                self._pending.task_done()
+
+    def _write_shard(self, shard, chunk, size, index):
+        # Grava num diretório temporário e renomeia: um bloco no índice está sempre completo
+        path = os.path.join(self.directory, shard)
+        temp_path = path + ".tmp"
+        os.makedirs(temp_path, exist_ok=True)
+        for name, column in chunk.items():
+            np.save(os.path.join(temp_path, name + ".npy"), column[:size])
+        os.replace(temp_path, path)
+        temp_index = os.path.join(self.directory, INDEX_FILE + ".tmp")
+        with open(temp_index, "w") as f:
+            json.dump(index, f)
+        os.replace(temp_index, os.path.join(self.directory, INDEX_FILE))
+
+    def flush(self):
+        '''
+        Grava o bloco atual (mesmo incompleto) e espera a fila esvaziar
+        '''
+        self._submit()
+        self._pending.join()
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        try:
+            self.flush()
+        finally:
+            self._pending.put(None)
+            self._thread.join()
+
+    def __len__(self):
+        # Decisões gravadas, incluindo as que ainda estão em memória
+        return sum(shard["rows"] for shard in self.shards) + self._size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class GameLogReader:
+    """
+    Lê um log do GameLogWriter em fluxo, um bloco por vez
+
+    Os .npy são abertos como memmap, então a memória não cresce com o tamanho do log.
+    batches devolve as colunas como estão gravadas e transitions remonta as transições
+    (estado, ação, recompensa, done, próximo estado) de cada jogador no formato do
+    ReplayBuffer.insert_many, para treinar offline ou preencher um buffer (prefill) sem
+    simular as partidas de novo.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        index = _load_index(directory)
+        self.shards = index["shards"]
+        self.players = index["players"]
+        self.num_games = index["games"]
+
+    def __len__(self):
+        return sum(shard["rows"] for shard in self.shards)
+
+    def _load_shard(self, shard, columns):
+        path = os.path.join(self.directory, shard["name"])
+        return {name: np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in columns}
+
+    def batches(self, batch_size=65536, columns=None):
+        '''
+        Lotes de até batch_size decisões como dicts coluna -> array (na ordem de gravação)
+
+        Os arrays são visões somente leitura dos arquivos; o estado vem em int8.
+        '''
+        columns = list(LOG_COLUMNS) if columns is None else columns
+        for shard in self.shards:
+            data = self._load_shard(shard, columns)
+            for start in range(0, shard["rows"], batch_size):
+                yield {name: column[start:start + batch_size] for name, column in data.items()}
+
+    def _player_index(self, player):
+        if player is None or isinstance(player, (int, np.integer)):
+            return player
+        if player not in self.players:
+            raise ValueError(f"Player {player} is not in the log.")
+        return self.players.index(player)
+
+    def transitions(self, batch_size=4096, player=None):
+        '''
+        Transições (states, actions, rewards, dones, next_states) em lotes de até batch_size
+
+        Cada decisão de um assento liga à próxima decisão do mesmo assento na partida. Se a
+        rodada acaba antes, o próximo estado é todo zero (sem ações válidas, então vale 0 nos
+        alvos do QUpdater), a recompensa é a do fim da rodada para o time do assento e done
+        indica o fim da partida. player (nome ou índice em players) filtra as decisões de um
+        jogador. Partidas ainda abertas no fim de um bloco esperam o próximo; as que não
+        terminam no log têm só as transições completas.
+        '''
+        player = self._player_index(player)
+        columns = ["state", "action", "reward", "round_ended", "done", "seat", "player", "game"]
+        carry = None
+        pending = []
+        for shard in self.shards:
+            data = {name: np.asarray(column) for name, column in self._load_shard(shard, columns).items()}
+            if carry is not None:
+                data = {name: np.concatenate([carry[name], data[name]]) for name in columns}
+            # Linhas de partidas que não terminaram neste bloco ficam para o próximo
+            open_rows = ~np.isin(data["game"], data["game"][data["done"]])
+            carry = {name: column[open_rows] for name, column in data.items()}
+            pending.append(_build_transitions({name: column[~open_rows] for name, column in data.items()}, player))
+            yield from _split_batches(pending, batch_size)
+        if carry is not None:
+            pending.append(_build_transitions(carry, player))
+        yield from _split_batches(pending, batch_size, final=True)
+
+    def prefill(self, buffer, player=None, max_transitions=None, batch_size=4096):
+        '''
+        Insere as transições do log num ReplayBuffer; retorna quantas foram inseridas
+        '''
+        count = 0
+        for batch in self.transitions(batch_size, player):
+            if max_transitions is not None:
+                batch = tuple(column[:max_transitions - count] for column in batch)
+            buffer.insert_many(*batch)
+            count += len(batch[0])
+            if max_transitions is not None and count >= max_transitions:
+                break
+        return count
+
+
+def _build_transitions(data, player):
+    # Agrupa as linhas por partida (mantendo a ordem) para achar o fim da rodada e a próxima
+    # decisão do mesmo assento com operações vetorizadas
+    n = len(data["game"])
+    order = np.argsort(data["game"], kind="stable")
+    game, seat = data["game"][order], data["seat"][order]
+    round_ended, done = data["round_ended"][order], data["done"][order]
+    positions = np.arange(n)
+
+    # Próxima linha do mesmo assento na mesma partida (-1 se não houver)
+    by_seat = np.lexsort((positions, seat, game))
+    same = (game[by_seat[1:]] == game[by_seat[:-1]]) & (seat[by_seat[1:]] == seat[by_seat[:-1]])
+    successor = np.full(n, -1)
+    successor[by_seat[:-1][same]] = by_seat[1:][same]
+
+    # Primeira linha a partir de cada uma que termina a rodada, na mesma partida
+    round_end = np.minimum.accumulate(np.where(round_ended, positions, n)[::-1])[::-1]
+    has_end = round_end < n
+    has_end[has_end] = game[round_end[has_end]] == game[has_end]
+
+    terminal = has_end & ((successor < 0) | (round_end < successor))
+    keep = terminal | (successor >= 0)
+    if player is not None:
+        keep &= data["player"][order] == player
+    rows = positions[keep]
+    terminal = terminal[rows]
+    end = np.where(terminal, round_end[rows], successor[rows] - 1)
+
+    # Recompensas do ponto de vista do time 0, somadas entre a decisão e o fim da transição
+    sign = np.where(seat % 2 == 0, 1, -1)
+    team_rewards = np.cumsum(data["reward"][order].astype(np.int64) * sign)
+    start_rewards = team_rewards[rows] - data["reward"][order][rows] * sign[rows]
+    rewards = (team_rewards[end] - start_rewards) * sign[rows]
+
+    states = data["state"][order]
+    next_states = np.zeros((len(rows), STATE_DIMS), dtype=np.float32)
+    next_states[~terminal] = states[successor[rows[~terminal]]]
+    dones = np.zeros(len(rows), dtype=bool)
+    dones[terminal] = done[round_end[rows[terminal]]]
+    return (
+        states[rows].astype(np.float32),
+        data["action"][order][rows].astype(np.int64),
+        rewards.astype(np.float32),
+        dones,
+        next_states,
+    )
+
+
+def _split_batches(pending, batch_size, final=False):
+    # Junta as transições acumuladas e entrega lotes cheios (e o resto no final)
+    if not pending:
+        return
+    columns = [np.concatenate(parts) for parts in zip(*pending)]
+    pending.clear()
+    n = len(columns[0])
+    full = n if final else n - n % batch_size
+    for start in range(0, full, batch_size):
+        yield tuple(column[start:start + batch_size] for column in columns)
+    if full < n:
+        pending.append(tuple(column[full:] for column in columns))
@@ -0,0 +1,150 @@
+# Imports
+import os
+from itertools import combinations_with_replacement
+from math import comb
+
+import numpy as np
+
+from truco_encoding import NUM_CARDS, CARD_POINTS
+from truco_solver import RoundSolver
+
+NUM_HANDS = comb(NUM_CARDS, 3)  # 9880
+# Colunas do índice: quem abre a primeira mão (round_starter) ou quem responde
+STARTER, RESPONDER = 0, 1
+
+# O índice fica num diretório de cache do usuário (TRUCO_CACHE_DIR ou ~/.cache/truco), que
+# pode ser escrito mesmo com o pacote instalado num diretório somente leitura
+CACHE_DIR = os.environ.get("TRUCO_CACHE_DIR") or os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "truco"
+)
+HAND_STRENGTH_PATH = os.path.join(CACHE_DIR, "hand_strength.npy")
+
+# Sistema numérico combinatório: a mão c0 < c1 < c2 tem índice C(c0,1) + C(c1,2) + C(c2,3)
+_COMB = [[comb(n, k) for n in range(NUM_CARDS)] for k in range(4)]
+_COMB_ARRAY = np.array(_COMB, dtype=np.int64)
+
+
+def hand_index(hand):
+    '''
+    Índice (0 a 9879) de uma mão de 3 ids de cartas distintos, em qualquer ordem
+    '''
+    c0, c1, c2 = sorted(hand)
+    return _COMB[1][c0] + _COMB[2][c1] + _COMB[3][c2]
+
+
+def hand_indices(hands):
+    '''
+    hand_index vetorizado para um array (n, 3) de ids
+    '''
+    hands = np.sort(hands, axis=-1)
+    return _COMB_ARRAY[1].take(hands[..., 0]) + _COMB_ARRAY[2].take(hands[..., 1]) + _COMB_ARRAY[3].take(hands[..., 2])
+
+
+def all_hands():
+    '''
+    As 9880 mãos (9880, 3) em ordem de índice
+    '''
+    hands = np.array(
+        [(c0, c1, c2) for c2 in range(NUM_CARDS) for c1 in range(c2) for c0 in range(c1)], dtype=np.int8
+    )
+    return hands
+
+
+def build_hand_strength(path=HAND_STRENGTH_PATH, solver=None):
+    '''
+    Calcula e salva em path o índice (9880, 2) float32 com a probabilidade exata de cada mão
+    vencer a rodada contra uma mão adversária uniforme entre as C(37, 3) restantes, abrindo
+    (STARTER) ou respondendo (RESPONDER) a primeira mão, com as duas mãos jogadas com
+    informação perfeita (RoundSolver)
+
+    O resultado só depende das pontuações, então o cálculo é feito uma vez por multiconjunto
+    de pontuações da mão e contra cada multiconjunto adversário, com peso igual ao número de
+    mãos de cartas que o formam. O arquivo é gravado num temporário do mesmo diretório e
+    renomeado, então quem abre o índice nunca vê um arquivo pela metade, mesmo com vários
+    processos calculando ao mesmo tempo.
+    '''
+    solver = RoundSolver() if solver is None else solver
+    counts = np.bincount(CARD_POINTS[:NUM_CARDS], minlength=15)
+    multisets = [
+        points for points in combinations_with_replacement(range(14, 0, -1), 3)
+        if all(points.count(p) <= counts[p] for p in set(points))
+    ]
+    total = comb(NUM_CARDS - 3, 3)
+
+    strength = {}
+    for mine in multisets:
+        remaining = counts.copy()
+        for p in mine:
+            remaining[p] -= 1
+        wins = np.zeros(2)
+        for theirs in multisets:
+            weight = 1
+            for p in set(theirs):
+                weight *= comb(int(remaining[p]), theirs.count(p))
+            if weight == 0:
+                continue
+            if solver.outcome_points(mine, theirs) == 1:
+                wins[STARTER] += weight
+            if solver.outcome_points(theirs, mine) == -1:
+                wins[RESPONDER] += weight
+        strength[mine] = wins / total
+
+    hands = all_hands()
+    index = np.empty((NUM_HANDS, 2), dtype=np.float32)
+    for i, points in enumerate(np.sort(CARD_POINTS.take(hands), axis=1)[:, ::-1].tolist()):
+        index[i] = strength[tuple(points)]
+    path = os.fspath(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            np.save(f, index)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return index
+
+
+class HandStrengthIndex:
+    """
+    Força das 9880 mãos iniciais: probabilidade de vencer a rodada abrindo ou respondendo
+
+    O índice é calculado uma vez (build_hand_strength, alguns segundos) e salvo como .npy;
+    depois é aberto como memmap somente leitura, então vários processos compartilham as
+    mesmas páginas. A consulta por ids de cartas é O(1) pelo sistema numérico combinatório.
+
+    Com build=False o arquivo precisa ter sido calculado antes (build_hand_strength); senão é
+    calculado no primeiro uso em path, que precisa ser gravável.
+    """
+
+    def __init__(self, path=HAND_STRENGTH_PATH, build=True):
+        if not os.path.exists(path):
+            if not build:
+                raise FileNotFoundError(f"{path} does not exist: run build_hand_strength first.")
+            build_hand_strength(path)
+        self.table = np.load(path, mmap_mode="r")
+        if self.table.shape != (NUM_HANDS, 2):
+            raise ValueError(f"{path} is not a hand strength index of shape ({NUM_HANDS}, 2).")
+        # Mesma tabela indexada pelas pontuações da mão em ordem decrescente (p0, p1, p2),
+        # para quem só vê as pontuações (ex.: a observação do env)
+        points = -np.sort(-CARD_POINTS.take(all_hands()), axis=1)
+        self.points_table = np.zeros((15, 15, 15, 2), dtype=np.float32)
+        self.points_table[points[:, 0], points[:, 1], points[:, 2]] = self.table
+
+    def win_probability(self, hand, starter=True):
+        '''
+        Probabilidade da mão (3 ids) vencer a rodada; starter = se abre a primeira mão
+        '''
+        return float(self.table[hand_index(hand), STARTER if starter else RESPONDER])
+
+    def win_probabilities(self, hands, starter=True):
+        '''
+        win_probability vetorizado para um array (n, 3) de ids
+        '''
+        return self.table[hand_indices(hands), STARTER if starter else RESPONDER]
+
+    def __getitem__(self, hand):
+        return self.table[hand_index(hand)]
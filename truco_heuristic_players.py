@@ -0,0 +1,174 @@
+# Imports
+import numpy as np
+
+from truco_encoding import CARD_POINTS, NUM_CARDS, BET_VALUES
+from truco_players import NonLearningPlayer
+from truco_hand_strength import HandStrengthIndex, STARTER, RESPONDER
+
+# Chance de uma carta de cada pontuação (0 a 14) vencer uma carta desconhecida qualquer
+# (empates valem meio)
+_COUNTS = np.bincount(CARD_POINTS[:NUM_CARDS], minlength=15)
+BEAT_PROBABILITY = np.array(
+    [0.0] + [(_COUNTS[:p].sum() + 0.5 * (_COUNTS[p] - 1)) / (NUM_CARDS - 1) for p in range(1, 15)],
+    dtype=np.float32,
+)
+
+# Índice de força compartilhado pelos bots (carregado no primeiro uso)
+_strength_index = None
+
+
+def default_strength_index():
+    global _strength_index
+    if _strength_index is None:
+        _strength_index = HandStrengthIndex()
+    return _strength_index
+
+
+def _read_obs(obs):
+    # Campos usados pelos bots, da observação em dicionário ou achatada (STATE_LAYOUT)
+    if isinstance(obs, dict):
+        return (
+            obs["current_player_cards"].tolist(), int(obs["other_card"]), int(obs["current_player_score"]),
+            int(obs["other_player_score"]), int(obs["current_bet"]), bool(obs["respond"]),
+        )
+    values = obs[:10].tolist()
+    return values[0:3], int(values[3]), int(values[5]), int(values[6]), int(values[7]), bool(values[9])
+
+
+class GreedyBotPlayer(NonLearningPlayer):
+    """
+    Jogador guloso: abre com a carta mais forte e, respondendo, mata com a carta mais fraca
+    que vence a da mesa (ou descarta a mais fraca se nenhuma vence)
+
+    Não pede truco e aceita (accept_truco=True) ou recusa todos os pedidos. Com
+    lead_strongest=False abre com a carta mais fraca. As subclasses mudam só as decisões de
+    truco (_call e _accept), que funcionam tanto com escalares quanto com arrays.
+    """
+    batched = True
+
+    def __init__(self, name, lead_strongest=True, accept_truco=True):
+        super().__init__(name)
+        self.lead_strongest = lead_strongest
+        self.accept_truco = accept_truco
+
+    def _call(self, strength, score, other_score):
+        return strength < 0
+
+    def _accept(self, strength, score, other_score, bet):
+        return self.accept_truco | (strength < 0)
+
+    def _strength(self, points, other_card, respond):
+        # Os bots gulosos não olham a força da mão
+        return 0.0
+
+    def _strengths(self, points, other_card, respond):
+        return np.zeros(len(points), dtype=np.float32)
+
+    def _card(self, points, other_card):
+        # Posição da carta a jogar (pontuação 0 = carta já jogada)
+        in_hand = [i for i in range(3) if points[i] > 0]
+        if other_card:
+            winners = [i for i in in_hand if points[i] > other_card]
+            if winners:
+                return min(winners, key=points.__getitem__)
+            return min(in_hand, key=points.__getitem__)
+        if self.lead_strongest:
+            return max(in_hand, key=points.__getitem__)
+        return min(in_hand, key=points.__getitem__)
+
+    def choose_action(self, obs, info):
+        points, other_card, score, other_score, bet, respond = _read_obs(obs)
+        if respond:
+            strength = self._strength(points, other_card, respond)
+            return 4 if self._accept(strength, score, other_score, bet) else 5
+        if 3 in info["valid_actions"] and self._call(self._strength(points, other_card, respond), score, other_score):
+            return 3
+        return self._card(points, other_card)
+
+    def choose_actions(self, states, valid_masks):
+        # Mesmas regras de choose_action para todas as linhas de uma vez
+        points = states[:, 0:3]
+        other_card = states[:, 3]
+        score, other_score = states[:, 5], states[:, 6]
+        bet = states[:, 7].astype(np.int64)
+        respond = states[:, 9] > 0
+        strength = self._strengths(points, other_card, respond)
+
+        missing = np.float32(99)
+        weakest = np.where(points > 0, points, missing).argmin(axis=1)
+        winners = np.where(points > other_card[:, None], points, missing)
+        leading = points.argmax(axis=1) if self.lead_strongest else weakest
+        cards = np.where(
+            other_card > 0,
+            np.where(winners.min(axis=1) < missing, winners.argmin(axis=1), weakest),
+            leading,
+        )
+        call = valid_masks[:, 3] & self._call(strength, score, other_score)
+        accept = self._accept(strength, score, other_score, bet)
+        return np.where(respond, np.where(accept, 4, 5), np.where(call, 3, cards))
+
+
+class ThresholdBotPlayer(GreedyBotPlayer):
+    """
+    Jogador guloso que pede e aceita truco pela força da mão e pelo placar
+
+    A força é a chance de vencer a rodada do índice de força (HandStrengthIndex) com a mão
+    completa e, depois da primeira carta, a chance da melhor carta restante vencer a da mesa
+    (ou uma carta desconhecida). Pede truco com força >= call_threshold e aceita com força
+    >= accept_threshold; os limiares caem score_weight * (placar do outro - o seu) / 12
+    quando está atrás e sobem quando está na frente. Sempre aceita quando recusar entregaria
+    a partida.
+    """
+
+    def __init__(
+        self, name, call_threshold=0.65, accept_threshold=0.45, score_weight=0.25, strength_index=None,
+        lead_strongest=True,
+    ):
+        super().__init__(name, lead_strongest=lead_strongest)
+        self.call_threshold = call_threshold
+        self.accept_threshold = accept_threshold
+        self.score_weight = score_weight
+        index = default_strength_index() if strength_index is None else strength_index
+        self.points_table = index.points_table
+
+    def _margin(self, score, other_score):
+        return self.score_weight * (other_score - score) / 12
+
+    def _call(self, strength, score, other_score):
+        return strength >= self.call_threshold - self._margin(score, other_score)
+
+    def _accept(self, strength, score, other_score, bet):
+        # Recusar devolve a aposta anterior ao outro
+        refused = other_score + BET_VALUES.take(bet - 1) >= 12
+        return refused | (strength >= self.accept_threshold - self._margin(score, other_score))
+
+    def _strength(self, points, other_card, respond):
+        p0, p1, p2 = sorted(points, reverse=True)
+        if p2 > 0:
+            # Mão completa: quem responde ao truco antes da primeira carta ou à carta da mesa
+            # não abre a rodada
+            return float(self.points_table[int(p0), int(p1), int(p2), RESPONDER if other_card or respond else STARTER])
+        if other_card:
+            return 1.0 if p0 > other_card else 0.5 if p0 == other_card else 0.0
+        return float(BEAT_PROBABILITY[int(p0)])
+
+    def _strengths(self, points, other_card, respond):
+        ordered = -np.sort(-points.astype(np.int64), axis=1)
+        p0, p1, p2 = ordered[:, 0], ordered[:, 1], ordered[:, 2]
+        full = self.points_table[p0, p1, p2, np.where((other_card > 0) | respond, RESPONDER, STARTER)]
+        table = np.where(p0 > other_card, 1.0, np.where(p0 == other_card, 0.5, 0.0))
+        return np.where(p2 > 0, full, np.where(other_card > 0, table, BEAT_PROBABILITY.take(p0)))
+
+
+class BluffingBotPlayer(ThresholdBotPlayer):
+    """
+    ThresholdBotPlayer que também pede truco com mão fraca em bluff_probability das vezes
+    """
+
+    def __init__(self, name, bluff_probability=0.15, **kwargs):
+        super().__init__(name, **kwargs)
+        self.bluff_probability = bluff_probability
+
+    def _call(self, strength, score, other_score):
+        bluff = self.rng.random(np.shape(strength)) < self.bluff_probability
+        return bluff | super()._call(strength, score, other_score)
@@ -0,0 +1,183 @@
+# Imports
+import warnings
+
+import numpy as np
+import torch
+from torch import nn
+
+
+def _linear_layers(network):
+    '''
+    Camadas (pesos, bias, relu) de uma rede nn.Sequential de Linear e ReLU
+
+    Dropout e Identity são ignorados (só fazem diferença no treino).
+    '''
+    layers = []
+    for module in network:
+        if isinstance(module, nn.Linear):
+            layers.append([module.weight, module.bias, False])
+        elif isinstance(module, nn.ReLU) and layers:
+            layers[-1][2] = True
+        elif not isinstance(module, (nn.Dropout, nn.Identity)):
+            raise ValueError(f"Unsupported layer {type(module).__name__}: only Linear and ReLU can be exported.")
+    if not layers:
+        raise ValueError("The network has no Linear layers.")
+    return layers
+
+
+class NumpyQNetwork:
+    """
+    Forward de uma rede Q (nn.Sequential de Linear e ReLU) em numpy puro
+
+    Em lotes pequenos, principalmente de um estado só, o custo do forward do torch é quase
+    todo overhead do framework (dispatch, autograd, alocação de tensores) e não conta. Aqui
+    cada camada é um np.dot com saída em buffers pré-alocados por tamanho de lote.
+
+    Na CPU os pesos são visões dos parâmetros da rede (sem cópia), então acompanham os
+    passos do otimizador e os load_state_dict sem nada a fazer. Com a rede em outro device
+    os pesos são copiados e refresh deve ser chamado depois de cada atualização.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self._load()
+
+    def refresh(self):
+        '''
+        Relê os pesos da rede se eles não são compartilhados (rede fora da CPU)
+        '''
+        if not self.shares_weights:
+            self._load()
+
+    def _load(self):
+        self.shares_weights = all(param.device.type == "cpu" and param.dtype == torch.float32 for param in self.network.parameters())
+        self.layers = []
+        for weight, bias, relu in _linear_layers(self.network):
+            weight = weight.detach().cpu().float().numpy()
+            bias = np.zeros(weight.shape[0], dtype=np.float32) if bias is None else bias.detach().cpu().float().numpy()
+            # Transposta como visão: np.dot passa a ordem para o BLAS sem copiar
+            self.layers.append((weight.T, bias, relu))
+        self.num_actions = self.layers[-1][1].size
+        self._buffers = {}
+
+    def _activations(self, n):
+        # Saídas de cada camada para lotes de n estados, alocadas uma vez por tamanho
+        buffers = self._buffers.get(n)
+        if buffers is None:
+            buffers = [np.empty((n, bias.size), dtype=np.float32) for _, bias, _ in self.layers]
+            # Cópia mascarada dos valores para o argmax
+            buffers.append(np.empty((n, self.num_actions), dtype=np.float32))
+            self._buffers[n] = buffers
+        return buffers
+
+    def __call__(self, states):
+        '''
+        Valores Q (batch, 6) de estados empilhados (batch, 24) float32
+
+        O array retornado é um buffer reutilizado na próxima chamada com o mesmo lote.
+        '''
+        states = np.asarray(states, dtype=np.float32)
+        if states.ndim == 1:
+            states = states[None]
+        buffers = self._activations(states.shape[0])
+        x = states
+        for (weight, bias, relu), out in zip(self.layers, buffers):
+            np.dot(x, weight, out=out)
+            out += bias
+            if relu:
+                np.maximum(out, 0, out=out)
+            x = out
+        return x
+
+    def act(self, state, mask):
+        '''
+        Melhor ação válida para um estado (24,) com máscara booleana (6,)
+        '''
+        # Com 6 valores, o laço em Python sai mais barato que as operações numpy mascaradas
+        values = self(state)[0].tolist()
+        valid = np.asarray(mask).reshape(-1).tolist()
+        best = 0
+        best_value = -np.inf
+        for action, value in enumerate(values):
+            if valid[action] and value > best_value:
+                best, best_value = action, value
+        return best
+
+    def act_batch(self, states, masks):
+        '''
+        Melhores ações válidas (batch,) para estados (batch, 24) e máscaras (batch, 6)
+        '''
+        values = self(states)
+        masked = self._buffers[values.shape[0]][-1]
+        np.copyto(masked, values)
+        np.putmask(masked, ~masks, -np.inf)
+        return masked.argmax(axis=1)
+
+
+class _MaskedGreedy(nn.Module):
+    # Forward e argmax mascarado num módulo só, para o TorchScript compilar junto
+    def __init__(self, network):
+        super().__init__()
+        self.network = network
+
+    def forward(self, states, masks):
+        values = self.network(states)
+        return values.masked_fill(~masks, float("-inf")).argmax(dim=-1)
+
+
+class TorchScriptQNetwork:
+    """
+    Forward e argmax mascarado da rede Q compilados com TorchScript
+
+    Funciona com qualquer rede que o torch.jit.script aceite e no device da rede, mas na CPU
+    o ganho sobre o forward normal é menor que o do NumpyQNetwork (ainda há o dispatch do
+    torch por operação). O módulo compilado compartilha os parâmetros com a rede original,
+    então acompanha o treino sem refresh.
+    """
+
+    def __init__(self, network):
+        self.network = network
+        self.device = next(network.parameters()).device
+        with warnings.catch_warnings():
+            # torch.jit.script está marcado como obsoleto a partir do torch 2.5, mas segue
+            # funcionando e é bem mais leve que o torch.compile para redes deste tamanho
+            warnings.simplefilter("ignore", FutureWarning)
+            self.values = torch.jit.script(network)
+            self.greedy = torch.jit.script(_MaskedGreedy(network))
+
+    def refresh(self):
+        # Os parâmetros já são os da rede
+        pass
+
+    def __call__(self, states):
+        with torch.inference_mode():
+            states = torch.as_tensor(np.asarray(states, dtype=np.float32)).to(self.device)
+            return self.values(states.view(-1, states.shape[-1])).cpu().numpy()
+
+    def act(self, state, mask):
+        return int(self.act_batch(np.asarray(state).reshape(1, -1), np.asarray(mask).reshape(1, -1))[0])
+
+    def act_batch(self, states, masks):
+        with torch.inference_mode():
+            states = torch.from_numpy(np.asarray(states, dtype=np.float32)).to(self.device)
+            # Cópia: as máscaras do env (linhas de MASK_BOOLS) podem ser somente leitura
+            masks = torch.tensor(np.asarray(masks, dtype=bool), device=self.device)
+            return self.greedy(states, masks).cpu().numpy()
+
+
+INFERENCE_BACKENDS = {
+    "numpy": NumpyQNetwork,
+    "torchscript": TorchScriptQNetwork,
+}
+
+
+def compile_q_network(network, backend="numpy"):
+    '''
+    Versão só de inferência da rede Q (ver INFERENCE_BACKENDS)
+
+    Todas têm __call__(states) -> valores Q, act(state, mask) -> ação e
+    act_batch(states, masks) -> ações, com máscaras booleanas de ações válidas.
+    '''
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend}. Options: {', '.join(INFERENCE_BACKENDS)}.")
+    return INFERENCE_BACKENDS[backend](network)
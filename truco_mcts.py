@@ -0,0 +1,263 @@
+# Imports
+import math
+import time
+
+import numpy as np
+
+from truco_encoding import NUM_CARDS, NO_CARD, CARD_POINTS, RESPOND_MASK, MASK_ACTIONS
+from truco_env import TrucoMineiroEnv
+from truco_players import NonLearningPlayer, RandomBotPlayer
+
+# Lances da árvore: uma carta é identificada pela pontuação (1 a 14; o naipe só importa nas
+# manilhas, que já têm pontuação própria), então o mesmo lance vale em qualquer sorteio das
+# mãos escondidas. Truco, aceitar e recusar (ações 3, 4 e 5) viram os lances 15, 16 e 17.
+_ACTION_MOVE_OFFSET = 12
+_TRUCO_MOVE = 3 + _ACTION_MOVE_OFFSET
+_POINTS = CARD_POINTS.tolist()
+# Ids das cartas de cada pontuação
+_CARDS_BY_POINTS = [[card for card in range(NUM_CARDS) if _POINTS[card] == points] for points in range(15)]
+
+
+def _read_public(obs):
+    # card_frequency e trucable do time de quem joga, da observação em dicionário ou achatada
+    if isinstance(obs, dict):
+        return np.asarray(obs["card_frequency"]), bool(obs["trucable"])
+    return np.asarray(obs[10:24]), bool(obs[8])
+
+
+class _Node:
+    """
+    Nó da árvore: estatísticas do lance que leva a ele, do ponto de vista do time que o fez
+    """
+    __slots__ = ("children", "team", "visits", "value", "available")
+
+    def __init__(self, team):
+        self.children = {}
+        self.team = team
+        self.visits = 0
+        self.value = 0.0
+        self.available = 0
+
+
+class ISMCTSPlayer(NonLearningPlayer):
+    """
+    Jogador de busca em árvore Monte Carlo sobre conjuntos de informação (SO-ISMCTS)
+
+    A cada decisão monta, só com o que o jogador vê (a própria mão, a mesa, card_frequency,
+    placar, aposta e info["seat"]), o estado do env (ver TrucoMineiroEnv.get_state) com as
+    cartas escondidas dos outros assentos em aberto. Cada iteração sorteia essas cartas
+    entre as que ainda podem estar nas mãos (o baralho menos a mão do jogador e as cartas já
+    jogadas na rodada, por pontuação), restaura o estado num env de simulação (set_state),
+    desce a árvore comum a todos os sorteios escolhendo os lances por UCB entre os que são
+    válidos naquele sorteio (contando a disponibilidade de cada lance), expande um lance novo
+    e termina a rodada com jogadas aleatórias.
+
+    O resultado de uma iteração são os pontos da rodada para cada time, limitados ao que falta
+    para cada um chegar a 12 (ganhar a rodada que fecha o jogo vale o mesmo com qualquer
+    aposta). A busca para em iterations iterações ou em time_limit segundos, o que vier
+    antes, e escolhe o lance mais visitado da raiz. exploration é a constante do UCB, em
+    pontos.
+    """
+
+    def __init__(self, name, iterations=1000, time_limit=None, exploration=4.0):
+        super().__init__(name)
+        if iterations is None and time_limit is None:
+            raise ValueError("ISMCTSPlayer needs an iteration or a time budget.")
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        # Envs de simulação por número de jogadores (os jogadores deles nunca decidem)
+        self._envs = {}
+        self.last_iterations = 0
+
+    def _simulator(self, num_players):
+        env = self._envs.get(num_players)
+        if env is None:
+            half = num_players // 2
+            teams = [[RandomBotPlayer("simulation") for _ in range(half)] for _ in range(2)]
+            env = self._envs[num_players] = TrucoMineiroEnv(num_players, teams)
+        return env
+
+    def _information_set(self, obs, info):
+        '''
+        Estado da rodada visto por quem joga (mãos dos outros vazias), assentos com cartas
+        escondidas, quantas cartas cada um tem e as cartas que podem estar com eles
+        '''
+        card_frequency, trucable = _read_public(obs)
+        table_cards = [int(card) for card in info["table_cards"]]
+        num_players = len(table_cards)
+        seat = info["seat"]
+        team = seat % 2
+        hand = np.asarray(info["current_player_cards"])
+        action_mask = info["action_mask"]
+        respond = action_mask == RESPOND_MASK
+        game_score = list(info["game_score"])
+        current_bet = info["current_bet_value"]
+
+        # Cada assento jogou uma carta por mão completa, mais a da mesa se já jogou nesta
+        on_table = [card != NO_CARD for card in table_cards]
+        num_table_cards = sum(on_table)
+        turn = 3 - int((hand != NO_CARD).sum()) - on_table[seat]
+        # Quem pede truco ainda não jogou na mão e é respondido pelo assento seguinte
+        truco_caller = (seat - 1) % num_players if respond else seat
+        hand_starter = (truco_caller - num_table_cards) % num_players
+        best_cards, best_seats = [NO_CARD, NO_CARD], [0, 0]
+        for offset in range(num_table_cards):
+            player = (hand_starter + offset) % num_players
+            card = table_cards[player]
+            if _POINTS[card] > _POINTS[best_cards[player % 2]]:
+                best_cards[player % 2], best_seats[player % 2] = card, player
+        # Com a aposta aumentada, só o time que não pediu por último pode aumentar (e só se
+        # a aposta não fechar o jogo para os dois)
+        trucable_pair = [True, True]
+        trucable_pair[team] = trucable
+        if current_bet > 2:
+            trucable_pair[1 - team] = not trucable and min(current_bet + score for score in game_score) < 12
+
+        env = self._simulator(num_players)
+        state = np.zeros((), dtype=env.get_state().dtype)
+        hidden_seats = [player for player in range(num_players) if player != seat]
+        sizes = [3 - turn - on_table[player] for player in hidden_seats]
+        cards = np.full((num_players, 3), NO_CARD, dtype=np.int8)
+        cards[seat] = hand
+        state["cards"] = cards
+        state["table_cards"] = table_cards
+        state["hand_mask"] = [(1 << (3 - turn - on_table[player])) - 1 for player in range(num_players)]
+        state["best_cards"] = best_cards
+        state["best_seats"] = best_seats
+        state["card_frequency"] = card_frequency
+        state["game_score"] = game_score
+        state["round_score"] = info["round_score"]
+        state["trucable"] = trucable_pair
+        state["num_table_cards"] = num_table_cards
+        state["turn"] = turn
+        state["round_starter"] = seat
+        state["current_player"] = seat
+        state["hand_starter"] = hand_starter
+        state["truco_caller"] = truco_caller
+        state["first_hand_winner"] = info["first_hand_winner"]
+        state["hand_winner"] = info["hand_winner"] + 1
+        state["current_bet"] = current_bet
+        state["respond"] = respond
+        state["action_mask"] = action_mask
+
+        # Cartas que podem estar escondidas: de cada pontuação, as que não estão na mão nem
+        # foram jogadas na rodada (quais exatamente não importa, o naipe não conta)
+        known = set(hand.tolist()) | set(table_cards)
+        pool = []
+        for points in range(1, 15):
+            candidates = [card for card in _CARDS_BY_POINTS[points] if card not in known]
+            unknown = len(_CARDS_BY_POINTS[points]) - int(card_frequency[points - 1]) - _count_points(hand, points)
+            pool.extend(candidates[:unknown])
+        return state, hidden_seats, sizes, np.array(pool, dtype=np.int8)
+
+    def _determinize(self, state, hidden_seats, sizes, pool):
+        # Sorteia as mãos escondidas (ordenadas, com NO_CARD no fim como no env)
+        cards = state["cards"]
+        drawn = self.rng.permutation(pool)
+        start = 0
+        for player, size in zip(hidden_seats, sizes):
+            hand = np.sort(drawn[start:start + size])
+            cards[player] = NO_CARD
+            cards[player, :size] = hand
+            start += size
+
+    def _moves(self, env):
+        # Lances válidos do jogador da vez no env de simulação: lance -> ação
+        hand = env.cards[env.current_player_index].tolist()
+        moves = {}
+        for action in MASK_ACTIONS[env.action_mask]:
+            move = _POINTS[hand[action]] if action < 3 else action + _ACTION_MOVE_OFFSET
+            moves.setdefault(move, action)
+        return moves
+
+    def search(self, obs, info):
+        '''
+        Roda a busca a partir da decisão atual e retorna a raiz da árvore
+        '''
+        state, hidden_seats, sizes, pool = self._information_set(obs, info)
+        env = self._simulator(len(info["table_cards"]))
+        rng = self.rng
+        exploration = self.exploration
+        # Pontos que faltam para cada time chegar a 12
+        missing = [12 - score for score in info["game_score"]]
+        root = _Node(info["seat"] % 2)
+        deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+        iterations = 0
+        while self.iterations is None or iterations < self.iterations:
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+            iterations += 1
+            self._determinize(state, hidden_seats, sizes, pool)
+            env.set_state(state)
+            node = root
+            path = [root]
+            reward = last_team = 0
+            round_ended = False
+
+            # Seleção e expansão: desce por UCB enquanto todos os lances válidos já existem
+            while not round_ended:
+                team = env.current_player_index % 2
+                moves = self._moves(env)
+                untried = [move for move in moves if move not in node.children]
+                for move in moves:
+                    child = node.children.get(move)
+                    if child is not None:
+                        child.available += 1
+                if untried:
+                    move = untried[int(rng.random() * len(untried))]
+                    child = node.children[move] = _Node(team)
+                    child.available = 1
+                else:
+                    best_score = -math.inf
+                    for candidate in moves:
+                        child = node.children[candidate]
+                        score = child.value / child.visits + exploration * math.sqrt(math.log(child.available) / child.visits)
+                        if score > best_score:
+                            best_score, move = score, candidate
+                    child = node.children[move]
+                _, reward, _, _ = env.handle_action(moves[move])
+                last_team = team
+                round_ended = env.round_ended
+                node = child
+                path.append(node)
+                if untried:
+                    break
+
+            # Simulação: o resto da rodada com jogadas aleatórias
+            while not round_ended:
+                actions = MASK_ACTIONS[env.action_mask]
+                last_team = env.current_player_index % 2
+                _, reward, _, _ = env.handle_action(actions[int(rng.random() * len(actions))])
+                round_ended = env.round_ended
+
+            # Pontos do time 0 menos os do time 1, limitados ao que falta para cada um; a
+            # recompensa do env é do time de quem fez a última jogada
+            gains = [0, 0]
+            if reward > 0:
+                gains[last_team] = min(reward, missing[last_team])
+            elif reward < 0:
+                gains[1 - last_team] = min(-reward, missing[1 - last_team])
+            result = gains[0] - gains[1]
+            for node in path[1:]:
+                node.visits += 1
+                node.value += result if node.team == 0 else -result
+            root.visits += 1
+        self.last_iterations = iterations
+        return root
+
+    def choose_action(self, obs, info):
+        valid_actions = info["valid_actions"]
+        if len(valid_actions) == 1:
+            return valid_actions[0]
+        root = self.search(obs, info)
+        move = max(root.children, key=lambda move: root.children[move].visits)
+        if move >= _TRUCO_MOVE:
+            return move - _ACTION_MOVE_OFFSET
+        # Primeira carta da mão real com a pontuação do lance
+        hand = [_POINTS[card] for card in info["current_player_cards"]]
+        return hand.index(move)
+
+
+def _count_points(hand, points):
+    return sum(1 for card in hand.tolist() if _POINTS[card] == points)
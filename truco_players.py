@@ -1,9 +1,19 @@
-import random
 import numpy as np
 import torch
+
+from truco_encoding import card_name, flatten_obs, valid_actions_mask
+from truco_inference import compile_q_network
+
 device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 
 
+def masked_argmax(values, mask):
+    '''
+    Argmax por linha considerando apenas as ações válidas da máscara (batch, 6)
+    '''
+    return values.masked_fill(~mask, float("-inf")).argmax(dim=-1, keepdim=True)
+
+
 class TrucoPlayer:
     """
     Superclasse para todos os jogadores
@@ -11,6 +21,12 @@ class TrucoPlayer:
     def __init__(self, name):
         self.name = name
         self.type = None # LearningPlayer or NonLearningPlayer
+        # Gerador próprio do jogador (ver seed)
+        self.rng = np.random.default_rng()
+
+    def seed(self, seed=None):
+        # seed: int, np.random.SeedSequence ou None (entropia do sistema)
+        self.rng = np.random.default_rng(seed)
 
 class LearningPlayer(TrucoPlayer):
     def __init__(self, name):
@@ -18,6 +34,10 @@ class LearningPlayer(TrucoPlayer):
         self.type = LearningPlayer
 
 class NonLearningPlayer(TrucoPlayer):
+    # Jogadores com batched = True implementam choose_actions e podem decidir por vários
+    # jogos de uma vez (ver SyncTrucoVectorEnv)
+    batched = False
+
     def __init__(self, name):
         super().__init__(name)
         self.type = NonLearningPlayer
@@ -25,41 +45,90 @@ class NonLearningPlayer(TrucoPlayer):
     def choose_action(self, obs, valid_actions):
         raise NotImplementedError
 
+    def choose_actions(self, states, valid_masks):
+        '''
+        Ações para estados empilhados (batch, 24) com máscaras de ações válidas (batch, 6)
+        '''
+        raise NotImplementedError
+
 class RandomBotPlayer(NonLearningPlayer):
     """
     Classe do jogador com ações aleatórias
     """
 
+    batched = True
+
     def choose_action(self, obs, info):
-        return random.choice(info["valid_actions"])
+        valid_actions = info["valid_actions"]
+        return valid_actions[int(self.rng.random() * len(valid_actions))]
+
+    def choose_actions(self, states, valid_masks):
+        # Ação válida uniforme por linha: argmax de ruído uniforme restrito à máscara
+        return np.argmax(self.rng.random(valid_masks.shape) * valid_masks, axis=1)
 
 class NetworkBotPlayer(NonLearningPlayer):
     """
     Classe do jogador cuja estratégia é dada por uma rede neural
+
+    Com backend ("numpy" ou "torchscript", ver truco_inference) as decisões usam uma
+    versão só de inferência da rede, bem mais rápida em lotes pequenos na CPU. Ela é criada
+    no primeiro uso e não vai junto quando o jogador é serializado (ex.: para os workers do
+    SubprocTrucoVectorEnv), que a recriam a partir da rede.
     """
+    batched = True
 
-    def __init__(self, name, network):
+    def __init__(self, name, network, backend=None):
         super().__init__(name)
         self.network = network
-    
+        self.backend = backend
+        self._policy = None
+
+    @property
+    def policy(self):
+        if self._policy is None and self.backend is not None:
+            self._policy = compile_q_network(self.network, self.backend)
+        return self._policy
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_policy"] = None
+        return state
+
     def convert_obs_to_state(self, obs):
-        state = np.array([*obs["current_player_cards"], obs["other_card"], obs["first_hand_winner"], obs["current_player_score"], obs["other_player_score"], obs["current_bet"], int(obs["trucable"]), int(obs["respond"]), *obs["card_frequency"]], dtype=np.int64)
-        state = torch.from_numpy(state).unsqueeze(dim=0).float().to(device)
+        # Com flat_obs a observação já é o vetor de estado float32 (sem cópia na CPU)
+        if isinstance(obs, dict):
+            obs = flatten_obs(obs)
+        state = torch.from_numpy(obs).unsqueeze(dim=0).to(device)
         return state
-    
+
     def choose_action(self, obs, info):
-        state = self.convert_obs_to_state(obs)
-        valid_actions = info["valid_actions"]
-        av = self.network(state).detach()
-        action = valid_actions[np.argmax([av[0, valid_action].item() for valid_action in valid_actions])]
-        return action
+        policy = self.policy
+        if policy is not None:
+            if isinstance(obs, dict):
+                obs = flatten_obs(obs)
+            return policy.act(obs, info["valid_mask"])
+        with torch.inference_mode():
+            state = self.convert_obs_to_state(obs)
+            av = self.network(state)
+            return masked_argmax(av, valid_actions_mask(state)).item()
+
+    def choose_actions(self, states, valid_masks):
+        # Um único forward para todos os jogos em que este oponente está na vez
+        policy = self.policy
+        if policy is not None:
+            return policy.act_batch(states, valid_masks)
+        with torch.inference_mode():
+            av = self.network(torch.from_numpy(states).to(device))
+            actions = masked_argmax(av, torch.from_numpy(valid_masks).to(device))
+            return actions.view(-1).cpu().numpy()
 
 class HumanPlayer(NonLearningPlayer):
     """
     Classe do jogador humano (recebe a ação inserida pelo usuário)
     """
 
-    def choose_action(self, obs, valid_actions):
+    def choose_action(self, obs, info):
         print(f"obs: {obs}")
-        print(f"valid_actions: {valid_actions}")
+        print(f"cards: {[card_name(card) for card in info['current_player_cards']]}")
+        print(f"valid_actions: {info['valid_actions']}")
         return int(input("Chosen action: "))
\ No newline at end of file
@@ -0,0 +1,182 @@
+# Imports
+import copy
+
+import numpy as np
+
+from truco_players import NetworkBotPlayer, device
+from truco_arena import round_robin
+
+
+def elo_expected(rating_a, rating_b):
+    '''
+    Probabilidade esperada de a vencer b pelo Elo
+    '''
+    return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+
+
+class RatedPlayerPool:
+    """
+    Pool de snapshots da rede para self-play com rating Elo
+
+    Cada snapshot é guardado como um state_dict compacto na CPU (sem módulo vivo nem
+    gradientes) e só vira um NetworkBotPlayer quando é sorteado. O jogador que aprende
+    também tem um rating, atualizado junto com o do oponente a cada resultado reportado
+    (report) e herdado pelos snapshots novos.
+
+    O sorteio segue o prioritized fictitious self-play: o peso de cada snapshot é
+    (1 - p) ** exponent, com p a chance esperada do jogador que aprende vencê-lo, então
+    oponentes mais difíceis aparecem mais (exponent=0 volta ao sorteio uniforme). Com mais
+    de capacity snapshots, o de menor rating (o mais dominado) é descartado. O sorteio usa
+    um gerador próprio (seed, ver seed).
+
+    Os oponentes carregados usam o backend de inferência dado (ver NetworkBotPlayer). Com
+    store (truco_checkpoints.CheckpointStore) os pesos vão para o disco em vez de ficar em
+    memória e os oponentes são carregados pelo LRU da loja; from_store reabre um pool a
+    partir de uma loja existente. last_episode é o maior episódio já registrado (também os
+    da loja), para quem nomeia os snapshots continuar a numeração numa nova execução.
+    """
+
+    def __init__(self, capacity=50, exponent=2, k=32, initial_rating=1000, backend=None, store=None, seed=None):
+        self.capacity = capacity
+        self.rng = np.random.default_rng(seed)
+        self.backend = backend
+        self.store = store
+        self.exponent = exponent
+        self.k = k
+        self.learner_rating = initial_rating
+        self.snapshots = []
+        self.last_episode = 0
+        # Arquitetura da rede (sem pesos relevantes), usada para carregar os snapshots
+        self.template = None
+
+    @classmethod
+    def from_store(cls, store, capacity=50, **kwargs):
+        '''
+        Pool com os últimos capacity snapshots de uma CheckpointStore e seus ratings salvos
+        '''
+        pool = cls(capacity=capacity, store=store, **kwargs)
+        for entry in store.entries[-capacity:]:
+            rating = pool.learner_rating if entry["rating"] is None else entry["rating"]
+            pool.snapshots.append({"name": entry["name"], "rating": rating, "games": 0})
+        if pool.snapshots:
+            pool.learner_rating = pool.snapshots[-1]["rating"]
+        pool.last_episode = max([entry["episode"] for entry in store.entries if entry["episode"] is not None], default=0)
+        return pool
+
+    def seed(self, seed=None):
+        # seed: int, np.random.SeedSequence ou None (entropia do sistema)
+        self.rng = np.random.default_rng(seed)
+
+    def register(self, name, network, episode=None):
+        '''
+        Guarda uma cópia dos pesos atuais da rede como um novo snapshot
+        '''
+        snapshot = {"name": name, "rating": self.learner_rating, "games": 0}
+        if episode is not None:
+            self.last_episode = max(self.last_episode, episode)
+        if self.store is not None:
+            # Os ratings atuais vão para o índice junto com o novo snapshot
+            for other in self.snapshots:
+                self.store.set_rating(other["name"], other["rating"])
+            self.store.append(name, network, episode=episode, rating=self.learner_rating)
+        else:
+            if self.template is None:
+                self.template = copy.deepcopy(network).cpu().eval()
+            snapshot["state_dict"] = {key: value.detach().cpu().clone() for key, value in network.state_dict().items()}
+        self.snapshots.append(snapshot)
+        if len(self.snapshots) > self.capacity:
+            # Descarta o pior snapshot entre os antigos (o novo ainda não jogou)
+            worst = min(range(len(self.snapshots) - 1), key=lambda i: self.snapshots[i]["rating"])
+            del self.snapshots[worst]
+
+    def weights(self):
+        '''
+        Probabilidade de sorteio de cada snapshot (PFSP)
+        '''
+        ratings = np.array([snapshot["rating"] for snapshot in self.snapshots], dtype=np.float64)
+        weights = (1 - elo_expected(self.learner_rating, ratings)) ** self.exponent
+        if weights.sum() == 0:
+            weights = np.ones_like(weights)
+        return weights / weights.sum()
+
+    def sample(self, num_players):
+        '''
+        Sorteia num_players oponentes (com reposição) e carrega seus pesos
+        '''
+        if not self.snapshots:
+            raise Exception("Cannot sample from an empty player pool!")
+        indices = self.rng.choice(len(self.snapshots), size=num_players, p=self.weights())
+        return [self.load(self.snapshots[i]) for i in indices]
+
+    def load(self, snapshot):
+        # Cria o módulo vivo só na hora de jogar
+        if self.store is not None:
+            return self.store.player(snapshot["name"], backend=self.backend)
+        network = copy.deepcopy(self.template)
+        network.load_state_dict(snapshot["state_dict"])
+        return NetworkBotPlayer(snapshot["name"], network.eval().to(device), backend=self.backend)
+
+    def players(self):
+        '''
+        Todos os snapshots carregados como NetworkBotPlayer (ex.: para um torneio na arena)
+        '''
+        return [self.load(snapshot) for snapshot in self.snapshots]
+
+    def _find(self, name):
+        for snapshot in self.snapshots:
+            if snapshot["name"] == name:
+                return snapshot
+        return None
+
+    def report(self, opponents, victory):
+        '''
+        Atualiza os ratings com o resultado de uma partida do jogador que aprende
+
+        Oponentes que não estão (mais) no pool são ignorados.
+        '''
+        score = 1.0 if victory else 0.0
+        for opponent in opponents:
+            snapshot = self._find(opponent.name)
+            if snapshot is None:
+                continue
+            delta = self.k * (score - elo_expected(self.learner_rating, snapshot["rating"]))
+            self.learner_rating += delta
+            snapshot["rating"] -= delta
+            snapshot["games"] += 1
+
+    def update_from_tournament(self, tournament):
+        '''
+        Atualiza os ratings dos snapshots com um torneio de truco_arena.round_robin jogado
+        entre self.players() (mesma ordem de self.snapshots)
+        '''
+        ratings = np.array([snapshot["rating"] for snapshot in self.snapshots], dtype=np.float64)
+        deltas = np.zeros_like(ratings)
+        # Uma atualização por confronto, todas calculadas com os ratings de antes do torneio
+        for match in tournament["matches"]:
+            i, j = match["players"]
+            delta = self.k * (match["winrate"] - elo_expected(ratings[i], ratings[j]))
+            deltas[i] += delta
+            deltas[j] -= delta
+        for snapshot, delta, games in zip(self.snapshots, deltas, tournament["games"].sum(axis=1)):
+            snapshot["rating"] += float(delta)
+            snapshot["games"] += int(games)
+
+    def evaluate(self, num_workers=None, **match_kwargs):
+        '''
+        Joga um torneio todos contra todos entre os snapshots na arena e atualiza os ratings
+        '''
+        tournament = round_robin(self.players(), num_workers=num_workers, **match_kwargs)
+        self.update_from_tournament(tournament)
+        return tournament
+
+    def ratings(self):
+        '''
+        Lista (nome, rating, partidas) dos snapshots, do maior para o menor rating
+        '''
+        return sorted(
+            ((snapshot["name"], snapshot["rating"], snapshot["games"]) for snapshot in self.snapshots),
+            key=lambda item: -item[1],
+        )
+
+    def __len__(self):
+        return len(self.snapshots)
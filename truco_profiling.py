@@ -0,0 +1,161 @@
+# Imports
+import cProfile
+import csv
+import json
+import pstats
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class _Timer:
+    """
+    Context manager que soma o tempo gasto no bloco ao timer name do Profiler
+    """
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.totals[self.name] += time.perf_counter() - self.start
+        self.profiler.calls[self.name] += 1
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class NullProfiler:
+    """
+    Profiler desligado: mesma interface do Profiler sem fazer nada
+
+    É o padrão dos envs e loops de treino, então a instrumentação custa só uma chamada de
+    método e um with vazio por fase quando não está em uso.
+    """
+    enabled = False
+    _timer = _NullTimer()
+
+    def timer(self, name):
+        return self._timer
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Profiler:
+    """
+    Timers por fase e contadores de eventos para os envs e os loops de treino
+
+    timer(name) mede o tempo total e o número de chamadas de um bloco; count(name, n) soma
+    eventos (passos, rounds, partidas...). summary() calcula médias e taxas por segundo desde
+    a criação (ou o último reset) e o resultado pode ser salvo em JSON ou CSV.
+
+    Uso: env.profiler = profiler = Profiler(); ...; profiler.to_json("perfil.json")
+    """
+    enabled = True
+
+    def __init__(self):
+        self._timers = {}
+        self.reset()
+
+    def reset(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.start_time = time.perf_counter()
+
+    def timer(self, name):
+        # Um timer por nome, reaproveitado (não reentrante para o mesmo nome)
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _Timer(self, name)
+        return timer
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def summary(self):
+        '''
+        Dicionário com o tempo decorrido, os timers (total, chamadas, média, fração do tempo)
+        e os contadores (total e taxa por segundo)
+        '''
+        elapsed = time.perf_counter() - self.start_time
+        return {
+            "elapsed": elapsed,
+            "timers": {
+                name: {
+                    "total": total,
+                    "calls": self.calls[name],
+                    "mean": total / self.calls[name],
+                    "fraction": total / elapsed,
+                }
+                for name, total in sorted(self.totals.items())
+            },
+            "counters": {
+                name: {"count": count, "per_second": count / elapsed}
+                for name, count in sorted(self.counters.items())
+            },
+        }
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def to_csv(self, path):
+        '''
+        Uma linha por timer ou contador: kind, name, count, total, mean, per_second
+        '''
+        summary = self.summary()
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["kind", "name", "count", "total", "mean", "per_second"])
+            for name, timer in summary["timers"].items():
+                writer.writerow(["timer", name, timer["calls"], timer["total"], timer["mean"], timer["calls"] / summary["elapsed"]])
+            for name, counter in summary["counters"].items():
+                writer.writerow(["counter", name, counter["count"], "", "", counter["per_second"]])
+
+    def __str__(self):
+        summary = self.summary()
+        lines = [f"elapsed: {summary['elapsed']:.3f}s"]
+        for name, timer in summary["timers"].items():
+            lines.append(
+                f"{name}: {timer['total']:.3f}s ({100 * timer['fraction']:.1f}%), {timer['calls']} calls, {1e6 * timer['mean']:.1f}us/call"
+            )
+        for name, counter in summary["counters"].items():
+            lines.append(f"{name}: {counter['count']} ({counter['per_second']:.1f}/s)")
+        return "\n".join(lines)
+
+
+@contextmanager
+def cprofile(path=None, sort="cumulative", limit=30):
+    '''
+    Roda o bloco (ex.: N episódios de treino) sob o cProfile
+
+    Com path, salva as estatísticas para o pstats/snakeviz; senão imprime as limit funções
+    mais caras ordenadas por sort.
+    '''
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        if path is not None:
+            profile.dump_stats(path)
+        else:
+            pstats.Stats(profile).sort_stats(sort).print_stats(limit)
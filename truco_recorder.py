@@ -0,0 +1,166 @@
+# Imports
+import functools
+
+import numpy as np
+import pygame
+
+from truco_encoding import NO_CARD, BET_VALUES, BET_INDEX
+from truco_render import TrucoRenderer, frame_surface, WHITE, YELLOW, BG_COLOR, CURRENT_BET_NAMES
+
+@functools.lru_cache(maxsize=None)
+def record_dtype(num_players):
+    '''
+    Estado mínimo para renderizar um passo (14 bytes + um por assento)
+    '''
+    return np.dtype([
+        ("hand", np.int8, 3),           # mão de quem joga (ids, NO_CARD = jogada)
+        ("other_card", np.int8),        # maior carta do time adversário na mesa (NO_CARD = nenhuma)
+        ("game_score", np.int16, 2),    # placar por time
+        ("current_bet", np.int8),       # índice em BET_VALUES
+        ("respond", np.bool_),
+        ("first_hand_winner", np.int8),
+        ("turn", np.int8),
+        ("current_player", np.int8),
+        ("other_player", np.int8),
+        ("table_cards", np.int8, (num_players,)),  # cartas na mesa por assento
+    ])
+
+
+RECORD_DTYPE = record_dtype(2)
+
+
+class _ReplayState:
+    """
+    Imita os atributos do TrucoMineiroEnv que o TrucoRenderer lê, a partir de um registro
+    """
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.cards = [None for _ in range(num_players)]
+
+    def load(self, record):
+        self.current_player_index = int(record["current_player"])
+        self.other_player_index = int(record["other_player"])
+        self.cards[self.current_player_index] = record["hand"]
+        self.other_card = int(record["other_card"])
+        self.table_cards = record["table_cards"].tolist()
+        self.game_score = record["game_score"].tolist()
+        self.current_bet = int(BET_VALUES[record["current_bet"]])
+        self.respond = bool(record["respond"])
+        self.first_hand_winner = int(record["first_hand_winner"])
+        self.turn = int(record["turn"])
+
+
+class EpisodeRecorder:
+    """
+    Grava partidas como o estado mínimo de cada passo e renderiza só na reprodução
+
+    record(env) copia alguns bytes do env (RECORD_DTYPE) para um array que cresce em blocos,
+    sem guardar imagens. frames() reproduz a gravação renderizando um passo por vez num único
+    buffer reutilizado e write_gif codifica os quadros no arquivo à medida que são gerados,
+    então a memória de imagem não cresce com o tamanho da partida. As gravações podem ser
+    salvas (save) e carregadas (load) como .npy para serem vistas depois.
+    """
+
+    def __init__(self, num_players=2, capacity=256):
+        self.num_players = num_players
+        self.dtype = record_dtype(num_players)
+        self.records = np.zeros(capacity, dtype=self.dtype)
+        self.size = 0
+
+    def record(self, env):
+        '''
+        Grava o estado atual do env (o que render mostraria agora)
+        '''
+        if self.size == len(self.records):
+            self.records = np.concatenate([self.records, np.zeros(len(self.records), dtype=self.dtype)])
+        record = self.records[self.size]
+        current, other = env.current_player_index, env.other_player_index
+        record["hand"] = env.cards[current]
+        record["other_card"] = env.other_card
+        record["game_score"] = env.game_score
+        record["current_bet"] = BET_INDEX[env.current_bet]
+        record["respond"] = env.respond
+        record["first_hand_winner"] = env.first_hand_winner
+        record["turn"] = env.turn
+        record["current_player"] = current
+        record["other_player"] = other
+        record["table_cards"] = env.table_cards
+        self.size += 1
+
+    def clear(self):
+        self.size = 0
+
+    def save(self, path):
+        np.save(path, self.records[:self.size])
+
+    @classmethod
+    def load(cls, path, num_players=2):
+        records = np.load(path)
+        recorder = cls(num_players, capacity=max(len(records), 1))
+        for name in records.dtype.names:
+            recorder.records[name][:len(records)] = records[name]
+        if "table_cards" not in records.dtype.names:
+            # Gravações antigas (1v1) só têm a carta do outro jogador na mesa
+            recorder.records["table_cards"] = NO_CARD
+            recorder.records["table_cards"][np.arange(len(records)), records["other_player"]] = records["other_card"]
+        recorder.size = len(records)
+        return recorder
+
+    def frames(self):
+        '''
+        Reproduz a gravação, um quadro (H, W, 3) por passo, renderizado sob demanda
+
+        Todos os quadros são o mesmo buffer reescrito: copie para guardar um quadro.
+        '''
+        pygame.font.init()
+        screen, frame = frame_surface()
+        renderer = TrucoRenderer(screen)
+        state = _ReplayState(self.num_players)
+        for record in self.records[:self.size]:
+            state.load(record)
+            renderer.draw(state)
+            yield frame
+
+    def write_gif(self, path, duration=1000, loop=0):
+        '''
+        Codifica a gravação num GIF (duration em ms por quadro) quadro a quadro
+
+        Todos os quadros usam uma paleta fixa com as cores da mesa, das cartas e dos textos.
+        '''
+        from PIL import Image, GifImagePlugin
+
+        palette = _table_palette()
+        with open(path, "wb") as fp:
+            for index, frame in enumerate(self.frames()):
+                image = Image.fromarray(frame).quantize(palette=palette, dither=Image.Dither.NONE)
+                if index == 0:
+                    header, _ = GifImagePlugin.getheader(image, info={"loop": loop})
+                    for chunk in header:
+                        fp.write(chunk)
+                for chunk in GifImagePlugin.getdata(image, duration=duration):
+                    fp.write(chunk)
+            fp.write(b";")
+
+    def __len__(self):
+        return self.size
+
+
+def _table_palette():
+    '''
+    Paleta de 256 cores tirada das cartas, do logo e dos textos sobre a cor da mesa
+    '''
+    from PIL import Image
+
+    pygame.font.init()
+    renderer = TrucoRenderer(frame_surface()[0])
+    texts = [renderer.text(string, color) for string in ["Truco or raise called", *CURRENT_BET_NAMES] for color in (WHITE, YELLOW)]
+    atlas_width, atlas_height = renderer.atlas.get_size()
+    surface = pygame.Surface((atlas_width, atlas_height + sum(text.get_height() for text in texts)))
+    surface.fill(BG_COLOR)
+    surface.blit(renderer.atlas, (0, 0))
+    y = atlas_height
+    for text in texts:
+        y = surface.blit(text, (0, y)).bottom
+    pixels = np.ascontiguousarray(pygame.surfarray.array3d(surface).transpose(1, 0, 2))
+    return Image.fromarray(pixels).quantize(colors=256, dither=Image.Dither.NONE)
@@ -0,0 +1,208 @@
+# Imports
+import os
+
+import numpy as np
+import pygame
+
+from truco_encoding import NUM_CARDS, NO_CARD, CARD_NAMES, BET_INDEX
+
+# Layout da mesa
+SCREEN_WIDTH, SCREEN_HEIGHT = 900, 750
+CARD_IMG_WIDTH, CARD_IMG_HEIGHT = 101, 141
+LOGO_WIDTH, LOGO_HEIGHT = 54, 64
+SPACING = 50
+FONT_SIZE = 35
+
+BG_COLOR = (7, 99, 36)
+WHITE = (255, 255, 255)
+YELLOW = (255, 255, 51)
+
+CURRENT_BET_NAMES = ["None", "Truco", "6", "9", "12"]
+
+_ROOT = os.path.dirname(__file__)
+_ATLAS_COLUMNS = 10
+
+
+def frame_surface():
+    '''
+    Tela que desenha direto num array numpy (H, W, 4) e a visão RGB (H, W, 3) desse array
+
+    A visão é o quadro em rgb_array sem cópia nem transposição; ela é reescrita a cada
+    quadro desenhado.
+    '''
+    pixels = np.zeros((SCREEN_HEIGHT, SCREEN_WIDTH, 4), dtype=np.uint8)
+    surface = pygame.image.frombuffer(pixels, (SCREEN_WIDTH, SCREEN_HEIGHT), "RGBX")
+    return surface, pixels[:, :, :3]
+
+
+def calc_coord_x(num_cards, idx):
+    # Posição horizontal da carta idx quando há num_cards cartas lado a lado
+    if num_cards == 3:
+        return SCREEN_WIDTH // 2 - (3 - 2 * idx) * (CARD_IMG_WIDTH // 2) - (1 - idx) * SPACING // 4
+    elif num_cards == 2:
+        return SCREEN_WIDTH // 2 - (1 - idx) * (CARD_IMG_WIDTH) - (1 - 2 * idx) * SPACING // 4
+    else:
+        return SCREEN_WIDTH // 2 - CARD_IMG_WIDTH // 2
+
+
+class TrucoRenderer:
+    """
+    Desenha a mesa do TrucoMineiroEnv com tudo o que é estático pré-processado
+
+    Na criação decodifica e escala as 40 cartas e o logo para um atlas único, abre a fonte
+    uma vez e monta o fundo (cor, logos e rótulos fixos). A cada quadro só as regiões
+    dinâmicas do quadro anterior são restauradas a partir do fundo e redesenhadas; os
+    textos dinâmicos ficam em cache por conteúdo.
+    """
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.font = pygame.font.Font(os.path.join(_ROOT, "font", "Roboto-Black.ttf"), FONT_SIZE)
+        self.texts = {}
+        self._load_atlas()
+        self._build_background()
+        # Regiões desenhadas no último quadro (None = tela inteira)
+        self.dirty = None
+
+    def _load_atlas(self):
+        '''
+        Decodifica e escala as cartas (em ordem de id) e o logo para uma única superfície
+        '''
+        rows = NUM_CARDS // _ATLAS_COLUMNS
+        self.atlas = pygame.Surface(
+            (_ATLAS_COLUMNS * CARD_IMG_WIDTH, rows * CARD_IMG_HEIGHT + LOGO_HEIGHT), pygame.SRCALPHA
+        )
+        self.atlas.fill((0, 0, 0, 0))
+
+        def load(name, size, position):
+            image = pygame.image.load(os.path.join(_ROOT, "img", name))
+            # BLEND_RGBA_MAX sobre o atlas zerado copia os pixels (inclusive alfa) sem misturar
+            self.atlas.blit(pygame.transform.scale(image, size), position, special_flags=pygame.BLEND_RGBA_MAX)
+            return pygame.Rect(position, size)
+
+        self.card_rects = [
+            load(
+                f"{CARD_NAMES[card]}.png",
+                (CARD_IMG_WIDTH, CARD_IMG_HEIGHT),
+                ((card % _ATLAS_COLUMNS) * CARD_IMG_WIDTH, (card // _ATLAS_COLUMNS) * CARD_IMG_HEIGHT),
+            )
+            for card in range(NUM_CARDS)
+        ]
+        self.logo_rect = load("turing_logo.png", (LOGO_WIDTH, LOGO_HEIGHT), (0, rows * CARD_IMG_HEIGHT))
+
+    def text(self, string, color=WHITE):
+        surface = self.texts.get((string, color))
+        if surface is None:
+            surface = self.texts[(string, color)] = self.font.render(string, True, color)
+        return surface
+
+    def _build_background(self):
+        '''
+        Fundo com cor, logos e rótulos fixos, e as posições dos elementos dinâmicos
+        '''
+        background = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        background.fill(BG_COLOR)
+
+        # O placar muda, mas a altura do texto não
+        self.score_y = SPACING // 4
+        score_bottom = self.score_y + self.text("Player's team 0 x 0 Opponent's team").get_height()
+
+        for idx in range(4):
+            background.blit(
+                self.atlas,
+                (
+                    (idx // 2) * SCREEN_WIDTH + (1 - 2 * (idx // 2)) * SPACING - LOGO_WIDTH // 2,
+                    (idx % 2) * SCREEN_HEIGHT + (1 - 2 * (idx % 2)) * SPACING - LOGO_HEIGHT // 2,
+                ),
+                self.logo_rect,
+            )
+
+        other_team_text = self.text("Other team:")
+        other_team_text_rect = background.blit(
+            other_team_text, (SPACING, score_bottom + CARD_IMG_HEIGHT // 2 + SPACING - other_team_text.get_height() // 2)
+        )
+        self.other_card_y = score_bottom + SPACING
+
+        first_round_title = self.text("First round:")
+        first_round_title_rect = background.blit(
+            first_round_title,
+            (
+                SCREEN_WIDTH - SPACING - first_round_title.get_width(),
+                score_bottom + CARD_IMG_HEIGHT // 2 + SPACING - first_round_title.get_height()
+            )
+        )
+        self.first_round_center = SCREEN_WIDTH - SPACING - first_round_title.get_width() // 2
+        self.first_round_y = first_round_title_rect.bottom
+
+        team2_text = self.text("Player's team:")
+        team2_text_rect = background.blit(
+            team2_text, (SPACING, other_team_text_rect.bottom + CARD_IMG_HEIGHT + SPACING - team2_text.get_height() // 2)
+        )
+
+        current_bet_title = self.text("Current bet:")
+        current_bet_title_rect = background.blit(
+            current_bet_title,
+            (
+                SCREEN_WIDTH - SPACING - current_bet_title.get_width(),
+                other_team_text_rect.bottom + CARD_IMG_HEIGHT + SPACING - current_bet_title.get_height()
+            )
+        )
+        self.current_bet_center = SCREEN_WIDTH - SPACING - current_bet_title.get_width() // 2
+        self.current_bet_y = current_bet_title_rect.bottom
+
+        self.log_y = team2_text_rect.bottom + 2.0 * SPACING
+        self.hand_y = team2_text_rect.bottom + 3.75 * SPACING
+
+        self.background = background
+
+    def draw(self, env):
+        '''
+        Desenha o estado atual do env na tela
+        '''
+        screen = self.screen
+        if self.dirty is None:
+            screen.blit(self.background, (0, 0))
+        else:
+            for rect in self.dirty:
+                screen.blit(self.background, rect, rect)
+        dirty = []
+
+        current = env.current_player_index
+        team, other_team = current % 2, 1 - current % 2
+        score_text = self.text(f"Player's team {env.game_score[team]} x {env.game_score[other_team]} Opponent's team")
+        dirty.append(screen.blit(score_text, (SCREEN_WIDTH // 2 - score_text.get_width() // 2, self.score_y)))
+
+        # Cartas do time adversário na mesa, na ordem dos assentos
+        other_cards = [card for seat, card in enumerate(env.table_cards) if seat % 2 == other_team and card != NO_CARD]
+        for idx, card in enumerate(other_cards):
+            dirty.append(screen.blit(
+                self.atlas, (calc_coord_x(num_cards=len(other_cards), idx=idx), self.other_card_y), self.card_rects[card]
+            ))
+
+        first_hand_winner = env.first_hand_winner
+        first_round_str = "Win" if first_hand_winner == team + 1 else "Loss" if first_hand_winner == other_team + 1 else "Draw" if env.turn == 2 else " "
+        first_round_status = self.text(first_round_str)
+        dirty.append(screen.blit(
+            first_round_status, (self.first_round_center - first_round_status.get_width() // 2, self.first_round_y)
+        ))
+
+        current_bet_status = self.text(CURRENT_BET_NAMES[BET_INDEX[env.current_bet]])
+        dirty.append(screen.blit(
+            current_bet_status, (self.current_bet_center - current_bet_status.get_width() // 2, self.current_bet_y)
+        ))
+
+        log_text = self.text("Truco or raise called" if env.respond else "", YELLOW)
+        log_text_rect = screen.blit(log_text, (SCREEN_WIDTH - SPACING - log_text.get_width(), self.log_y))
+        dirty.append(log_text_rect)
+        # O rótulo fica logo abaixo do aviso de truco, que não tem altura quando está vazio
+        dirty.append(screen.blit(self.text("Player's hand"), (SPACING, log_text_rect.bottom + SPACING)))
+
+        hand = env.cards[current]
+        num_cards = sum([1 for card in hand if card != NO_CARD])
+        for idx in range(num_cards):
+            dirty.append(screen.blit(
+                self.atlas, (calc_coord_x(num_cards=num_cards, idx=idx), self.hand_y), self.card_rects[hand[idx]]
+            ))
+
+        self.dirty = dirty
+        return dirty
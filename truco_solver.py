@@ -0,0 +1,176 @@
+# Imports
+import functools
+
+from truco_encoding import NO_CARD, CARD_POINTS
+
+# first_hand_winner relativo a quem joga: 0=primeira mão; 1=quem joga; 2=o outro; 3=empate
+_FLIP = (0, 2, 1, 3)
+# Resultado da rodada para quem joga a partir do vencedor relativo (1, 2 ou 3=empate)
+_OUTCOME = (0, 1, -1, 0)
+
+
+def _pack(mine, theirs, table, first_hand_winner, turn):
+    # Estado da rodada em 32 bits: 4 bits por pontuação (mãos em ordem decrescente, 0 = carta
+    # jogada), carta na mesa, first_hand_winner relativo (2 bits) e turno (2 bits)
+    return (
+        mine[0] | mine[1] << 4 | mine[2] << 8
+        | theirs[0] << 12 | theirs[1] << 16 | theirs[2] << 20
+        | table << 24 | first_hand_winner << 28 | turn << 30
+    )
+
+
+def _unpack(key):
+    mine = (key & 15, key >> 4 & 15, key >> 8 & 15)
+    theirs = (key >> 12 & 15, key >> 16 & 15, key >> 20 & 15)
+    return mine, theirs, key >> 24 & 15, key >> 28 & 3, key >> 30 & 3
+
+
+def _remove(hand, i):
+    return hand[:i] + hand[i + 1:] + (0,)
+
+
+def _round_winner(first_hand_winner, hand_winner, turn):
+    '''
+    Mesma regra de TrucoMineiroEnv._determine_round_winner com vencedores relativos
+    (0=indeterminado; 1=quem jogou por último; 2=o outro; 3=empate)
+    '''
+    if turn == 2:
+        return hand_winner
+    if turn == 0:
+        return 0
+    if first_hand_winner == 3:
+        return 0 if hand_winner == 3 else hand_winner
+    if first_hand_winner == 1 and hand_winner != 2:
+        return 1
+    if first_hand_winner == 2 and hand_winner != 1:
+        return 2
+    return 0
+
+
+def hand_points(hand):
+    '''
+    Pontuações de uma mão (ids, NO_CARD = carta jogada) em ordem decrescente
+    '''
+    return tuple(sorted(CARD_POINTS.take(list(hand)).tolist(), reverse=True))
+
+
+class RoundSolver:
+    """
+    Resultado exato de uma rodada com informação perfeita (as duas mãos conhecidas)
+
+    Minimax sobre as jogadas de cartas com as regras de _determine_hand_winner e
+    _determine_round_winner do TrucoMineiroEnv. Os estados são inteiros compactos (mãos como
+    multiconjuntos de pontuações, carta na mesa, first_hand_winner, turno) guardados numa
+    tabela de transposição com descarte LRU de até maxsize posições. Cartas de mesma
+    pontuação são equivalentes, então posições que só diferem nos naipes compartilham a
+    entrada.
+
+    O resultado não depende da aposta (ela só multiplica o placar), então a aposta fica fora
+    da chave e value multiplica o resultado por ela. Pedidos de truco ficam de fora: o valor
+    é o da aposta atual, como se ela já tivesse sido aceita.
+    """
+
+    def __init__(self, maxsize=1 << 20):
+        self.maxsize = maxsize
+        self._solve = functools.lru_cache(maxsize=maxsize)(self._search)
+
+    def _search(self, key):
+        # Melhor resultado (-1, 0 ou 1) para quem joga agora
+        mine, theirs, table, first_hand_winner, turn = _unpack(key)
+        best = -2
+        for i, card in enumerate(mine):
+            if card == 0:
+                break
+            if i and card == mine[i - 1]:
+                continue
+            value = self._play(_remove(mine, i), theirs, card, table, first_hand_winner, turn)
+            if value > best:
+                best = value
+                if best == 1:
+                    break
+        return best
+
+    def _play(self, mine, theirs, card, table, first_hand_winner, turn):
+        # Quem abre a mão: o outro responde à carta
+        if table == 0:
+            return -self._solve(_pack(theirs, mine, card, _FLIP[first_hand_winner], turn))
+        # Quem responde fecha a mão
+        hand_winner = 1 if card > table else 2 if card < table else 3
+        round_winner = _round_winner(first_hand_winner, hand_winner, turn)
+        if round_winner:
+            return _OUTCOME[round_winner]
+        if turn == 0:
+            first_hand_winner = hand_winner
+        # Quem ganhou a mão abre a próxima; no empate, abre quem abriu esta
+        if hand_winner == 1:
+            return self._solve(_pack(mine, theirs, 0, first_hand_winner, turn + 1))
+        return -self._solve(_pack(theirs, mine, 0, _FLIP[first_hand_winner], turn + 1))
+
+    def outcome(self, hand, other_hand, table_card=NO_CARD, first_hand_winner=0, turn=0):
+        '''
+        Resultado da rodada para quem joga agora: 1 vence, -1 perde, 0 empata
+
+        hand e other_hand são ids de cartas (NO_CARD = jogada), table_card é a carta do outro
+        na mesa e first_hand_winner é relativo a quem joga (0, 1=quem joga, 2=o outro, 3=empate).
+        '''
+        mine, theirs = hand_points(hand), hand_points(other_hand)
+        return self._solve(_pack(mine, theirs, int(CARD_POINTS[table_card]), first_hand_winner, turn))
+
+    def outcome_points(self, mine, theirs, table=0, first_hand_winner=0, turn=0):
+        '''
+        outcome direto sobre pontuações: mãos como tuplas de 3 em ordem decrescente (0 =
+        carta jogada) e table = pontuação da carta na mesa (0 = nenhuma)
+        '''
+        return self._solve(_pack(mine, theirs, table, first_hand_winner, turn))
+
+    def value(self, hand, other_hand, table_card=NO_CARD, first_hand_winner=0, turn=0, bet=2):
+        '''
+        Pontos ganhos (ou perdidos, se negativo) por quem joga agora com jogo perfeito
+        '''
+        return bet * self.outcome(hand, other_hand, table_card, first_hand_winner, turn)
+
+    def best_card(self, hand, other_hand, table_card=NO_CARD, first_hand_winner=0, turn=0):
+        '''
+        Posição em hand da melhor carta para quem joga agora (a ação 0, 1 ou 2)
+        '''
+        mine, theirs = hand_points(hand), hand_points(other_hand)
+        table = int(CARD_POINTS[table_card])
+        best, best_index = -2, None
+        for index, card in enumerate(hand):
+            if card == NO_CARD:
+                continue
+            points = int(CARD_POINTS[card])
+            value = self._play(_remove(mine, mine.index(points)), theirs, points, table, first_hand_winner, turn)
+            if value > best:
+                best, best_index = value, index
+        return best_index
+
+    def _env_position(self, env):
+        if env.num_players != 2:
+            raise ValueError(f"RoundSolver only solves 1v1 rounds, got num_players={env.num_players}.")
+        current, other = env.current_player_index, env.other_player_index
+        first_hand_winner = env.first_hand_winner
+        if first_hand_winner == current + 1:
+            first_hand_winner = 1
+        elif first_hand_winner == other + 1:
+            first_hand_winner = 2
+        return env.cards[current], env.cards[other], env.other_card, first_hand_winner, env.turn
+
+    def solve_env(self, env):
+        '''
+        Valor exato da rodada atual do TrucoMineiroEnv (1v1) para o jogador da vez, em pontos
+        da aposta atual (ex.: sinal de reward shaping sem simular o resto da rodada)
+        '''
+        return env.current_bet * self.outcome(*self._env_position(env))
+
+    def best_action(self, env):
+        '''
+        Melhor carta (ação 0 a 2) para o jogador da vez do TrucoMineiroEnv
+        '''
+        return self.best_card(*self._env_position(env))
+
+    def cache_info(self):
+        return self._solve.cache_info()
+
+    def clear(self):
+        self._solve.cache_clear()
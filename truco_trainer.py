@@ -0,0 +1,283 @@
+# Imports
+import copy
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+from torch import nn
+from torch.optim import AdamW
+from tqdm import tqdm
+
+from truco_encoding import STATE_DIMS, NUM_ACTIONS, valid_actions_mask
+from truco_buffers import ReplayBuffer, PrioritizedReplayBuffer
+from truco_env import spawn_seeds
+from truco_inference import compile_q_network
+from truco_players import LearningPlayer, device
+from truco_profiling import NULL_PROFILER
+
+
+def default_q_network():
+    # Mesma arquitetura padrão do DeepQLearning do notebook
+    return nn.Sequential(
+        nn.Linear(STATE_DIMS, 64),
+        nn.ReLU(),
+        nn.Linear(64, 64),
+        nn.ReLU(),
+        nn.Linear(64, NUM_ACTIONS),
+    ).to(device)
+
+
+def masked_max(values, mask):
+    '''
+    Maior valor por linha entre as ações válidas (batch, 1); 0 nas linhas sem ação válida
+    '''
+    best = values.masked_fill(~mask, float("-inf")).max(dim=-1, keepdim=True)[0]
+    return torch.where(mask.any(dim=-1, keepdim=True), best, torch.zeros_like(best))
+
+
+class QUpdater:
+    """
+    Passo de gradiente das redes Q com as regras dos learners do notebook
+
+    rule="q_learning" (DeepQLearning) usa como alvo o máximo da rede alvo entre as ações
+    válidas do próximo estado; rule="sarsa" (DeepSarsa) usa o valor da rede alvo na ação
+    epsilon-greedy (eps) da rede online. As máscaras saem do próprio estado
+    (valid_actions_mask) e estados sem ação válida (fim de rodada com a mão vazia) valem 0.
+    Com prioritized o buffer deve ser um PrioritizedReplayBuffer. A rede alvo é copiada a
+    cada target_period atualizações ou, com tau, segue uma média móvel exponencial dos pesos.
+    """
+
+    RULES = ("q_learning", "sarsa")
+
+    def __init__(self, Q_network, alpha=1e-3, gamma=0.99, target_period=100, tau=None, prioritized=False, rule="q_learning", eps=0.05):
+        if rule not in self.RULES:
+            raise ValueError(f"Unknown update rule {rule}. Options: {', '.join(self.RULES)}.")
+        if tau is not None and not 0 < tau <= 1:
+            raise ValueError(f"tau must be in (0, 1], got {tau}.")
+        self.Q_network = Q_network
+        self.target_Q_network = copy.deepcopy(Q_network).eval()
+        self.optim = AdamW(Q_network.parameters(), lr=alpha)
+        self.gamma = gamma
+        self.target_period = target_period
+        self.tau = tau
+        self.prioritized = prioritized
+        self.rule = rule
+        self.eps = eps
+        self.num_updates = 0
+
+    def _next_values(self, next_state_b):
+        valid_mask = valid_actions_mask(next_state_b)
+        next_values = self.target_Q_network(next_state_b)
+        if self.rule == "q_learning":
+            return masked_max(next_values, valid_mask)
+        # Ação do próximo estado pela política epsilon-greedy da rede online
+        scores = self.Q_network(next_state_b)
+        explore = torch.rand(len(scores), 1, device=scores.device) < self.eps
+        scores = torch.where(explore, torch.rand_like(scores), scores)
+        next_action_b = scores.masked_fill(~valid_mask, float("-inf")).argmax(dim=-1, keepdim=True)
+        values = next_values.gather(1, next_action_b)
+        return torch.where(valid_mask.any(dim=-1, keepdim=True), values, torch.zeros_like(values))
+
+    def update(self, buffer, batch_size):
+        '''
+        Um passo de gradiente com um lote do buffer; retorna a perda (tensor, sem sincronizar)
+        '''
+        batch = buffer.sample(batch_size)
+        state_b, action_b, reward_b, done_b, next_state_b = batch[:5]
+        qsa_b = self.Q_network(state_b).gather(1, action_b)
+
+        with torch.no_grad():
+            target_b = reward_b + ~done_b * self.gamma * self._next_values(next_state_b)
+
+        if self.prioritized:
+            # Erro quadrático ponderado pelos pesos de importance sampling e novas
+            # prioridades a partir dos erros TD
+            weight_b, index_b = batch[5:]
+            td_error_b = target_b - qsa_b
+            loss = (weight_b * td_error_b ** 2).mean()
+            buffer.update_priorities(index_b, td_error_b)
+        else:
+            loss = F.mse_loss(qsa_b, target_b)
+        self.Q_network.zero_grad()
+        loss.backward()
+        self.optim.step()
+
+        self.num_updates += 1
+        if self.tau is not None:
+            with torch.no_grad():
+                for target, param in zip(self.target_Q_network.parameters(), self.Q_network.parameters()):
+                    target.lerp_(param, self.tau)
+        elif self.num_updates % self.target_period == 0:
+            self.target_Q_network.load_state_dict(self.Q_network.state_dict())
+        return loss.detach()
+
+
+class VectorDQLTrainer:
+    """
+    Deep Q-Learning com coleta em lote num vetor de envs (SyncTrucoVectorEnv ou
+    SubprocTrucoVectorEnv)
+
+    Alterna duas fases: coleta rollout_steps passos em todos os sub-envs, com as ações
+    epsilon-greedy do lote inteiro saindo de um forward só (pelo backend de inferência, ver
+    truco_inference), e depois faz updates_per_rollout passos de gradiente com lotes de
+    batch_size do replay buffer. As transições de cada passo entram no buffer de uma vez
+    (insert_many). Com o SubprocTrucoVectorEnv a coleta roda nos workers, então os
+    episódios por segundo crescem com o número de núcleos enquanto a coleta domina.
+
+    O alvo usa o máximo só entre as ações válidas do próximo estado (ver QUpdater, com
+    rule="sarsa" para o alvo do DeepSarsa). A rede alvo é copiada a cada target_period
+    atualizações ou, com tau, segue uma média móvel exponencial dos pesos. Perdas, retornos
+    e vitórias ficam em arrays, com uma sincronização com o device por fase em vez de um
+    .item() por passo.
+
+    A troca de oponentes (player_pool, copy_period e change_period, em episódios) segue a
+    do DeepQLearning do notebook. O jogador que aprende fica no assento 0 de cada sub-env.
+    seed fixa a exploração, as rodadas dos sub-envs, as amostras do replay buffer e os
+    sorteios do player_pool.
+    """
+
+    def __init__(
+        self, vector_env, Q_network=None, eps=0.01, alpha=1e-3, gamma=0.99, batch_size=32, rollout_steps=8,
+        updates_per_rollout=4, target_period=100, tau=None, prioritized=False, rule="q_learning",
+        inference_backend="numpy", buffer_capacity=1000000, player_pool=None, copy_period=100, change_period=100,
+        num_players=2, seed=None, profiler=NULL_PROFILER,
+    ):
+        if copy_period > change_period:
+            raise ValueError("copy_period cannot be greater than change_period.")
+        self.env = vector_env
+        self.num_envs = vector_env.num_envs
+        self.eps = eps
+        self.alpha = alpha
+        self.gamma = gamma
+        self.batch_size = batch_size
+        self.rollout_steps = rollout_steps
+        self.updates_per_rollout = updates_per_rollout
+        self.prioritized = prioritized
+        self.player_pool = player_pool
+        self.copy_period = copy_period
+        self.change_period = change_period
+        self.num_players = num_players
+        self.seed = seed
+        self.profiler = profiler
+        self.rng = np.random.default_rng(seed)
+
+        self.Q_network = default_q_network() if Q_network is None else Q_network
+        self.updater = QUpdater(self.Q_network, alpha, gamma, target_period, tau, prioritized, rule, eps)
+        self.policy = None if inference_backend is None else compile_q_network(self.Q_network, inference_backend)
+        # Sementes independentes para os sub-envs (no reset de run), o replay buffer e o pool
+        self.env_seed, buffer_seed, pool_seed = spawn_seeds(seed, 3)
+        if player_pool is not None and seed is not None:
+            player_pool.seed(pool_seed)
+        self.buffer = (PrioritizedReplayBuffer if prioritized else ReplayBuffer)(capacity=buffer_capacity, seed=buffer_seed)
+
+    def _choose_actions(self, states, valid_masks):
+        # Ação válida uniforme nas linhas que exploram e gulosa nas outras
+        if self.policy is not None:
+            actions = self.policy.act_batch(states, valid_masks)
+        else:
+            with torch.inference_mode():
+                values = self.Q_network(torch.from_numpy(states).to(device))
+                values = values.masked_fill(~torch.from_numpy(valid_masks).to(device), float("-inf"))
+                actions = values.argmax(dim=-1).cpu().numpy()
+        explore = self.rng.random(len(states)) < self.eps
+        if explore.any():
+            noise = self.rng.random((int(explore.sum()), NUM_ACTIONS)) * valid_masks[explore]
+            actions[explore] = noise.argmax(axis=1)
+        return actions
+
+    def _change_opponents(self):
+        sampled_players = self.player_pool.sample(self.num_players - 1)
+        all_players = [LearningPlayer("deep_qlearning"), *sampled_players]
+        half = self.num_players // 2
+        self.env.set_players([all_players[0:half], all_players[half:self.num_players]])
+        return sampled_players
+
+    def run(self, num_episodes, progress=True):
+        '''
+        Treina até completar num_episodes jogos (somando todos os sub-envs)
+
+        Retorna um dict de arrays: 'MSE Loss' (uma por atualização), 'Returns' (retorno
+        descontado de cada jogo, na ordem em que terminaram), 'victories' (bool por jogo),
+        'winrate' (acumulada a cada 100 jogos) e os totais 'wins', 'steps' e 'updates'.
+        '''
+        env, profiler, num_envs = self.env, self.profiler, self.num_envs
+        obs, info = env.reset(seed=self.env_seed)
+        ep_return = np.zeros(num_envs, dtype=np.float64)
+        gamma_pot = np.ones(num_envs, dtype=np.float64)
+        losses, returns, victories = [], [], []
+        phase_losses = torch.zeros(self.updates_per_rollout, device=device)
+        sampled_players = []
+        episodes = steps = 0
+        copies = changes = 0
+        # Conjunto de oponentes atual e o com que começou o jogo de cada sub-env: os jogos em
+        # andamento na troca terminam contra os novos oponentes e não vão para os ratings
+        opponents = 0
+        game_opponents = np.zeros(num_envs, dtype=np.int64)
+        first_episode = 0 if self.player_pool is None else self.player_pool.last_episode
+
+        bar = tqdm(total=num_episodes, disable=not progress)
+        while episodes < num_episodes:
+            with profiler.timer("trainer.collect"):
+                for _ in range(self.rollout_steps):
+                    states = obs.copy()
+                    actions = self._choose_actions(states, info["valid_mask"])
+                    obs, rewards, dones, info = env.step(actions)
+                    # No fim de uma rodada o próximo estado é o anterior ao reset automático
+                    round_ended = info["round_ended"]
+                    next_states = np.where(round_ended[:, None], info["final_obs"], obs)
+                    self.buffer.insert_many(states, actions, rewards, dones, next_states)
+                    steps += num_envs
+
+                    ep_return += rewards * gamma_pot
+                    gamma_pot *= self.gamma
+                    if dones.any():
+                        ended = np.flatnonzero(dones)
+                        returns.append(ep_return[ended].copy())
+                        victory = info["victory"][ended].copy()
+                        victories.append(victory)
+                        if self.player_pool is not None:
+                            for won in victory[game_opponents[ended] == opponents].tolist():
+                                self.player_pool.report(sampled_players, won)
+                        game_opponents[ended] = opponents
+                        ep_return[ended] = 0
+                        gamma_pot[ended] = 1
+                        episodes += len(ended)
+                        bar.update(len(ended))
+            profiler.count("trainer.steps", self.rollout_steps * num_envs)
+
+            if self.buffer.can_sample(self.batch_size):
+                with profiler.timer("trainer.update"):
+                    for k in range(self.updates_per_rollout):
+                        phase_losses[k] = self.updater.update(self.buffer, self.batch_size)
+                    if self.policy is not None:
+                        self.policy.refresh()
+                    # Uma sincronização por fase
+                    losses.append(phase_losses.cpu().numpy().copy())
+                profiler.count("trainer.updates", self.updates_per_rollout)
+
+            if self.player_pool is not None:
+                if episodes // self.copy_period > copies:
+                    copies = episodes // self.copy_period
+                    # A numeração continua a dos snapshots de execuções anteriores do pool
+                    total = first_episode + episodes
+                    self.player_pool.register(f"Number {total // self.copy_period} # Episode {total}", self.Q_network, episode=total)
+                if episodes // self.change_period > changes:
+                    changes = episodes // self.change_period
+                    # Os jogos em andamento continuam contra os novos oponentes (em todos os
+                    # sub-envs é a vez do jogador que aprende), mas só os começados depois
+                    # da troca contam para os ratings
+                    opponents += 1
+                    sampled_players = self._change_opponents()
+        bar.close()
+
+        victories = np.concatenate(victories) if victories else np.zeros(0, dtype=bool)
+        wins = np.cumsum(victories)
+        return {
+            "MSE Loss": np.concatenate(losses) if losses else np.zeros(0, dtype=np.float32),
+            "Returns": np.concatenate(returns) if returns else np.zeros(0),
+            "victories": victories,
+            "winrate": wins[99::100] / np.arange(100, len(victories) + 1, 100),
+            "wins": int(victories.sum()),
+            "steps": steps,
+            "updates": self.updater.num_updates,
+        }
@@ -0,0 +1,331 @@
+# Imports
+import multiprocessing as mp
+
+import numpy as np
+
+from truco_encoding import STATE_DIMS, NUM_ACTIONS, MASK_BOOLS
+from truco_profiling import NULL_PROFILER
+from truco_env import spawn_seeds
+
+
+class _StepBuffers:
+    """
+    Buffers de passo dos sub-envs: um array por campo, uma linha por sub-env
+    """
+
+    FIELDS = {
+        "obs": ((STATE_DIMS,), np.float32),
+        "final_obs": ((STATE_DIMS,), np.float32),
+        "rewards": ((), np.float32),
+        "dones": ((), bool),
+        "round_ended": ((), bool),
+        "victory": ((), bool),
+        "valid_mask": ((NUM_ACTIONS,), bool),
+        "actions": ((), np.int64),
+    }
+
+    def __init__(self, num_envs, arrays=None):
+        for name, (shape, dtype) in self.FIELDS.items():
+            array = np.zeros((num_envs, *shape), dtype=dtype) if arrays is None else arrays[name]
+            setattr(self, name, array)
+
+    def slice(self, start, stop):
+        # Visões das linhas [start, stop) (sem cópia)
+        return _StepBuffers(stop - start, {name: getattr(self, name)[start:stop] for name in self.FIELDS})
+
+
+def _shared_buffers(ctx, num_envs, raw=None):
+    '''
+    Buffers de passo em memória compartilhada entre processos (sem lock)
+
+    Sem raw, aloca os RawArrays; com raw, reconstrói as visões numpy no processo do worker.
+    '''
+    if raw is None:
+        raw = {
+            name: ctx.RawArray("b", num_envs * int(np.prod(shape, dtype=int)) * np.dtype(dtype).itemsize)
+            for name, (shape, dtype) in _StepBuffers.FIELDS.items()
+        }
+    arrays = {
+        name: np.frombuffer(raw[name], dtype=dtype).reshape(num_envs, *shape)
+        for name, (shape, dtype) in _StepBuffers.FIELDS.items()
+    }
+    return raw, _StepBuffers(num_envs, arrays)
+
+
+class SyncTrucoVectorEnv:
+    """
+    Vetor de TrucoMineiroEnv no mesmo processo, com as jogadas dos oponentes feitas em lote
+
+    Equivale a chamar step em cada sub-env, mas as decisões dos oponentes de todos os jogos
+    são enfileiradas e resolvidas com um choose_actions por oponente (um forward por rede
+    no caso do NetworkBotPlayer) a cada rodada de decisões, em vez de uma chamada por jogada.
+    Oponentes sem suporte a lote (batched = False) continuam jogando um a um.
+
+    Quando uma rodada termina o sub-env é reiniciado na hora (com o placar zerado se o jogo
+    acabou) e a observação anterior ao reset fica em info["final_obs"]. No 2v2, as rodadas
+    que os outros terminam antes da vez do jogador que aprende entram na recompensa e no done
+    do passo seguinte (ver TrucoMineiroEnv.skip_round).
+
+    env_fn deve aceitar o argumento obs_buffer, por exemplo functools.partial(TrucoMineiroEnv,
+    num_players=2, teams=teams). O profiler (ver truco_profiling) é compartilhado com os
+    sub-envs.
+
+    Com reset(seed=...) cada sub-env (e os geradores dos seus jogadores) recebe uma semente
+    filha independente. Um jogador compartilhado entre sub-envs tem um gerador só, então
+    as sequências dele dependem de como os sub-envs estão distribuídos.
+    """
+
+    def __init__(self, env_fn, num_envs, buffers=None, profiler=NULL_PROFILER):
+        self.num_envs = num_envs
+        self.buffers = _StepBuffers(num_envs) if buffers is None else buffers
+        self.profiler = profiler
+        # Cada env escreve sua observação direto na sua linha do buffer
+        self.envs = [env_fn(obs_buffer=self.buffers.obs[i]) for i in range(num_envs)]
+        for env in self.envs:
+            env.profiler = profiler
+
+    def reset(self, reset_score=True, seed=None):
+        '''
+        Reinicia todos os sub-envs e retorna obs (num_envs, 24) e info
+
+        seed (int ou SeedSequence) é dividida em sementes filhas independentes, uma por
+        sub-env; também aceita uma lista com a semente de cada sub-env.
+        '''
+        buffers = self.buffers
+        results = []
+        for env, env_seed in zip(self.envs, spawn_seeds(seed, self.num_envs)):
+            obs, info = env.reset(reset_score=reset_score, play_opponent=False, seed=env_seed)
+            results.append((obs, 0, False, info))
+        self._play_opponents(results, list(range(self.num_envs)), new_round=True)
+        buffers.rewards[:] = 0
+        buffers.dones[:] = False
+        buffers.round_ended[:] = False
+        buffers.victory[:] = False
+        self._update_valid_mask()
+        return buffers.obs, self._get_info()
+
+    def step(self, actions):
+        '''
+        Executa uma ação do jogador que aprende em cada sub-env
+
+        Os arrays retornados são visões dos buffers e são sobrescritos no próximo passo.
+        '''
+        buffers = self.buffers
+        with self.profiler.timer("env.handle_action"):
+            results = [env.handle_action(int(action)) for env, action in zip(self.envs, actions)]
+        self._play_opponents(results, range(self.num_envs))
+
+        ended = []
+        for i, env in enumerate(self.envs):
+            _, reward, done, info = env.finish_step(*results[i])
+            buffers.rewards[i] = reward
+            buffers.dones[i] = done
+            buffers.round_ended[i] = info["round_ended"]
+            buffers.victory[i] = info["victory"]
+            # Mesmo reset que os loops de treino fazem à mão: nova rodada ao fim de cada uma
+            # e placar zerado quando o jogo acaba
+            if info["round_ended"]:
+                buffers.final_obs[i] = buffers.obs[i]
+                obs, info = env.reset(reset_score=done, play_opponent=False)
+                results[i] = (obs, 0, False, info)
+                ended.append(i)
+        self._play_opponents(results, ended, new_round=True)
+
+        self._update_valid_mask()
+        return buffers.obs, buffers.rewards, buffers.dones, self._get_info()
+
+    def _play_opponents(self, results, indices, new_round=False):
+        '''
+        Joga pelos oponentes até ser a vez do jogador que aprende (ou a rodada acabar)
+
+        results[i] guarda o último (obs, reward, done, info) do sub-env i e é atualizado. Com
+        new_round (logo depois de um reset), no 2v2 a rodada pode acabar antes da primeira vez
+        do jogador que aprende (truco recusado entre os outros); como em TrucoMineiroEnv.reset,
+        o resultado fica pendente para o próximo passo e esses sub-envs recebem uma nova rodada
+        (ver TrucoMineiroEnv.skip_round).
+        '''
+        envs, profiler = self.envs, self.profiler
+        pending = [i for i in indices if envs[i].opponent_to_play(results[i][3])]
+        while pending:
+            batches = {}
+            for i in pending:
+                player = envs[i].players[envs[i].current_player_index]
+                if player.batched:
+                    batches.setdefault(player, []).append(i)
+                else:
+                    obs, _, _, info = results[i]
+                    with profiler.timer("opponent.choose_action"):
+                        action = player.choose_action(obs, info)
+                    results[i] = envs[i].handle_action(action)
+            for player, batch in batches.items():
+                valid_masks = MASK_BOOLS[[envs[i].action_mask for i in batch]]
+                with profiler.timer("opponent.choose_actions"):
+                    actions = player.choose_actions(self.buffers.obs[batch], valid_masks)
+                profiler.count("opponent.batched_decisions", len(batch))
+                for i, action in zip(batch, actions):
+                    results[i] = envs[i].handle_action(int(action))
+            for i in pending if new_round else ():
+                _, reward, done, info = results[i]
+                if info["round_ended"]:
+                    obs, info = envs[i].skip_round(reward, done)
+                    results[i] = (obs, 0, False, info)
+            pending = [i for i in pending if envs[i].opponent_to_play(results[i][3])]
+
+    def _update_valid_mask(self):
+        self.buffers.valid_mask[:] = MASK_BOOLS[[env.action_mask for env in self.envs]]
+
+    def set_players(self, teams):
+        '''
+        Troca os jogadores de todos os sub-envs (ex.: novos oponentes do PlayerBuffer)
+        '''
+        for env in self.envs:
+            env.set_players(teams)
+
+    def _get_info(self):
+        buffers = self.buffers
+        return {
+            "round_ended": buffers.round_ended,
+            "victory": buffers.victory,
+            "valid_mask": buffers.valid_mask,
+            "final_obs": buffers.final_obs,
+        }
+
+    def close(self):
+        for env in self.envs:
+            env.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _worker(remote, parent_remote, env_fn, raw, num_envs, start, stop):
+    '''
+    Processo que roda os sub-envs [start, stop) escrevendo nos buffers compartilhados
+    '''
+    parent_remote.close()
+    try:
+        import torch
+        # Cada worker usa uma thread só, senão os processos disputam os mesmos núcleos
+        torch.set_num_threads(1)
+    except ImportError:
+        pass
+
+    _, buffers = _shared_buffers(None, num_envs, raw)
+    vector_env = SyncTrucoVectorEnv(env_fn, stop - start, buffers.slice(start, stop))
+    actions = buffers.actions[start:stop]
+    try:
+        while True:
+            command, data = remote.recv()
+            if command == "step":
+                vector_env.step(actions)
+                remote.send(None)
+            elif command == "reset":
+                vector_env.reset(*data)
+                remote.send(None)
+            elif command == "set_players":
+                vector_env.set_players(data)
+                remote.send(None)
+            elif command == "close":
+                break
+            else:
+                raise ValueError(f"Unknown command {command}.")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        vector_env.close()
+        remote.close()
+
+
+class SubprocTrucoVectorEnv:
+    """
+    Vetor de TrucoMineiroEnv distribuído entre processos
+
+    Cada worker roda uma fatia dos sub-envs como um SyncTrucoVectorEnv (oponentes em lote
+    dentro da fatia). Ações, observações, recompensas, dones e máscaras de ações válidas
+    passam por arrays em memória compartilhada; os pipes só levam comandos curtos. Quando
+    uma rodada termina o sub-env é reiniciado na hora (com o placar zerado se o jogo acabou)
+    e a observação anterior ao reset fica em info["final_obs"].
+
+    env_fn deve ser picklable e aceitar o argumento obs_buffer, por exemplo
+    functools.partial(TrucoMineiroEnv, num_players=2, teams=teams).
+    """
+
+    def __init__(self, env_fn, num_envs, num_workers=None, context=None):
+        ctx = mp.get_context(context)
+        self.num_envs = num_envs
+        self.num_workers = min(num_workers or mp.cpu_count(), num_envs)
+        self.raw, self.buffers = _shared_buffers(ctx, num_envs)
+        self.closed = False
+
+        bounds = np.linspace(0, num_envs, self.num_workers + 1).astype(int)
+        self.bounds = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        self.remotes, self.processes = [], []
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            remote, work_remote = ctx.Pipe()
+            process = ctx.Process(
+                target=_worker,
+                args=(work_remote, remote, env_fn, self.raw, num_envs, int(start), int(stop)),
+                daemon=True,
+            )
+            process.start()
+            work_remote.close()
+            self.remotes.append(remote)
+            self.processes.append(process)
+
+    def _broadcast(self, command, data=None):
+        for remote in self.remotes:
+            remote.send((command, data))
+        for remote in self.remotes:
+            remote.recv()
+
+    def reset(self, reset_score=True, seed=None):
+        '''
+        Reinicia todos os sub-envs e retorna obs (num_envs, 24) e info
+
+        Com seed, cada sub-env recebe uma semente filha independente (ver spawn_seeds), então
+        o resultado não depende do número de workers.
+        '''
+        seeds = spawn_seeds(seed, self.num_envs)
+        for remote, (start, stop) in zip(self.remotes, self.bounds):
+            remote.send(("reset", (reset_score, seeds[start:stop])))
+        for remote in self.remotes:
+            remote.recv()
+        return self.buffers.obs, self._get_info()
+
+    def step(self, actions):
+        '''
+        Executa uma ação do jogador que aprende em cada sub-env
+
+        Os arrays retornados são visões dos buffers compartilhados e são sobrescritos no
+        próximo passo.
+        '''
+        self.buffers.actions[:] = actions
+        self._broadcast("step")
+        buffers = self.buffers
+        return buffers.obs, buffers.rewards, buffers.dones, self._get_info()
+
+    def set_players(self, teams):
+        '''
+        Troca os jogadores de todos os sub-envs (ex.: novos oponentes do PlayerBuffer)
+        '''
+        self._broadcast("set_players", teams)
+
+    _get_info = SyncTrucoVectorEnv._get_info
+
+    def close(self):
+        if self.closed:
+            return
+        for remote in self.remotes:
+            remote.send(("close", None))
+        for process in self.processes:
+            process.join()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()